@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+
+
+User = get_user_model()
+
+
+class UsernameOrEmailBackend(ModelBackend):
+    """
+    Вход по username или email с одной проверкой пароля.
+
+    - username и email хранятся в lowercase, поэтому поиск — один запрос по уникальным индексам;
+    - при совпадении login с username одного пользователя и email другого приоритет у username;
+    - для неизвестного login пароль всё равно хэшируется, чтобы время ответа не выдавало существование пользователя;
+    - check_password сам пересохраняет хэш, если параметры hasher-а устарели.
+    """
+
+    def authenticate(self, request, login=None, password=None, **kwargs):
+        if login is None:
+            login = kwargs.get(User.USERNAME_FIELD) or kwargs.get("email")
+
+        if not login or password is None:
+            return None
+
+        login = login.strip().lower()
+        users = list(User.objects.filter(Q(username=login) | Q(email=login))[:2])
+        user = next((user for user in users if user.username == login), users[0] if users else None)
+
+        if user is None:
+            User().set_password(password)
+            return None
+
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+
+        return None
@@ -156,3 +156,17 @@ class NotificationStatus(models.TextChoices):
 
     UNREAD = "unread", "Unread"
     READ = "read", "Read"
+
+
+class SearchDocumentKind(models.TextChoices):
+    """
+    Что проиндексировано в SearchDocument.
+
+    REPOSITORY: name + description repository.
+    COMMIT: message коммита.
+    FILE: текущий путь файла (удалённые файлы из индекса убираются).
+    """
+
+    REPOSITORY = "repository", "Repository"
+    COMMIT = "commit", "Commit"
+    FILE = "file", "File"
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+
+from api.choices import CommitFileOperation
+from api.models.commit import Commit, CommitFile
+from api.utils.commit_service import COMMIT_SUMMARY_FIELDS, build_commit_summary
+
+
+class Command(BaseCommand):
+    help = "Заполняет сводку изменений (added/modified/deleted/renamed, size_delta) у старых коммитов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, batch_size, **options):
+        repository_ids = list(
+            Commit.objects.filter(added_count__isnull=True)
+            .order_by("repository_id")
+            .values_list("repository_id", flat=True)
+            .distinct()
+        )
+
+        count = 0
+        for repository_id in repository_ids:
+            count += self.backfill_repository(repository_id, batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {count} commits"))
+
+    def backfill_repository(self, repository_id, batch_size):
+        """
+        size_delta зависит от предыдущей версии каждого пути,
+        поэтому история repository проигрывается по порядку один раз.
+        Коммиты записываются пачками через bulk_update (save() у Commit запрещён).
+        """
+
+        missing_ids = set(
+            Commit.objects.filter(repository_id=repository_id, added_count__isnull=True).values_list("id", flat=True)
+        )
+        operations_by_commit = {}
+        size_delta_by_commit = {}
+        sizes = {}
+
+        rows = (
+            CommitFile.objects
+            .filter(commit__repository_id=repository_id)
+            .order_by("commit_id", "id")
+            .values_list("commit_id", "path", "operation", "blob__size")
+        )
+
+        for commit_id, path, operation, size in rows.iterator(chunk_size=batch_size):
+            old_size = sizes.pop(path, 0)
+            if operation != CommitFileOperation.DELETED:
+                sizes[path] = size or 0
+
+            if commit_id in missing_ids:
+                operations_by_commit.setdefault(commit_id, []).append(operation)
+                size_delta_by_commit[commit_id] = size_delta_by_commit.get(commit_id, 0) + sizes.get(path, 0) - old_size
+
+        commits = [
+            Commit(
+                id=commit_id,
+                **build_commit_summary(operations_by_commit.get(commit_id, []), size_delta_by_commit.get(commit_id, 0)),
+            )
+            for commit_id in sorted(missing_ids)
+        ]
+
+        for start in range(0, len(commits), batch_size):
+            Commit.objects.bulk_update(commits[start:start + batch_size], COMMIT_SUMMARY_FIELDS)
+
+        return len(commits)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.utils.constants import REFRESH_SESSION_PARTITION_MONTHS_AHEAD
+from api.utils.session_partitions import convert_to_partitioned, ensure_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = (
+        "Переводит таблицу refresh-сессий в помесячное партиционирование по expires_at (только Postgres). "
+        "Для уже партиционированной таблицы только создаёт будущие партиции."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=REFRESH_SESSION_PARTITION_MONTHS_AHEAD)
+
+    def handle(self, *args, months_ahead, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Партиционирование поддерживается только на PostgreSQL")
+
+        if is_partitioned():
+            created = ensure_partitions(months_ahead=months_ahead)
+            self.stdout.write(self.style.SUCCESS(f"Table already partitioned, created {created} new partitions"))
+            return
+
+        convert_to_partitioned(months_ahead=months_ahead)
+        self.stdout.write(self.style.SUCCESS("Refresh session table converted to partitioned"))
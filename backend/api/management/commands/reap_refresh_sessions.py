@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.utils.constants import REFRESH_SESSION_REAP_BATCH_SIZE, REFRESH_SESSION_RETENTION_SECONDS
+from api.utils.session import reap_refresh_sessions
+from api.utils.session_partitions import drop_partitions_before, ensure_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет истёкшие и отозванные refresh-сессии пачками. "
+        "Для партиционированной таблицы также создаёт будущие партиции и удаляет старые целиком."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=REFRESH_SESSION_REAP_BATCH_SIZE)
+        parser.add_argument("--retention-seconds", type=int, default=REFRESH_SESSION_RETENTION_SECONDS)
+
+    def handle(self, *args, batch_size, retention_seconds, **options):
+        if is_partitioned():
+            ensure_partitions()
+            cutoff = timezone.now() - timezone.timedelta(seconds=retention_seconds)
+            for name in drop_partitions_before(cutoff):
+                self.stdout.write(f"Dropped partition {name}")
+
+        deleted = reap_refresh_sessions(retention_seconds=retention_seconds, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} refresh sessions"))
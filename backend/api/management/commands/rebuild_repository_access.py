@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.utils.access_service import rebuild_all_repository_access
+
+
+class Command(BaseCommand):
+    help = "Полностью пересобирает таблицу доступа RepositoryAccess."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, batch_size, **options):
+        count = rebuild_all_repository_access(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt access for {count} repositories"))
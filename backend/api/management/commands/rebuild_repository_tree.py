@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models.repositories import Repository
+from api.utils.tree_service import rebuild_repository_tree
+
+
+class Command(BaseCommand):
+    help = "Пересобирает TreeEntry (дерево файлов на HEAD) для всех или одного repository."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repository", type=int, help="id одного repository")
+
+    def handle(self, *args, repository=None, **options):
+        repositories = Repository.objects.order_by("id")
+        if repository is not None:
+            repositories = repositories.filter(id=repository)
+
+        count = 0
+        for item in repositories.iterator():
+            with transaction.atomic():
+                count += rebuild_repository_tree(item)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} files"))
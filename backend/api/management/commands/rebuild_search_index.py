@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.models.repositories import Repository
+from api.utils.search_service import rebuild_repository_index
+
+
+class Command(BaseCommand):
+    help = "Пересобирает SearchDocument (repository, коммиты, текущие пути файлов)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repository", type=int, help="id одного repository")
+
+    def handle(self, *args, repository=None, **options):
+        repositories = Repository.objects.order_by("id")
+        if repository is not None:
+            repositories = repositories.filter(id=repository)
+
+        count = 0
+        for item in repositories.iterator():
+            count += rebuild_repository_index(item)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} documents"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from api.models.companies import Company, CompanyMember
+
+
+class Command(BaseCommand):
+    help = "Сверяет Company.member_count с реальным числом CompanyMember и исправляет расхождения."
+
+    def handle(self, *args, **options):
+        actual = Coalesce(
+            Subquery(
+                CompanyMember.objects
+                .filter(company_id=OuterRef("id"))
+                .order_by()
+                .values("company_id")
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+            0,
+        )
+
+        fixed = Company.objects.exclude(member_count=actual).update(member_count=actual)
+
+        self.stdout.write(self.style.SUCCESS(f"Fixed member_count for {fixed} companies"))
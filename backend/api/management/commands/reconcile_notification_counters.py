@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.utils.notification_counter import reconcile_notification_counters
+
+
+class Command(BaseCommand):
+    help = "Сверяет NotificationCounter с реальным числом непрочитанных уведомлений и исправляет расхождения."
+
+    def handle(self, *args, **options):
+        fixed = reconcile_notification_counters()
+        self.stdout.write(self.style.SUCCESS(f"Fixed {fixed} notification counters"))
@@ -4,12 +4,29 @@ from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db import IntegrityError
 from django.http import JsonResponse
 
+from api.utils.auth_service import RequestAccess
 from api.utils.exception_handler import _integrity_error_message
 
 
 logger = logging.getLogger(__name__)
 
 
+class AccessTokenMiddleware:
+    """
+    Прикрепляет к запросу request.access (RequestAccess).
+
+    Token разбирается лениво при первом обращении из view или helper-а,
+    поэтому запросы без авторизации ничего не стоят.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.access = RequestAccess(request)
+        return self.get_response(request)
+
+
 class ApiExceptionMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
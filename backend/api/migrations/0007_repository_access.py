@@ -0,0 +1,64 @@
+# Generated by Django 4.2.24 on 2026-10-19 13:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_repository_access(apps, schema_editor):
+    Repository = apps.get_model("api", "Repository")
+    Company = apps.get_model("api", "Company")
+    CompanyMember = apps.get_model("api", "CompanyMember")
+    RepositoryAccess = apps.get_model("api", "RepositoryAccess")
+
+    rows = [
+        RepositoryAccess(user_id=user_id, repository_id=repository_id, can_edit=True, can_delete=True)
+        for repository_id, user_id in Repository.objects.filter(owner_user__isnull=False).values_list("id", "owner_user_id")
+    ]
+
+    for company_id, owner_id in Company.objects.values_list("id", "owner_id"):
+        repository_ids = list(Repository.objects.filter(owner_company_id=company_id).values_list("id", flat=True))
+        if not repository_ids:
+            continue
+
+        user_ids = set(CompanyMember.objects.filter(company_id=company_id).values_list("user_id", flat=True)) | {owner_id}
+        rows.extend(
+            RepositoryAccess(
+                user_id=user_id,
+                repository_id=repository_id,
+                can_edit=True,
+                can_delete=user_id == owner_id,
+            )
+            for repository_id in repository_ids
+            for user_id in user_ids
+        )
+
+    RepositoryAccess.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_remove_company_cover'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepositoryAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('can_edit', models.BooleanField(default=False)),
+                ('can_delete', models.BooleanField(default=False)),
+                ('repository', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_entries', to='api.repository')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='repository_access', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['repository'], name='api_reposit_reposit_c5e2e5_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='repositoryaccess',
+            constraint=models.UniqueConstraint(fields=('user', 'repository'), name='unique_repository_access'),
+        ),
+        migrations.RunPython(fill_repository_access, migrations.RunPython.noop),
+    ]
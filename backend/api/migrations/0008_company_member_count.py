@@ -0,0 +1,40 @@
+# Generated by Django 4.2.24 on 2026-10-19 13:53
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_member_count(apps, schema_editor):
+    Company = apps.get_model("api", "Company")
+    CompanyMember = apps.get_model("api", "CompanyMember")
+
+    Company.objects.update(
+        member_count=Coalesce(
+            Subquery(
+                CompanyMember.objects
+                .filter(company_id=OuterRef("id"))
+                .order_by()
+                .values("company_id")
+                .annotate(count=Count("id"))
+                .values("count")
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_repository_access'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_member_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.24 on 2026-10-19 13:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_repository_stats(apps, schema_editor):
+    Repository = apps.get_model("api", "Repository")
+    Commit = apps.get_model("api", "Commit")
+    CommitFile = apps.get_model("api", "CommitFile")
+
+    for repository_id in Repository.objects.values_list("id", flat=True).iterator():
+        sizes = {}
+        rows = (
+            CommitFile.objects
+            .filter(commit__repository_id=repository_id)
+            .order_by("commit_id", "id")
+            .values_list("path", "operation", "blob__size")
+        )
+
+        for path, operation, size in rows.iterator():
+            if operation == "deleted":
+                sizes.pop(path, None)
+            else:
+                sizes[path] = size or 0
+
+        last_commit = (
+            Commit.objects
+            .filter(repository_id=repository_id)
+            .order_by("-created_at", "-id")
+            .values("created_at", "created_by_id")
+            .first()
+        )
+
+        Repository.objects.filter(id=repository_id).update(
+            file_count=len(sizes),
+            total_size=sum(sizes.values()),
+            commit_count=Commit.objects.filter(repository_id=repository_id).count(),
+            last_commit_at=last_commit["created_at"] if last_commit else None,
+            last_commit_by_id=last_commit["created_by_id"] if last_commit else None,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_company_member_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='repository',
+            name='commit_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='repository',
+            name='file_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='repository',
+            name='last_commit_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='repository',
+            name='last_commit_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='repository',
+            name='total_size',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='repository',
+            index=models.Index(fields=['-updated_at', '-id'], name='repository_updated_idx'),
+        ),
+        migrations.RunPython(fill_repository_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 4.2.24 on 2026-10-19 13:55
+
+import re
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def _normalize(text):
+    # как search_service.tokenize: слова в нижнем регистре через пробел
+    return " ".join(re.findall(r"[^\W_]+", (text or "").lower()))
+
+
+def fill_search_documents(apps, schema_editor):
+    Repository = apps.get_model("api", "Repository")
+    Commit = apps.get_model("api", "Commit")
+    CommitFile = apps.get_model("api", "CommitFile")
+    SearchDocument = apps.get_model("api", "SearchDocument")
+
+    for repository_id, name, description in Repository.objects.values_list("id", "name", "description").iterator():
+        documents = [
+            SearchDocument(
+                kind="repository",
+                repository_id=repository_id,
+                object_id=repository_id,
+                title=name,
+                text=_normalize(f"{name} {description or ''}"),
+            )
+        ]
+        documents.extend(
+            SearchDocument(
+                kind="commit",
+                repository_id=repository_id,
+                object_id=commit_id,
+                title=message,
+                text=_normalize(message),
+            )
+            for commit_id, message in Commit.objects.filter(repository_id=repository_id).values_list("id", "message")
+        )
+
+        # текущие версии путей — как get_current_repository_file_versions
+        files = {}
+        rows = (
+            CommitFile.objects
+            .filter(commit__repository_id=repository_id)
+            .order_by("commit__created_at", "commit_id", "id")
+            .values_list("path", "operation", "file_id")
+        )
+
+        for path, operation, file_id in rows.iterator():
+            files[path] = None if operation == "deleted" else file_id
+
+        documents.extend(
+            SearchDocument(
+                kind="file",
+                repository_id=repository_id,
+                object_id=file_id,
+                title=path,
+                text=_normalize(path),
+            )
+            for path, file_id in files.items()
+            if file_id is not None
+        )
+
+        SearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+    if schema_editor.connection.vendor == "postgresql":
+        SearchDocument.objects.update(search_vector=SearchVector("text", config="simple"))
+
+
+# GIN по tsvector есть только в Postgres; на SQLite поиск идёт через InvertedIndex в памяти
+def create_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS search_document_vector_gin "
+            "ON api_searchdocument USING GIN (search_vector)"
+        )
+
+
+def drop_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS search_document_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_repository_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('repository', 'Repository'), ('commit', 'Commit'), ('file', 'File')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.TextField()),
+                ('text', models.TextField()),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ('repository', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='api.repository')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['repository'], name='api_searchd_reposit_75f0e4_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_vector_index, drop_search_vector_index),
+    ]
@@ -0,0 +1,41 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# username и email хранятся в нижнем регистре (User.save), поэтому индексы строятся по самим колонкам:
+# - gin_trgm_ops — подстрока и similarity;
+# - varchar_pattern_ops — LIKE 'q%' (обычный unique-индекс для LIKE не подходит при не-C collation).
+USER_SEARCH_INDEXES = [
+    ("user_username_trgm", "USING GIN (username gin_trgm_ops)"),
+    ("user_email_trgm", "USING GIN (email gin_trgm_ops)"),
+    ("user_username_prefix", "(username varchar_pattern_ops)"),
+    ("user_email_prefix", "(email varchar_pattern_ops)"),
+]
+
+
+def create_user_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for name, definition in USER_SEARCH_INDEXES:
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON api_user {definition}")
+
+
+def drop_user_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for name, _definition in USER_SEARCH_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_search_document'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_user_search_indexes, drop_user_search_indexes),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.2.24 on 2026-10-19 13:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_tree_entries(apps, schema_editor):
+    Repository = apps.get_model("api", "Repository")
+    CommitFile = apps.get_model("api", "CommitFile")
+    TreeEntry = apps.get_model("api", "TreeEntry")
+
+    for repository_id in Repository.objects.values_list("id", flat=True).iterator():
+        # текущие версии путей — как get_current_repository_file_versions
+        files = {}
+        rows = (
+            CommitFile.objects
+            .filter(commit__repository_id=repository_id)
+            .order_by("commit__created_at", "commit_id", "id")
+            .values_list("id", "path", "operation", "blob__size")
+        )
+
+        for commit_file_id, path, operation, size in rows.iterator():
+            if operation == "deleted":
+                files.pop(path, None)
+            else:
+                files[path] = (commit_file_id, size or 0)
+
+        entries = []
+        directories = {}
+
+        for path, (commit_file_id, size) in files.items():
+            parent_path, _, name = path.rpartition("/")
+            entries.append(TreeEntry(
+                repository_id=repository_id,
+                path=path,
+                parent_path=parent_path,
+                name=name,
+                size=size,
+                file_count=1,
+                commit_file_id=commit_file_id,
+            ))
+
+            parts = path.split("/")
+            for index in range(1, len(parts)):
+                totals = directories.setdefault("/".join(parts[:index]), [0, 0])
+                totals[0] += size
+                totals[1] += 1
+
+        for path, (size, file_count) in directories.items():
+            parent_path, _, name = path.rpartition("/")
+            entries.append(TreeEntry(
+                repository_id=repository_id,
+                path=path,
+                parent_path=parent_path,
+                name=name,
+                is_dir=True,
+                size=size,
+                file_count=file_count,
+            ))
+
+        TreeEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_user_trigram_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TreeEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=512)),
+                ('parent_path', models.CharField(max_length=512)),
+                ('name', models.CharField(max_length=512)),
+                ('is_dir', models.BooleanField(default=False)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('file_count', models.PositiveIntegerField(default=0)),
+                ('commit_file', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.commitfile')),
+                ('repository', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tree_entries', to='api.repository')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['repository', 'parent_path', '-is_dir', 'name'], name='tree_entry_listing_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='treeentry',
+            constraint=models.UniqueConstraint(fields=('repository', 'path', 'is_dir'), name='unique_tree_entry'),
+        ),
+        migrations.RunPython(fill_tree_entries, migrations.RunPython.noop),
+    ]
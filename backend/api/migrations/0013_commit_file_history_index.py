@@ -0,0 +1,21 @@
+# Generated by Django 4.2.24 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_tree_entry'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='commitfile',
+            name='api_commitf_file_id_e58bcf_idx',
+        ),
+        migrations.AddIndex(
+            model_name='commitfile',
+            index=models.Index(fields=['file', '-commit'], name='commit_file_history_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.24 on 2026-10-19 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_commit_file_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commit',
+            name='added_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='commit',
+            name='deleted_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='commit',
+            name='modified_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='commit',
+            name='renamed_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='commit',
+            name='size_delta',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.24 on 2026-10-19 14:03
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def revoke_legacy_sessions(apps, schema_editor):
+    """
+    Сессии без selector отзываются: их token находился только перебором PBKDF2 по таблице.
+    Владельцам таких сессий придётся войти заново.
+    """
+
+    AuthRefreshSession = apps.get_model("api", "AuthRefreshSession")
+    AuthRefreshSession.objects.filter(
+        selector__isnull=True,
+        revoked_at__isnull=True,
+    ).update(revoked_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_commit_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authrefreshsession',
+            name='selector',
+            field=models.CharField(blank=True, max_length=32, null=True, unique=True),
+        ),
+        migrations.RunPython(revoke_legacy_sessions, migrations.RunPython.noop),
+    ]
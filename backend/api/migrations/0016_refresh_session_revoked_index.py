@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-19 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_refresh_session_selector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='authrefreshsession',
+            index=models.Index(condition=models.Q(('revoked_at__isnull', False)), fields=['revoked_at'], name='refresh_session_revoked_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.24 on 2026-10-19 14:15
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_notification_counters(apps, schema_editor):
+    Notification = apps.get_model("api", "Notification")
+    NotificationCounter = apps.get_model("api", "NotificationCounter")
+
+    rows = (
+        Notification.objects
+        .filter(status="unread")
+        .order_by()
+        .values("recipient_id")
+        .annotate(count=Count("id"))
+    )
+
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=row["recipient_id"], unread_count=row["count"]) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_user_membership_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_notification_counters, migrations.RunPython.noop),
+    ]
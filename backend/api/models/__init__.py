@@ -1,9 +1,21 @@
 from .auth import AuthRefreshSession
 from .base import TimeStampedModel, validate_5mb, validate_50mb, validate_500mb
 from .commit import Commit, CommitFile
-from .companies import Company, CompanyInvite, CompanyMember
+from .companies import (
+    Company,
+    CompanyInvite,
+    CompanyMember,
+    can_create_company_repository,
+    can_delete_repository,
+    can_edit_repository,
+    can_manage_company,
+    can_view_repository,
+    is_company_member,
+)
 from .content import AppVersion, Documentation, FAQ, File, FileBlob, MediaFile, MediaMeta
 from .entityLog import EntityLog
-from .notifications import Notification
-from .repositories import Repository
+from .notifications import Notification, NotificationCounter
+from .repositories import Repository, RepositoryAccess
+from .search import SearchDocument
+from .tree import TreeEntry
 from .user import User, UserManager, UserProfile
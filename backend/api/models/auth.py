@@ -11,9 +11,15 @@ class AuthRefreshSession(TimeStampedModel):
     Frontend хранит только access_token.
     Refresh token не отдаётся в JSON и хранится у клиента только в HttpOnly cookie.
     В БД хранится hash refresh token, а не сам token.
+
+    Token имеет вид "<selector>.<verifier>":
+    - selector публичный и хранится как есть — по нему сессия находится одним индексным запросом;
+    - verifier секретный, в token_hash хранится только его PBKDF2-hash.
+    У старых сессий selector = NULL, их token целиком захеширован в token_hash.
     """
 
     user = models.ForeignKey("api.User", on_delete=models.CASCADE, related_name="refresh_sessions")
+    selector = models.CharField(max_length=32, unique=True, null=True, blank=True)
     token_hash = models.CharField(max_length=128, unique=True, db_index=True)
     expires_at = models.DateTimeField(db_index=True)
     revoked_at = models.DateTimeField(null=True, blank=True)
@@ -24,6 +30,11 @@ class AuthRefreshSession(TimeStampedModel):
         indexes = [
             models.Index(fields=["user", "expires_at"]),
             models.Index(fields=["token_hash"]),
+            models.Index(
+                fields=["revoked_at"],
+                name="refresh_session_revoked_idx",
+                condition=models.Q(revoked_at__isnull=False),
+            ),
         ]
 
     @property
@@ -48,6 +48,14 @@ class Commit(TimeStampedModel):
         related_name="children",
     )
 
+    # сводка изменений, считается один раз при создании коммита;
+    # NULL — старый коммит, ещё не обработанный backfill_commit_summaries
+    added_count = models.PositiveIntegerField(null=True, blank=True)
+    modified_count = models.PositiveIntegerField(null=True, blank=True)
+    deleted_count = models.PositiveIntegerField(null=True, blank=True)
+    renamed_count = models.PositiveIntegerField(null=True, blank=True)
+    size_delta = models.BigIntegerField(null=True, blank=True)
+
     class Meta:
         indexes = [
             models.Index(fields=["repository", "created_at"]),
@@ -107,7 +115,8 @@ class CommitFile(TimeStampedModel):
         ]
         indexes = [
             models.Index(fields=["commit", "path"]),
-            models.Index(fields=["file"]),
+            # история одного файла: WHERE file_id = ? ORDER BY commit_id DESC
+            models.Index(fields=["file", "-commit"], name="commit_file_history_idx"),
             models.Index(fields=["operation"]),
         ]
 
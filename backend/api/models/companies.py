@@ -45,7 +45,8 @@ class Company(TimeStampedModel):
         validators=[validate_5mb]
     )
 
-
+    # число CompanyMember; поддерживается сигналами, сверяется командой reconcile_company_member_counts
+    member_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         constraints = [
@@ -274,41 +275,190 @@ class CompanyInvite(TimeStampedModel):
 
 
 
-def is_company_member(user, company):
+def get_membership_claims(user):
     """
-    Проверяет, является ли user участником company.
+    Компании пользователя из claims access token: (member_company_ids, owned_company_ids) или None.
 
-    Owner компании считается участником даже без отдельной CompanyMember записи.
+    Claims проставляет parse_access_token, если версия членства в token совпала с текущей.
     """
 
-    if not user or not user.is_authenticated or company is None:
-        return False
+    return getattr(user, "membership_claims", None)
 
-    if company.owner_id == user.id:
-        return True
 
-    return CompanyMember.objects.filter(company=company, user=user).exists()
+def get_user_company_ids(user):
+    """
+    Компании пользователя одним запросом.
 
+    Возвращает (member_company_ids, owned_company_ids).
+    Owner считается участником, поэтому owned_company_ids входит в member_company_ids.
+    При наличии claims в access token запроса в БД нет.
+    """
 
+    if not user or not user.is_authenticated:
+        return frozenset(), frozenset()
 
-def can_view_repository(user, repository):
+    claims = get_membership_claims(user)
+    if claims is not None:
+        return claims
+
+    rows = Company.objects.filter(
+        Q(owner=user)
+        | Q(id__in=CompanyMember.objects.filter(user=user).values("company_id"))
+    ).values_list("id", "owner_id")
+
+    member_company_ids = set()
+    owned_company_ids = set()
+
+    for company_id, owner_id in rows:
+        member_company_ids.add(company_id)
+        if owner_id == user.id:
+            owned_company_ids.add(company_id)
+
+    return frozenset(member_company_ids), frozenset(owned_company_ids)
+
+
+def get_repository_permissions(user, repository, member_company_ids, owned_company_ids):
     """
-    Проверяет право просмотра repository.
+    Права на repository по заранее загруженным компаниям пользователя (см. get_user_company_ids).
 
-    Public repository виден всем авторизованным пользователям.
-    Private repository виден owner_user или участникам owner_company.
+    Запросов в БД не делает. Возвращает (can_view, can_edit, can_delete)
+    по тем же правилам, что и can_view_repository/can_edit_repository/can_delete_repository.
     """
 
     if not user or not user.is_authenticated:
-        return False
-
-    if repository.visibility == RepositoryVisibility.PUBLIC:
-        return True
+        return False, False, False
 
     if repository.is_personal:
-        return repository.owner_user_id == user.id
+        is_owner = repository.owner_user_id == user.id
+        can_view = is_owner or repository.visibility == RepositoryVisibility.PUBLIC
+        return can_view, is_owner, is_owner
+
+    is_member = repository.owner_company_id in member_company_ids
+    can_view = is_member or repository.visibility == RepositoryVisibility.PUBLIC
+    return can_view, is_member, repository.owner_company_id in owned_company_ids
+
+
+class PermissionResolver:
+    """
+    Права пользователя на компании и repository.
+
+    - компании пользователя загружаются при первой проверке, которой они нужны,
+      одним запросом (или берутся из claims access token), дальше всё считается в памяти;
+    - в запросе один resolver на пользователя (см. get_permission_resolver);
+    - check_repositories проверяет список repository сразу.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._company_ids = None
+
+    @property
+    def is_authenticated(self):
+        return bool(self.user and self.user.is_authenticated)
+
+    @property
+    def company_ids(self):
+        if self._company_ids is None:
+            self._company_ids = get_user_company_ids(self.user)
+        return self._company_ids
+
+    def is_company_member(self, company):
+        if not self.is_authenticated or company is None:
+            return False
+
+        # владелец по самой компании: только что созданная компания ещё не попала в claims
+        return company.owner_id == self.user.id or company.id in self.company_ids[0]
+
+    def can_manage_company(self, company):
+        return self.is_authenticated and company.owner_id == self.user.id
+
+    def can_create_company_repository(self, company):
+        return self.is_company_member(company)
+
+    def repository_permissions(self, repository):
+        """
+        (can_view, can_edit, can_delete). Компании загружаются, только если repository
+        принадлежит компании и не является public-ом, который решается без них.
+        """
+
+        if not self.is_authenticated:
+            return False, False, False
+
+        if repository.is_personal:
+            return get_repository_permissions(self.user, repository, frozenset(), frozenset())
+
+        return get_repository_permissions(self.user, repository, *self.company_ids)
+
+    def can_view_repository(self, repository):
+        if self.is_authenticated and repository.visibility == RepositoryVisibility.PUBLIC:
+            return True
+        return self.repository_permissions(repository)[0]
+
+    def can_edit_repository(self, repository):
+        return self.repository_permissions(repository)[1]
+
+    def can_delete_repository(self, repository):
+        return self.repository_permissions(repository)[2]
+
+    def check_repositories(self, repositories):
+        """
+        Права на список repository: {repository.id: (can_view, can_edit, can_delete)}.
+        """
+
+        return {repository.id: self.repository_permissions(repository) for repository in repositories}
+
+
+def get_permission_resolver(user):
+    """
+    PermissionResolver пользователя.
+
+    Внутри запроса (у user есть permission_cache от RequestAccess) resolver один на весь запрос;
+    без него создаётся новый, чтобы не отдавать устаревшие права долгоживущему объекту user.
+    """
+
+    cache = getattr(user, "permission_cache", None)
+    if cache is None:
+        return PermissionResolver(user)
+
+    resolver = cache.get(PermissionResolver)
+    if resolver is None:
+        resolver = cache[PermissionResolver] = PermissionResolver(user)
+    return resolver
+
+
+def forget_memberships(user):
+    """
+    Сбрасывает загруженные в объект user компании: claims access token и resolver запроса.
+
+    Вызывается сигналами при изменении членства, чтобы остаток запроса видел новые права.
+    """
+
+    user.__dict__.pop("membership_claims", None)
+
+    cache = getattr(user, "permission_cache", None)
+    if cache is not None:
+        cache.pop(PermissionResolver, None)
+
+
+def is_company_member(user, company):
+    """
+    Проверяет, является ли user участником company.
+
+    Owner компании считается участником даже без отдельной CompanyMember записи.
+    """
+
+    return get_permission_resolver(user).is_company_member(company)
 
-    return is_company_member(user, repository.owner_company)
+
+def can_view_repository(user, repository):
+    """
+    Проверяет право просмотра repository.
+
+    Public repository виден всем авторизованным пользователям.
+    Private repository виден owner_user или участникам owner_company.
+    """
+
+    return get_permission_resolver(user).can_view_repository(repository)
 
 
 def can_edit_repository(user, repository):
@@ -318,13 +468,7 @@ def can_edit_repository(user, repository):
     Public не даёт права редактирования.
     """
 
-    if not user or not user.is_authenticated:
-        return False
-
-    if repository.is_personal:
-        return repository.owner_user_id == user.id
-
-    return is_company_member(user, repository.owner_company)
+    return get_permission_resolver(user).can_edit_repository(repository)
 
 
 def can_delete_repository(user, repository):
@@ -335,13 +479,7 @@ def can_delete_repository(user, repository):
     Company repository удаляет owner компании.
     """
 
-    if not user or not user.is_authenticated:
-        return False
-
-    if repository.is_personal:
-        return repository.owner_user_id == user.id
-
-    return repository.owner_company.owner_id == user.id
+    return get_permission_resolver(user).can_delete_repository(repository)
 
 
 def can_manage_company(user, company):
@@ -351,10 +489,7 @@ def can_manage_company(user, company):
     Управлять компанией может только owner.
     """
 
-    if not user or not user.is_authenticated:
-        return False
-
-    return company.owner_id == user.id
+    return get_permission_resolver(user).can_manage_company(company)
 
 
 def can_create_company_repository(user, company):
@@ -364,7 +499,4 @@ def can_create_company_repository(user, company):
     Создавать может owner или любой участник компании.
     """
 
-    if not user or not user.is_authenticated:
-        return False
-
-    return is_company_member(user, company)
+    return get_permission_resolver(user).can_create_company_repository(company)
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 from api.choices import NotificationStatus
 from api.models.base import TimeStampedModel
@@ -40,9 +41,56 @@ class Notification(TimeStampedModel):
         ]
 
     def mark_read(self):
-        if self.status != NotificationStatus.READ:
-            self.status = NotificationStatus.READ
-            self.save(update_fields=["status", "updated_at"])
+        """
+        Помечает уведомление прочитанным.
+
+        Переход решает БД: UPDATE ... WHERE status='unread' в транзакции, и счётчик
+        уменьшается, только если строку изменил этот вызов. Устаревшая копия или
+        повторный клик не уменьшают его второй раз.
+        """
+
+        from api.utils.notification_broker import publish_unread_count
+        from api.utils.notification_counter import change_unread_count
+
+        now = timezone.now()
+
+        with transaction.atomic():
+            changed = Notification.objects.filter(pk=self.pk, status=NotificationStatus.UNREAD).update(
+                status=NotificationStatus.READ,
+                updated_at=now,
+            )
+
+            if changed == 1:
+                change_unread_count(self.recipient_id, -1)
+                recipient_id = self.recipient_id
+                transaction.on_commit(lambda: publish_unread_count(recipient_id))
+                self.updated_at = now
+
+        self.status = NotificationStatus.READ
+        # для post_save сигнала счётчика: переход уже учтён
+        self._counted_status = NotificationStatus.READ
 
     def __str__(self):
         return self.title
+
+
+
+class NotificationCounter(models.Model):
+    """
+    Число непрочитанных уведомлений пользователя.
+
+    Поддерживается сигналами Notification (создание, mark_read, удаление) в той же транзакции;
+    чтение — один запрос по первичному ключу. Расхождения исправляет
+    команда reconcile_notification_counters.
+    """
+
+    user = models.OneToOneField(
+        "api.User",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="notification_counter",
+    )
+    unread_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread_count}"
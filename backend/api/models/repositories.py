@@ -11,6 +11,25 @@ def validate_logo(image):
     if image and image.size > 2 * 1024 * 1024:
         raise ValidationError("Logo too large (max 2MB)")
 
+
+class RepositoryQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """
+        Repository, которые user может видеть (те же правила, что и can_view_repository).
+
+        Вместо OR по owner_user/owner_company/companymember + distinct
+        используется RepositoryAccess: public OR id IN (индексированный подзапрос по user).
+        """
+
+        if not user or not user.is_authenticated:
+            return self.none()
+
+        return self.filter(
+            Q(visibility=RepositoryVisibility.PUBLIC)
+            | Q(id__in=RepositoryAccess.objects.filter(user=user).values("repository_id"))
+        )
+
+
 # REPOSITORY
 class Repository(TimeStampedModel):
     """
@@ -74,6 +93,21 @@ class Repository(TimeStampedModel):
         validators=[validate_logo]
     )
 
+    # статистика для списков; обновляется инкрементально при каждом коммите (record_commit_stats)
+    file_count = models.PositiveIntegerField(default=0)
+    total_size = models.PositiveBigIntegerField(default=0)
+    commit_count = models.PositiveIntegerField(default=0)
+    last_commit_at = models.DateTimeField(null=True, blank=True)
+    last_commit_by = models.ForeignKey(
+        "User",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+"
+    )
+
+    objects = RepositoryQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.CheckConstraint(
@@ -101,6 +135,7 @@ class Repository(TimeStampedModel):
             models.Index(fields=["owner_user", "visibility"]),
             models.Index(fields=["owner_company", "visibility"]),
             models.Index(fields=["name"]),
+            models.Index(fields=["-updated_at", "-id"], name="repository_updated_idx"),
         ]
 
     @property
@@ -121,3 +156,33 @@ class Repository(TimeStampedModel):
 
     def __str__(self):
         return self.name
+
+
+class RepositoryAccess(models.Model):
+    """
+    Денормализованная таблица доступа: кто из пользователей имеет доступ к repository не через public.
+
+    Одна строка на (user, repository):
+    - personal repo: owner_user, can_edit и can_delete;
+    - company repo: owner компании (can_edit, can_delete) и каждый участник (can_edit).
+
+    Строки — производные данные. Их поддерживают сигналы (api/signals.py) на
+    CompanyMember, Company.owner и Repository, полностью пересобирает
+    команда rebuild_repository_access.
+    """
+
+    user = models.ForeignKey("api.User", on_delete=models.CASCADE, related_name="repository_access")
+    repository = models.ForeignKey(Repository, on_delete=models.CASCADE, related_name="access_entries")
+    can_edit = models.BooleanField(default=False)
+    can_delete = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "repository"], name="unique_repository_access"),
+        ]
+        indexes = [
+            models.Index(fields=["repository"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.repository_id}"
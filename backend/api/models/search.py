@@ -0,0 +1,42 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+from api.choices import SearchDocumentKind
+
+
+class SearchDocument(models.Model):
+    """
+    Документ полнотекстового поиска.
+
+    Одна строка на repository, commit или живой путь файла:
+    - object_id — id Repository, Commit или File в зависимости от kind;
+    - title — что показывать в результатах;
+    - text — нормализованный текст для поиска;
+    - search_vector — tsvector(text), заполняется только на Postgres,
+      GIN-индекс создаётся миграцией.
+
+    Строки — производные данные: их поддерживают сигналы (api/signals.py),
+    полностью пересобирает команда rebuild_search_index.
+    """
+
+    kind = models.CharField(max_length=20, choices=SearchDocumentKind.choices)
+    repository = models.ForeignKey(
+        "api.Repository",
+        on_delete=models.CASCADE,
+        related_name="search_documents",
+    )
+    object_id = models.PositiveBigIntegerField()
+    title = models.TextField()
+    text = models.TextField()
+    search_vector = SearchVectorField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="unique_search_document"),
+        ]
+        indexes = [
+            models.Index(fields=["repository"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id}"
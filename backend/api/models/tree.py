@@ -0,0 +1,45 @@
+from django.db import models
+
+
+class TreeEntry(models.Model):
+    """
+    Дерево файлов repository на HEAD: одна строка на каждый живой файл и каждую папку.
+
+    - path — полный путь без "/" в конце, parent_path — путь родительской папки ("" для корня);
+    - для папки size и file_count — суммы по всем файлам внутри (на любой глубине);
+    - для файла commit_file указывает на последнюю версию, file_count = 1.
+
+    Содержимое папки — один индексный запрос по (repository, parent_path),
+    независимо от размера repository. Строки поддерживает create_repository_commit
+    и откат (tree_service.apply_tree_changes), пересобирает команда rebuild_repository_tree.
+    """
+
+    repository = models.ForeignKey(
+        "api.Repository",
+        on_delete=models.CASCADE,
+        related_name="tree_entries",
+    )
+    path = models.CharField(max_length=512)
+    parent_path = models.CharField(max_length=512)
+    name = models.CharField(max_length=512)
+    is_dir = models.BooleanField(default=False)
+    size = models.PositiveBigIntegerField(default=0)
+    file_count = models.PositiveIntegerField(default=0)
+    commit_file = models.ForeignKey(
+        "api.CommitFile",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["repository", "path", "is_dir"], name="unique_tree_entry"),
+        ]
+        indexes = [
+            models.Index(fields=["repository", "parent_path", "-is_dir", "name"], name="tree_entry_listing_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.repository_id}:{self.path}{'/' if self.is_dir else ''}"
@@ -63,6 +63,9 @@ class User(AbstractUser):
         default=UserRole.USER,
         db_index=True,
     )
+    # увеличивается при любом изменении членства в компаниях;
+    # access token с другой версией claims отклоняется (см. api/utils/token.py)
+    membership_version = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = ["email"]
@@ -0,0 +1,267 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from api.models.auth import AuthRefreshSession
+from api.models.commit import Commit, CommitFile
+from api.models.companies import Company, CompanyMember, forget_memberships
+from api.choices import NotificationStatus
+from api.models.notifications import Notification
+from api.models.repositories import Repository
+from api.models.user import User
+from api.utils.access_service import (
+    grant_company_member_access,
+    rebuild_company_access,
+    rebuild_repository_access,
+    revoke_company_member_access,
+)
+from api.utils.notification_broker import publish_unread_count
+from api.utils.notification_counter import change_unread_count
+from api.utils.search_service import index_commit, index_commit_file, index_repository
+from api.utils.session_cache import invalidate_sessions
+
+
+# =========================================================
+# REPOSITORY ACCESS
+# =========================================================
+# Владельцы запоминаются при загрузке объекта, чтобы после save
+# пересобирать доступ только когда владелец действительно поменялся.
+# __dict__ вместо getattr: отложенное (only/defer) поле не должно грузиться из БД.
+
+@receiver(post_init, sender=Repository)
+def remember_repository_owner(sender, instance, **kwargs):
+    instance._access_owner = (
+        instance.__dict__.get("owner_user_id"),
+        instance.__dict__.get("owner_company_id"),
+    )
+
+
+@receiver(post_save, sender=Repository)
+def update_repository_access(sender, instance, created, **kwargs):
+    owner = (instance.owner_user_id, instance.owner_company_id)
+
+    if created or owner != getattr(instance, "_access_owner", None):
+        rebuild_repository_access(instance)
+
+    instance._access_owner = owner
+
+
+@receiver(post_init, sender=Company)
+def remember_company_owner(sender, instance, **kwargs):
+    instance._access_owner_id = instance.__dict__.get("owner_id")
+
+
+@receiver(post_save, sender=Company)
+def update_company_access(sender, instance, created, **kwargs):
+    if not created and instance.owner_id != getattr(instance, "_access_owner_id", None):
+        rebuild_company_access(instance)
+
+    instance._access_owner_id = instance.owner_id
+
+
+@receiver(post_save, sender=CompanyMember)
+def grant_member_access(sender, instance, created, **kwargs):
+    if created:
+        grant_company_member_access(instance.company_id, instance.user_id)
+
+
+@receiver(post_delete, sender=CompanyMember)
+def revoke_member_access(sender, instance, **kwargs):
+    revoke_company_member_access(instance.company_id, instance.user_id)
+
+
+# =========================================================
+# COMPANY MEMBER COUNT
+# =========================================================
+# Все пути (create_company, CompanyInvite.accept, remove/leave) создают и удаляют
+# CompanyMember через ORM, а queryset.delete() отправляет post_delete на каждую строку,
+# поэтому сигналов достаточно. Обновление через F() атомарно на стороне БД.
+
+def _change_member_count(instance, delta):
+    Company.objects.filter(id=instance.company_id).update(member_count=F("member_count") + delta)
+
+    # уже загруженная компания (например, в create_company) не должна отдать устаревшее значение
+    company = instance._state.fields_cache.get("company")
+    if company is not None:
+        company.member_count = max(company.member_count + delta, 0)
+
+
+@receiver(post_save, sender=CompanyMember)
+def increment_member_count(sender, instance, created, **kwargs):
+    if created:
+        _change_member_count(instance, 1)
+
+
+@receiver(post_delete, sender=CompanyMember)
+def decrement_member_count(sender, instance, **kwargs):
+    _change_member_count(instance, -1)
+
+
+# =========================================================
+# SEARCH INDEX
+# =========================================================
+# Статистика repository обновляется через queryset.update(), поэтому
+# post_save Repository приходит только на создание и редактирование.
+
+@receiver(post_save, sender=Repository)
+def index_repository_document(sender, instance, **kwargs):
+    index_repository(instance)
+
+
+@receiver(post_save, sender=Commit)
+def index_commit_document(sender, instance, created, **kwargs):
+    if created:
+        index_commit(instance)
+
+
+@receiver(post_save, sender=CommitFile)
+def index_commit_file_document(sender, instance, created, **kwargs):
+    if created:
+        index_commit_file(instance, instance.commit.repository_id)
+
+
+# =========================================================
+# ACCESS SESSION CACHE
+# =========================================================
+# Кэш сессий общий для worker-ов, поэтому revoke/ротация/изменение user
+# должны явно удалять записи, а не ждать TTL. Удаляем сразу и ещё раз после commit:
+# иначе параллельный запрос может успеть положить в кэш строку до фиксации revoke.
+
+def _invalidate_sessions(session_ids):
+    session_ids = list(session_ids)
+    invalidate_sessions(session_ids)
+    transaction.on_commit(lambda: invalidate_sessions(session_ids))
+
+
+@receiver(post_save, sender=AuthRefreshSession)
+def invalidate_revoked_session(sender, instance, created, **kwargs):
+    if not created and instance.revoked_at is not None:
+        _invalidate_sessions([instance.id])
+
+
+@receiver(post_delete, sender=AuthRefreshSession)
+def invalidate_deleted_session(sender, instance, **kwargs):
+    _invalidate_sessions([instance.id])
+
+
+# поля, устаревшее значение которых в кэше ни на что не влияет; update_last_login при каждом
+# входе иначе сбрасывал бы все сессии пользователя
+CACHE_INSENSITIVE_USER_FIELDS = frozenset({"last_login"})
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_sessions(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and update_fields <= CACHE_INSENSITIVE_USER_FIELDS:
+        return
+
+    if not created:
+        _invalidate_sessions(
+            instance.refresh_sessions.filter(revoked_at__isnull=True).values_list("id", flat=True)
+        )
+
+
+# =========================================================
+# MEMBERSHIP VERSION
+# =========================================================
+# Access token несёт claims о компаниях пользователя с membership_version.
+# Любое изменение членства увеличивает версию: старые token отклоняются,
+# а закэшированные сессии пользователя сбрасываются, чтобы проверка видела новую версию.
+
+def _bump_membership_version(user_ids, users=()):
+    # уже загруженный user (например, request user в create_company) не должен
+    # до конца запроса проверять права по старым claims
+    for user in users:
+        if user is not None:
+            forget_memberships(user)
+
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+
+    User.objects.filter(id__in=user_ids).update(membership_version=F("membership_version") + 1)
+    _invalidate_sessions(
+        AuthRefreshSession.objects.filter(user_id__in=user_ids, revoked_at__isnull=True).values_list("id", flat=True)
+    )
+
+
+@receiver(post_save, sender=CompanyMember)
+def bump_member_version_on_join(sender, instance, created, **kwargs):
+    if created:
+        _bump_membership_version([instance.user_id], [instance._state.fields_cache.get("user")])
+
+
+@receiver(post_delete, sender=CompanyMember)
+def bump_member_version_on_leave(sender, instance, **kwargs):
+    _bump_membership_version([instance.user_id], [instance._state.fields_cache.get("user")])
+
+
+@receiver(post_init, sender=Company)
+def remember_membership_owner(sender, instance, **kwargs):
+    instance._membership_owner_id = instance.__dict__.get("owner_id")
+
+
+@receiver(post_save, sender=Company)
+def bump_owner_version(sender, instance, created, **kwargs):
+    previous_owner_id = getattr(instance, "_membership_owner_id", None)
+
+    if created or instance.owner_id != previous_owner_id:
+        _bump_membership_version([instance.owner_id, previous_owner_id], [instance._state.fields_cache.get("owner")])
+
+    instance._membership_owner_id = instance.owner_id
+
+
+@receiver(post_delete, sender=Company)
+def bump_owner_version_on_delete(sender, instance, **kwargs):
+    _bump_membership_version([instance.owner_id], [instance._state.fields_cache.get("owner")])
+
+
+# =========================================================
+# UNREAD NOTIFICATION COUNTER
+# =========================================================
+# Статус запоминается при загрузке, чтобы после save менять счётчик только при
+# переходе unread <-> read. Изменение идёт в транзакции, которая меняет Notification.
+
+@receiver(post_init, sender=Notification)
+def remember_notification_status(sender, instance, **kwargs):
+    instance._counted_status = instance.__dict__.get("status")
+
+
+@receiver(post_save, sender=Notification)
+def update_unread_counter(sender, instance, created, **kwargs):
+    was_unread = not created and instance._counted_status == NotificationStatus.UNREAD
+    is_unread = instance.status == NotificationStatus.UNREAD
+
+    if was_unread != is_unread:
+        change_unread_count(instance.recipient_id, 1 if is_unread else -1)
+
+    instance._counted_status = instance.status
+
+
+@receiver(post_delete, sender=Notification)
+def decrement_unread_counter(sender, instance, **kwargs):
+    if instance.status == NotificationStatus.UNREAD:
+        change_unread_count(instance.recipient_id, -1)
+
+
+# =========================================================
+# NOTIFICATION EVENTS
+# =========================================================
+# Все пути (create_notification, CompanyInvite.*, удаление) создают, меняют и удаляют
+# Notification через ORM; queryset.delete() отправляет post_delete на каждую строку.
+# mark_read меняет строку через update() и публикует событие сам.
+# Событие уходит после commit, чтобы клиент не увидел откатанные данные.
+
+def _publish_notification_change(instance):
+    recipient_id = instance.recipient_id
+    transaction.on_commit(lambda: publish_unread_count(recipient_id))
+
+
+@receiver(post_save, sender=Notification)
+def publish_saved_notification(sender, instance, **kwargs):
+    _publish_notification_change(instance)
+
+
+@receiver(post_delete, sender=Notification)
+def publish_deleted_notification(sender, instance, **kwargs):
+    _publish_notification_change(instance)
@@ -1,8 +1,25 @@
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.management import CommandError, call_command
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.test import RequestFactory, TestCase, override_settings
 from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+import hashlib
+import importlib
+import io
+import json
+import secrets
+import struct
+import tempfile
 import uuid
+import zipfile
+from types import SimpleNamespace
+from unittest import mock
 
 from .choices import (
     CommitFileOperation,
@@ -17,13 +34,18 @@ from .models import (
     Commit,
     CommitFile,
     Company,
+    CompanyInvite,
     CompanyMember,
     Documentation,
     FAQ,
     File,
     FileBlob,
     Notification,
+    NotificationCounter,
     Repository,
+    RepositoryAccess,
+    SearchDocument,
+    TreeEntry,
     User,
     UserProfile,
     can_create_company_repository,
@@ -33,6 +55,35 @@ from .models import (
     can_view_repository,
     is_company_member,
 )
+from .models.companies import PermissionResolver, get_permission_resolver, get_user_company_ids
+from .utils.auth_service import get_request_access, get_user_from_request_data
+from .utils.blob_reader import prefetch_blobs
+from .utils.notification_broker import InProcessBroker, get_broker
+from .utils import notification_counter, session_cache
+from .utils.notification_counter import get_unread_count
+from .utils.commit_service import create_repository_commit, get_commit_snapshot_files
+from .utils.rate_limit import get_rate_limit_counters, reset_rate_limits
+from .utils.repository_service import build_path_filter, get_current_repository_file_versions
+from .utils.search_service import reset_fallback_index, search_documents, search_user_rows
+from .utils.serializers import REPOSITORY_RELATED_FIELDS, serialize_companies, serialize_repositories
+from .utils.session import (
+    create_refresh_session,
+    find_refresh_session,
+    get_client_ip,
+    reap_refresh_sessions,
+    rotate_refresh_session,
+)
+from .utils.session_cache import SESSION_FIELDS, USER_FIELDS, clear_session_cache, get_cached_session
+from .utils.token import create_access_token, hash_token, parse_access_token
+
+
+def auth_header(user):
+    session = AuthRefreshSession.objects.create(
+        user=user,
+        token_hash=uuid.uuid4().hex,
+        expires_at=timezone.now() + timezone.timedelta(days=7),
+    )
+    return {"HTTP_AUTHORIZATION": f"Bearer {create_access_token(user, session)}"}
 
 
 # =========================================================
@@ -653,6 +704,33 @@ class AppVersionModelTests(TestCase):
         self.assertEqual(app_version.created_by, admin)
 
 
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class AppVersionDownloadTests(TestCase):
+    """
+    Скачивание версии отдаёт файл по частям, в том числе под ASGI.
+    """
+
+    def setUp(self):
+        admin = User.objects.create_user(username="admin", email="admin@example.com", password="pass", role=UserRole.ADMIN)
+        self.app_version = AppVersion.objects.create(
+            file=ContentFile(b"x" * 10, name="ourpaint.zip"),
+            title="OurPaint",
+            version="1.0.0",
+            platform="all",
+            file_size=10,
+            original_name="ourpaint.zip",
+            created_by=admin,
+        )
+
+    async def test_asgi_download_keeps_headers_and_streams(self):
+        response = await self.async_client.get(f"/api/content/download/{self.app_version.id}/")
+
+        self.assertTrue(response.is_async)
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertIn("ourpaint.zip", response["Content-Disposition"])
+        self.assertEqual(b"".join([chunk async for chunk in response.streaming_content]), b"x" * 10)
+
+
 # =========================================================
 # CASCADE DELETE
 # =========================================================
@@ -718,3 +796,1702 @@ class CascadeDeleteTests(TestCase):
         self.assertFalse(Company.objects.filter(id=company_id).exists())
         self.assertFalse(Repository.objects.filter(id=repository_id).exists())
         self.assertFalse(Commit.objects.filter(id=commit_id).exists())
+
+
+# =========================================================
+# BLOB PREFETCH
+# =========================================================
+class BlobPrefetchTests(TestCase):
+    """
+    Blob-ы читаются заранее в пуле потоков,
+    но отдаются строго в исходном порядке и с ограничением на объём в памяти.
+    """
+
+    class FakeBlob:
+        def __init__(self, name, size):
+            self.name = name
+            self.size = size
+
+    def test_entries_keep_original_order(self):
+        blobs = [self.FakeBlob(f"blob-{index}", 10) for index in range(20)]
+
+        result = list(prefetch_blobs(blobs, read=lambda blob: blob.name.encode(), workers=4))
+
+        self.assertEqual([item.name for item, _ in result], [blob.name for blob in blobs])
+        self.assertEqual([content for _, content in result], [blob.name.encode() for blob in blobs])
+
+    def test_inflight_bytes_are_capped(self):
+        blobs = [self.FakeBlob(f"blob-{index}", 40) for index in range(10)]
+        submitted = []
+
+        def read(blob):
+            submitted.append(blob.name)
+            return b"x"
+
+        for index, (blob, _content) in enumerate(prefetch_blobs(blobs, read=read, workers=8, max_inflight_bytes=100)):
+            # до отдачи текущего blob-а прочитаны максимум он и ещё один (2 * 40 <= 100 < 3 * 40)
+            self.assertLessEqual(len(submitted), index + 2)
+
+    def test_blob_larger_than_cap_is_still_read(self):
+        blobs = [self.FakeBlob("big", 500), self.FakeBlob("small", 1)]
+
+        result = list(prefetch_blobs(blobs, read=lambda blob: blob.name, max_inflight_bytes=100))
+
+        self.assertEqual([content for _, content in result], ["big", "small"])
+
+    def test_items_without_blob_are_passed_through(self):
+        items = [("a", self.FakeBlob("a", 1)), ("b", None)]
+
+        result = list(prefetch_blobs(items, get_blob=lambda item: item[1], read=lambda blob: blob.name))
+
+        self.assertEqual([content for _, content in result], ["a", None])
+
+
+# =========================================================
+# PARTIAL DOWNLOADS
+# =========================================================
+class PathFilterTests(TestCase):
+    """
+    Частичные выгрузки: ?path= ограничивает поддерево, include/exclude — glob-фильтры.
+    Фильтр применяется к CommitFile.path в БД.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.repository = Repository.objects.create(owner_user=self.user, created_by=self.user, name="repo")
+        self.commit = Commit.objects.create(
+            repository=self.repository,
+            created_by=self.user,
+            message="Initial commit",
+            commit_hash="b" * 64,
+        )
+
+        for index, path in enumerate([
+            "README.md",
+            "textures/wood.png",
+            "textures/stone.jpg",
+            "textures/ui/button.png",
+            "textures-old/wood.png",
+        ]):
+            blob = FileBlob.objects.create(
+                repository=self.repository,
+                blob=f"repository_blobs/{index}",
+                sha256=str(index) * 64,
+                size=1,
+            )
+            CommitFile.objects.create(
+                commit=self.commit,
+                file=File.objects.create(repository=self.repository, path=path),
+                path=path,
+                operation=CommitFileOperation.ADDED,
+                blob=blob,
+            )
+
+    def _paths(self, **kwargs):
+        path_filter = build_path_filter(**kwargs)
+        return sorted(get_current_repository_file_versions(self.repository, path_filter=path_filter))
+
+    def test_no_filter_returns_none(self):
+        self.assertIsNone(build_path_filter(path_prefix="", include=[], exclude=[]))
+
+    def test_path_prefix_selects_subtree(self):
+        self.assertEqual(
+            self._paths(path_prefix="textures"),
+            ["textures/stone.jpg", "textures/ui/button.png", "textures/wood.png"],
+        )
+
+    def test_include_glob_matches_file_name_at_any_depth(self):
+        self.assertEqual(
+            self._paths(path_prefix="textures/", include=["*.png"]),
+            ["textures/ui/button.png", "textures/wood.png"],
+        )
+
+    def test_include_glob_with_slash_is_relative_to_prefix(self):
+        self.assertEqual(self._paths(path_prefix="textures/", include=["*.png"], exclude=["ui/*"]), ["textures/wood.png"])
+        self.assertEqual(self._paths(path_prefix="textures/", include=["**/*.png"]), ["textures/ui/button.png", "textures/wood.png"])
+
+    def test_snapshot_uses_same_filter(self):
+        snapshot = get_commit_snapshot_files(self.commit, path_filter=build_path_filter(include=["*.jpg"]))
+
+        self.assertEqual([row.path for row in snapshot], ["textures/stone.jpg"])
+
+
+# =========================================================
+# BATCH DOWNLOAD
+# =========================================================
+def read_frames(payload):
+    frames = []
+    offset = 0
+
+    while offset < len(payload):
+        (header_length,) = struct.unpack(">I", payload[offset:offset + 4])
+        offset += 4
+        header = json.loads(payload[offset:offset + header_length])
+        offset += header_length
+        size = header.get("size") or 0
+        frames.append((header, payload[offset:offset + size]))
+        offset += size
+
+    return frames
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class BatchDownloadTests(TestCase):
+    """
+    Пакетное скачивание: один запрос, кадры в порядке запроса,
+    права проверяются на уровне repository.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.other = User.objects.create_user(username="other", email="other@example.com", password="pass")
+        self.repository = Repository.objects.create(owner_user=self.owner, created_by=self.owner, name="repo")
+        self.commit = Commit.objects.create(
+            repository=self.repository,
+            created_by=self.owner,
+            message="Initial commit",
+            commit_hash="b" * 64,
+        )
+        self.commit_files = []
+
+        for path, content in [("a.txt", b"alpha"), ("b.txt", b"bravo")]:
+            blob = FileBlob.objects.create(
+                repository=self.repository,
+                blob=ContentFile(content, name=path),
+                sha256=hashlib.sha256(content).hexdigest(),
+                size=len(content),
+            )
+            self.commit_files.append(CommitFile.objects.create(
+                commit=self.commit,
+                file=File.objects.create(repository=self.repository, path=path),
+                path=path,
+                operation=CommitFileOperation.ADDED,
+                blob=blob,
+            ))
+
+    def test_batch_returns_frames_in_request_order(self):
+        ids = [self.commit_files[1].id, self.commit_files[0].id, 999999]
+
+        response = self.client.post(
+            "/api/commit-files/batch/",
+            data={"commit_file_ids": ids},
+            content_type="application/json",
+            **auth_header(self.owner),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        frames = read_frames(b"".join(response.streaming_content))
+        self.assertEqual([header["id"] for header, _ in frames], ids)
+        self.assertEqual([content for _, content in frames], [b"bravo", b"alpha", b""])
+        self.assertEqual(frames[2][0]["error"], "not_found")
+
+    def test_batch_hides_files_of_private_repository(self):
+        response = self.client.post(
+            "/api/commit-files/batch/",
+            data={"blob_ids": [self.commit_files[0].blob_id]},
+            content_type="application/json",
+            **auth_header(self.other),
+        )
+
+        frames = read_frames(b"".join(response.streaming_content))
+        self.assertEqual(frames[0][0]["error"], "forbidden")
+        self.assertEqual(frames[0][1], b"")
+
+    def test_repository_zip_is_streamed(self):
+        response = self.client.get(f"/api/repositories/{self.repository.id}/download/", **auth_header(self.owner))
+
+        self.assertTrue(response.streaming)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), ["a.txt", "b.txt"])
+        self.assertEqual(archive.read("b.txt"), b"bravo")
+
+    async def test_asgi_downloads_are_not_buffered(self):
+        headers = {"Authorization": (await sync_to_async(auth_header)(self.owner))["HTTP_AUTHORIZATION"]}
+
+        response = await self.async_client.post(
+            "/api/commit-files/batch/",
+            data={"commit_file_ids": [self.commit_files[0].id, self.commit_files[1].id]},
+            content_type="application/json",
+            headers=headers,
+        )
+        self.assertTrue(response.is_async)
+        frames = read_frames(b"".join([chunk async for chunk in response.streaming_content]))
+        self.assertEqual([content for _, content in frames], [b"alpha", b"bravo"])
+
+        response = await self.async_client.get(f"/api/repositories/{self.repository.id}/download/", headers=headers)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(zipfile.ZipFile(io.BytesIO(b"".join(chunks))).read("a.txt"), b"alpha")
+
+
+# =========================================================
+# CURSOR PAGINATION
+# =========================================================
+class CursorPaginationTests(TestCase):
+    """
+    List endpoint-ы отдают страницы с непрозрачным курсором.
+    Весь список доступен только явно через ?all=true.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.user = User.objects.create_user(username="reader", email="reader@example.com", password="pass")
+        created_at = timezone.now()
+
+        for index in range(7):
+            notification = Notification.objects.create(recipient=self.user, title=f"n{index}")
+            # у части уведомлений одинаковый created_at — порядок должен держаться на id
+            Notification.objects.filter(id=notification.id).update(created_at=created_at - timezone.timedelta(minutes=index // 2))
+
+    def test_pages_cover_list_without_duplicates(self):
+        headers = auth_header(self.user)
+        titles = []
+        cursor = None
+
+        while True:
+            params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+            response = self.client.get("/api/notifications/list/", params, **headers)
+            self.assertEqual(response.status_code, 200)
+            titles.extend(item["title"] for item in response.data["results"])
+            cursor = response.data["next_cursor"]
+            if not cursor:
+                break
+
+        expected = [
+            notification.title
+            for notification in Notification.objects.filter(recipient=self.user).order_by("-created_at", "-id")
+        ]
+        self.assertEqual(titles, expected)
+
+    def test_full_list_is_opt_in(self):
+        response = self.client.get("/api/notifications/list/", {"all": "true"}, **auth_header(self.user))
+
+        self.assertEqual(len(response.data), 7)
+
+    def test_tampered_cursor_is_rejected(self):
+        response = self.client.get("/api/notifications/list/", {"cursor": "garbage"}, **auth_header(self.user))
+
+        self.assertEqual(response.status_code, 400)
+
+
+# =========================================================
+# BULK REPOSITORY SERIALIZATION
+# =========================================================
+class SerializeRepositoriesTests(TestCase):
+    """
+    Список repository сериализуется за постоянное число запросов,
+    а права совпадают с can_view/can_edit/can_delete_repository.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.member = User.objects.create_user(username="member", email="member@example.com", password="pass")
+        self.other = User.objects.create_user(username="other", email="other@example.com", password="pass")
+        self.company = Company.objects.create(owner=self.owner, name="Acme")
+        CompanyMember.objects.create(company=self.company, user=self.member)
+
+        for index, visibility in enumerate(RepositoryVisibility.values * 3):
+            Repository.objects.create(
+                owner_company=self.company,
+                created_by=self.member,
+                name=f"company-{index}",
+                visibility=visibility,
+            )
+            Repository.objects.create(
+                owner_user=self.owner,
+                created_by=self.owner,
+                name=f"personal-{index}",
+                visibility=visibility,
+            )
+
+    def test_permissions_match_single_checks(self):
+        repositories = list(Repository.objects.order_by("id"))
+
+        for user in (self.owner, self.member, self.other):
+            data = serialize_repositories(repositories, user)
+
+            for repository, item in zip(repositories, data):
+                self.assertEqual(item["can_view"], can_view_repository(user, repository))
+                self.assertEqual(item["can_edit"], can_edit_repository(user, repository))
+                self.assertEqual(item["can_delete"], can_delete_repository(user, repository))
+
+    def test_query_count_does_not_depend_on_list_size(self):
+        repositories = Repository.objects.select_related(*REPOSITORY_RELATED_FIELDS).order_by("id")
+
+        # 1 — repositories, 1 — компании пользователя
+        with self.assertNumQueries(2):
+            serialize_repositories(repositories, self.member)
+
+
+# =========================================================
+# REPOSITORY ACCESS TABLE
+# =========================================================
+class RepositoryAccessTests(TestCase):
+    """
+    RepositoryAccess поддерживается сигналами,
+    а visible_to совпадает с can_view_repository после любых изменений членства и владельцев.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.member = User.objects.create_user(username="member", email="member@example.com", password="pass")
+        self.other = User.objects.create_user(username="other", email="other@example.com", password="pass")
+        self.company = Company.objects.create(owner=self.owner, name="Acme")
+        self.membership = CompanyMember.objects.create(company=self.company, user=self.member)
+
+        self.company_repository = Repository.objects.create(
+            owner_company=self.company,
+            created_by=self.owner,
+            name="company",
+            visibility=RepositoryVisibility.PRIVATE,
+        )
+        self.personal_repository = Repository.objects.create(
+            owner_user=self.other,
+            created_by=self.other,
+            name="personal",
+            visibility=RepositoryVisibility.PRIVATE,
+        )
+        self.public_repository = Repository.objects.create(
+            owner_user=self.owner,
+            created_by=self.owner,
+            name="public",
+            visibility=RepositoryVisibility.PUBLIC,
+        )
+
+    def assertVisibilityMatches(self):
+        for user in (self.owner, self.member, self.other):
+            expected = {
+                repository.id
+                for repository in Repository.objects.all()
+                if can_view_repository(user, repository)
+            }
+            visible = set(Repository.objects.visible_to(user).values_list("id", flat=True))
+            self.assertEqual(visible, expected, user.username)
+
+    def test_initial_access(self):
+        self.assertVisibilityMatches()
+
+        owner_access = RepositoryAccess.objects.get(user=self.owner, repository=self.company_repository)
+        member_access = RepositoryAccess.objects.get(user=self.member, repository=self.company_repository)
+        self.assertTrue(owner_access.can_delete)
+        self.assertTrue(member_access.can_edit)
+        self.assertFalse(member_access.can_delete)
+
+    def test_membership_changes(self):
+        CompanyMember.objects.create(company=self.company, user=self.other)
+        self.assertVisibilityMatches()
+
+        self.membership.delete()
+        self.assertVisibilityMatches()
+        self.assertFalse(RepositoryAccess.objects.filter(user=self.member).exists())
+
+    def test_owner_changes(self):
+        self.company.owner = self.other
+        self.company.save()
+        self.assertVisibilityMatches()
+
+        self.personal_repository.owner_user = self.member
+        self.personal_repository.save()
+        self.assertVisibilityMatches()
+
+    def test_rebuild_command(self):
+        RepositoryAccess.objects.all().delete()
+
+        call_command("rebuild_repository_access", batch_size=1, stdout=io.StringIO())
+
+        self.assertVisibilityMatches()
+        self.assertEqual(RepositoryAccess.objects.count(), 4)
+
+
+# =========================================================
+# COMPANY MEMBER COUNT
+# =========================================================
+class CompanyMemberCountTests(TestCase):
+    """
+    Company.member_count совпадает с числом CompanyMember после любых изменений.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.member = User.objects.create_user(username="member", email="member@example.com", password="pass")
+        self.company = Company.objects.create(owner=self.owner, name="Acme")
+        CompanyMember.objects.create(company=self.company, user=self.owner)
+
+    def assertCountMatches(self):
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.member_count, CompanyMember.objects.filter(company=self.company).count())
+
+    def test_create_and_delete(self):
+        membership = CompanyMember.objects.create(company=self.company, user=self.member)
+        self.assertCountMatches()
+        self.assertEqual(self.company.member_count, 2)
+
+        membership.delete()
+        self.assertCountMatches()
+
+    def test_invite_accept_and_queryset_delete(self):
+        invite = CompanyInvite.create_invite(self.company, self.member, self.owner)
+        invite.accept(self.member)
+        self.assertCountMatches()
+        self.assertEqual(self.company.member_count, 2)
+
+        CompanyMember.objects.filter(company=self.company, user=self.member).delete()
+        self.assertCountMatches()
+        self.assertEqual(self.company.member_count, 1)
+
+    def test_reconcile_command(self):
+        Company.objects.filter(id=self.company.id).update(member_count=10)
+
+        call_command("reconcile_company_member_counts", stdout=io.StringIO())
+
+        self.assertCountMatches()
+
+    def test_list_serialization_query_count(self):
+        for index in range(5):
+            Company.objects.create(owner=self.owner, name=f"Company {index}")
+
+        # 1 — компании, 1 — owner, 1 — компании пользователя
+        with self.assertNumQueries(3):
+            data = serialize_companies(Company.objects.order_by("name"), self.member)
+
+        self.assertEqual(len(data), 6)
+        self.assertTrue(all(not item["is_member"] for item in data))
+
+
+# =========================================================
+# REPOSITORY STATS
+# =========================================================
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class RepositoryStatsTests(TestCase):
+    """
+    Статистика repository обновляется коммитами и откатом без пересчёта истории.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.repository = Repository.objects.create(owner_user=self.owner, created_by=self.owner, name="repo")
+
+    def commit(self, files=(), delete_paths=()):
+        commit, _changed = create_repository_commit(
+            repository=self.repository,
+            user=self.owner,
+            message="change",
+            uploaded_files=[SimpleUploadedFile(path, content) for path, content in files],
+            paths=[path for path, _content in files],
+            delete_paths=list(delete_paths),
+        )
+        return commit
+
+    def assertStats(self, file_count, total_size, commit_count):
+        self.repository.refresh_from_db()
+        self.assertEqual(self.repository.file_count, file_count)
+        self.assertEqual(self.repository.total_size, total_size)
+        self.assertEqual(self.repository.commit_count, commit_count)
+
+    def test_commits_update_stats(self):
+        first = self.commit([("a.txt", b"alpha"), ("b.txt", b"bb")])
+        self.assertStats(2, 7, 1)
+        self.assertEqual(self.repository.last_commit_at, first.created_at)
+        self.assertEqual(self.repository.last_commit_by_id, self.owner.id)
+
+        self.commit([("a.txt", b"a")], delete_paths=["b.txt", "missing.txt"])
+        self.assertStats(1, 1, 2)
+
+    def test_revert_updates_stats(self):
+        first = self.commit([("a.txt", b"alpha"), ("b.txt", b"bb")])
+        self.commit([("c.txt", b"charlie")], delete_paths=["a.txt"])
+        self.assertStats(2, 9, 2)
+
+        response = self.client.post(
+            f"/api/repositories/{self.repository.id}/commits/{first.id}/revert/",
+            data={},
+            content_type="application/json",
+            **auth_header(self.owner),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertStats(2, 7, 3)
+
+    def test_sort_by_recently_updated(self):
+        other = Repository.objects.create(owner_user=self.owner, created_by=self.owner, name="another")
+        self.commit([("a.txt", b"alpha")])
+
+        response = self.client.get("/api/repositories/my/?sort=updated", **auth_header(self.owner))
+
+        self.assertEqual([item["id"] for item in response.json()], [self.repository.id, other.id])
+        self.assertEqual(response.json()[0]["file_count"], 1)
+
+
+# =========================================================
+# SEARCH
+# =========================================================
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SearchTests(TestCase):
+    """
+    Поиск по repository, коммитам и путям: индекс обновляется при записи,
+    выдача учитывает видимость repository.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        reset_fallback_index()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.other = User.objects.create_user(username="other", email="other@example.com", password="pass")
+        self.repository = Repository.objects.create(
+            owner_user=self.owner,
+            created_by=self.owner,
+            name="Sketch engine",
+            description="Vector drawing core",
+        )
+        create_repository_commit(
+            repository=self.repository,
+            user=self.owner,
+            message="Add brush renderer",
+            uploaded_files=[SimpleUploadedFile("brush_renderer.py", b"pass")],
+            paths=["src/brush_renderer.py"],
+        )
+
+    def titles(self, user, query, **kwargs):
+        return [(document.kind, document.title) for document in search_documents(user, query, **kwargs)]
+
+    def test_finds_repository_commit_and_path(self):
+        self.assertEqual(self.titles(self.owner, "vector"), [("repository", "Sketch engine")])
+        self.assertIn(("commit", "Add brush renderer"), self.titles(self.owner, "brush"))
+        self.assertIn(("file", "src/brush_renderer.py"), self.titles(self.owner, "src rend", kinds=["file"]))
+
+    def test_respects_visibility(self):
+        self.assertEqual(self.titles(self.other, "brush"), [])
+
+        self.repository.visibility = RepositoryVisibility.PUBLIC
+        self.repository.save()
+
+        self.assertIn(("commit", "Add brush renderer"), self.titles(self.other, "brush"))
+
+    def test_deleted_file_leaves_index(self):
+        self.titles(self.owner, "brush")  # индекс загружен до изменения
+
+        create_repository_commit(
+            repository=self.repository,
+            user=self.owner,
+            message="Remove",
+            delete_paths=["src/brush_renderer.py"],
+        )
+
+        self.assertEqual(self.titles(self.owner, "renderer", kinds=["file"]), [])
+
+    def test_migration_backfills_documents(self):
+        migration = importlib.import_module("api.migrations.0010_search_document")
+        SearchDocument.objects.all().delete()
+        reset_fallback_index()
+
+        migration.fill_search_documents(apps, SimpleNamespace(connection=connection))
+
+        self.assertEqual(self.titles(self.owner, "vector"), [("repository", "Sketch engine")])
+        self.assertIn(("commit", "Add brush renderer"), self.titles(self.owner, "brush"))
+        self.assertIn(("file", "src/brush_renderer.py"), self.titles(self.owner, "renderer", kinds=["file"]))
+
+    def test_rebuild_command_and_endpoint(self):
+        call_command("rebuild_search_index", stdout=io.StringIO())
+
+        response = self.client.get("/api/search/?q=sketch", **auth_header(self.owner))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["repository_id"], self.repository.id)
+
+
+# =========================================================
+# USER SEARCH
+# =========================================================
+class UserSearchTests(TestCase):
+    """
+    Поиск пользователей: сначала префикс, потом подстрока; ответ — короткая проекция.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        for username, email in [
+            ("anna", "anna@example.com"),
+            ("joanna", "jo@example.com"),
+            ("bob", "annabel@mail.com"),
+            ("carl", "carl@example.com"),
+        ]:
+            User.objects.create_user(username=username, email=email, password="pass")
+
+    def test_prefix_matches_come_first(self):
+        rows = search_user_rows("ANNA")
+
+        self.assertEqual([row["username"] for row in rows], ["anna", "bob", "joanna"])
+        self.assertEqual(set(rows[0]), {"id", "username", "email"})
+
+    def test_limit_and_empty_query(self):
+        self.assertEqual(len(search_user_rows("a", limit=2)), 2)
+        self.assertEqual(search_user_rows("   "), [])
+
+    def test_endpoint(self):
+        requester = User.objects.get(username="carl")
+
+        response = self.client.get("/api/users/search/?q=jo", **auth_header(requester))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["username"] for row in response.json()], ["joanna"])
+
+
+# =========================================================
+# TREE BROWSING
+# =========================================================
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class RepositoryTreeTests(TestCase):
+    """
+    Дерево по папкам: только непосредственные дети, агрегаты для папок,
+    HEAD из TreeEntry, старые коммиты из snapshot.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.repository = Repository.objects.create(owner_user=self.owner, created_by=self.owner, name="repo")
+        self.first = self.commit([
+            ("README.md", b"readme"),
+            ("src/app.py", b"app"),
+            ("src/ui/view.py", b"view!"),
+            ("src/ui/style.css", b"css"),
+        ])
+        self.second = self.commit([("src/app.py", b"app v2")], delete_paths=["src/ui/style.css"])
+
+    def commit(self, files=(), delete_paths=()):
+        commit, _changed = create_repository_commit(
+            repository=self.repository,
+            user=self.owner,
+            message="change",
+            uploaded_files=[SimpleUploadedFile(path.rsplit("/", 1)[-1], content) for path, content in files],
+            paths=[path for path, _content in files],
+            delete_paths=list(delete_paths),
+        )
+        return commit
+
+    def tree(self, ref, directory="", **params):
+        response = self.client.get(
+            f"/api/repositories/{self.repository.id}/tree/{ref}/{directory}",
+            params,
+            **auth_header(self.owner),
+        )
+        return response
+
+    def entries(self, ref, directory=""):
+        return [
+            (entry["type"], entry["name"], entry["size"], entry["file_count"])
+            for entry in self.tree(ref, directory).json()["entries"]
+        ]
+
+    def test_head_lists_immediate_children(self):
+        self.assertEqual(self.entries("HEAD"), [("dir", "src", 11, 2), ("file", "README.md", 6, 1)])
+        self.assertEqual(self.entries("HEAD", "src"), [("dir", "ui", 5, 1), ("file", "app.py", 6, 1)])
+        self.assertEqual(self.entries("HEAD", "src/ui/"), [("file", "view.py", 5, 1)])
+
+    def test_old_commit_uses_snapshot(self):
+        self.assertEqual(self.entries(f"id:{self.first.id}", "src/ui"), [("file", "style.css", 3, 1), ("file", "view.py", 5, 1)])
+        self.assertEqual(self.entries(self.first.commit_hash[:12]), [("dir", "src", 11, 3), ("file", "README.md", 6, 1)])
+
+    def test_commit_ref_rules(self):
+        Commit.objects.filter(id=self.first.id).update(commit_hash="1234567a" + "0" * 56)
+        Commit.objects.filter(id=self.second.id).update(commit_hash="1234567b" + "0" * 56)
+
+        self.assertEqual(self.tree("1234567").status_code, 409)
+        self.assertEqual(self.tree("123456").status_code, 400)
+        self.assertEqual(self.tree("not-a-ref").status_code, 400)
+        self.assertEqual(self.tree("1234567a").json()["commit_id"], self.first.id)
+        self.assertEqual(self.tree(f"{self.first.id:07d}").status_code, 404)
+        self.assertEqual(self.tree("id:999999").status_code, 404)
+
+    def test_empty_directory_is_removed(self):
+        self.commit(delete_paths=["src/ui/view.py"])
+
+        self.assertEqual(self.entries("HEAD", "src"), [("file", "app.py", 6, 1)])
+        self.assertEqual(self.tree("HEAD", "src/ui").status_code, 404)
+
+    def test_pagination(self):
+        for ref in ("HEAD", f"id:{self.first.id}"):
+            first_page = self.tree(ref, limit=1).json()
+            second_page = self.tree(ref, limit=1, cursor=first_page["next_cursor"]).json()
+
+            self.assertEqual([entry["name"] for entry in first_page["entries"]], ["src"])
+            self.assertEqual([entry["name"] for entry in second_page["entries"]], ["README.md"])
+            self.assertIsNone(second_page["next_cursor"])
+
+    def test_rebuild_matches_incremental(self):
+        fields = ("path", "is_dir", "size", "file_count", "commit_file_id")
+        incremental = sorted(TreeEntry.objects.values_list(*fields))
+
+        call_command("rebuild_repository_tree", stdout=io.StringIO())
+
+        self.assertEqual(sorted(TreeEntry.objects.values_list(*fields)), incremental)
+
+    def test_migration_backfill_matches_incremental(self):
+        fields = ("path", "is_dir", "size", "file_count", "commit_file_id")
+        incremental = sorted(TreeEntry.objects.values_list(*fields))
+        migration = importlib.import_module("api.migrations.0012_tree_entry")
+        TreeEntry.objects.all().delete()
+
+        migration.fill_tree_entries(apps, SimpleNamespace(connection=connection))
+
+        self.assertEqual(sorted(TreeEntry.objects.values_list(*fields)), incremental)
+
+    def test_commit_without_tree_rebuilds_it(self):
+        TreeEntry.objects.all().delete()
+
+        self.commit([("docs/guide.md", b"guide")])
+
+        self.assertEqual(
+            self.entries("HEAD"),
+            [("dir", "docs", 5, 1), ("dir", "src", 11, 2), ("file", "README.md", 6, 1)],
+        )
+        self.assertEqual(self.entries("HEAD", "src"), [("dir", "ui", 5, 1), ("file", "app.py", 6, 1)])
+
+
+# =========================================================
+# REPOSITORY DETAIL
+# =========================================================
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class RepositoryDetailTests(TestCase):
+    """
+    Detail repository: первые страницы дерева и коммитов, курсоры, ETag.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.repository = Repository.objects.create(owner_user=self.owner, created_by=self.owner, name="repo")
+
+        for index in range(3):
+            create_repository_commit(
+                repository=self.repository,
+                user=self.owner,
+                message=f"commit {index}",
+                uploaded_files=[SimpleUploadedFile(f"f{index}.txt", b"data")],
+                paths=[f"dir{index}/f{index}.txt"],
+            )
+
+        # автор удалён — коммит остаётся с created_by = NULL
+        ghost = User.objects.create_user(username="ghost", email="ghost@example.com", password="pass")
+        create_repository_commit(repository=self.repository, user=ghost, message="ghost", delete_paths=["dir0/f0.txt"])
+        ghost.delete()
+
+    def detail(self, **headers):
+        return self.client.get(
+            f"/api/repositories/{self.repository.id}/detail/?limit=1",
+            **auth_header(self.owner),
+            **headers,
+        )
+
+    def test_first_pages_and_cursors(self):
+        data = self.detail().json()
+
+        self.assertEqual([entry["name"] for entry in data["tree"]["entries"]], ["dir1"])
+        self.assertEqual([commit["message"] for commit in data["commits"]], ["ghost"])
+        self.assertIsNone(data["commits"][0]["created_by_username"])
+        self.assertEqual(data["head_commit_id"], data["commits"][0]["id"])
+
+        tree_page = self.client.get(
+            f"/api/repositories/{self.repository.id}/tree/HEAD/",
+            {"cursor": data["tree"]["next_cursor"]},
+            **auth_header(self.owner),
+        ).json()
+        commits_page = self.client.get(
+            f"/api/repositories/{self.repository.id}/commits/",
+            {"cursor": data["commits_next_cursor"], "limit": 1},
+            **auth_header(self.owner),
+        ).json()
+
+        self.assertEqual([entry["name"] for entry in tree_page["entries"]], ["dir2"])
+        self.assertEqual([commit["message"] for commit in commits_page["results"]], ["commit 2"])
+
+    def test_etag_changes_with_head_commit(self):
+        response = self.detail()
+        etag = response["ETag"]
+
+        self.assertEqual(self.detail(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        create_repository_commit(
+            repository=self.repository,
+            user=self.owner,
+            message="next",
+            uploaded_files=[SimpleUploadedFile("g.txt", b"data")],
+            paths=["g.txt"],
+        )
+
+        self.assertEqual(self.detail(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# =========================================================
+# FILE HISTORY
+# =========================================================
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class FileHistoryTests(TestCase):
+    """
+    История файла: версии новые первыми, переход через RENAMED, курсор через границу переименования.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.repository = Repository.objects.create(owner_user=self.owner, created_by=self.owner, name="repo")
+
+        self.commit([("a.txt", b"v1")])
+        self.commit([("a.txt", b"v2"), ("other.txt", b"x")])
+
+        rename = Commit.objects.create(
+            repository=self.repository,
+            created_by=self.owner,
+            message="rename",
+            commit_hash="r" * 64,
+        )
+        previous = CommitFile.objects.filter(path="a.txt").order_by("-commit_id").first()
+        CommitFile.objects.create(
+            commit=rename,
+            file=previous.file,
+            path="a.txt",
+            operation=CommitFileOperation.DELETED,
+        )
+        CommitFile.objects.create(
+            commit=rename,
+            file=File.objects.create(repository=self.repository, path="b.txt"),
+            path="b.txt",
+            previous_path="a.txt",
+            operation=CommitFileOperation.RENAMED,
+            blob=previous.blob,
+        )
+
+        self.commit([("b.txt", b"v3!")])
+
+    def commit(self, files):
+        create_repository_commit(
+            repository=self.repository,
+            user=self.owner,
+            message="change",
+            uploaded_files=[SimpleUploadedFile(path, content) for path, content in files],
+            paths=[path for path, _content in files],
+        )
+
+    def history(self, **params):
+        return self.client.get(
+            f"/api/repositories/{self.repository.id}/files/history/",
+            params,
+            **auth_header(self.owner),
+        )
+
+    def test_follows_renames(self):
+        results = self.history(path="b.txt").json()["results"]
+
+        self.assertEqual(
+            [(row["path"], row["operation"], row["size"]) for row in results],
+            [("b.txt", "modified", 3), ("b.txt", "renamed", 2), ("a.txt", "modified", 2), ("a.txt", "added", 2)],
+        )
+        self.assertEqual(results[1]["sha256"], results[2]["sha256"])
+
+    def test_pagination_across_rename(self):
+        seen = []
+        params = {"path": "b.txt", "limit": 2}
+
+        while True:
+            data = self.history(**params).json()
+            seen.extend((row["path"], row["operation"]) for row in data["results"])
+            if not data["next_cursor"]:
+                break
+            params = {"path": "b.txt", "limit": 2, "cursor": data["next_cursor"]}
+
+        self.assertEqual(seen, [("b.txt", "modified"), ("b.txt", "renamed"), ("a.txt", "modified"), ("a.txt", "added")])
+
+    def test_errors(self):
+        self.assertEqual(self.history(path="missing.txt").status_code, 404)
+        self.assertEqual(self.history(path="b.txt", cursor="broken").status_code, 400)
+
+
+# =========================================================
+# COMMIT PLANNING
+# =========================================================
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class CommitPlanningTests(TestCase):
+    """
+    Коммит сравнивается с HEAD по sha256: пропуск неизменённых файлов,
+    переименования, переиспользование blob, отказ в пустом коммите.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.repository = Repository.objects.create(owner_user=self.owner, created_by=self.owner, name="repo")
+        self.commit([("a.txt", b"alpha"), ("b.txt", b"bravo")])
+
+    def commit(self, files=(), delete_paths=()):
+        return create_repository_commit(
+            repository=self.repository,
+            user=self.owner,
+            message="change",
+            uploaded_files=[SimpleUploadedFile(path.rsplit("/", 1)[-1], content) for path, content in files],
+            paths=[path for path, _content in files],
+            delete_paths=list(delete_paths),
+        )
+
+    def test_unchanged_files_are_skipped(self):
+        _commit, changed = self.commit([("a.txt", b"alpha"), ("b.txt", b"bravo v2")])
+
+        self.assertEqual([(item["path"], item["operation"]) for item in changed], [("b.txt", "modified")])
+        self.assertEqual(FileBlob.objects.count(), 3)
+
+    def test_move_is_recorded_as_rename(self):
+        _commit, changed = self.commit([("docs/a.txt", b"alpha")], delete_paths=["a.txt"])
+
+        self.assertEqual(
+            [(item["path"], item["operation"]) for item in changed],
+            [("a.txt", "deleted"), ("docs/a.txt", "renamed")],
+        )
+        renamed = CommitFile.objects.get(path="docs/a.txt")
+        self.assertEqual(renamed.previous_path, "a.txt")
+        self.assertEqual(renamed.blob, CommitFile.objects.get(path="a.txt", operation="added").blob)
+        self.assertEqual(FileBlob.objects.count(), 2)
+
+    def test_same_content_reuses_blob(self):
+        self.commit([("copy.txt", b"alpha")])
+
+        self.assertEqual(FileBlob.objects.count(), 2)
+        self.assertEqual(CommitFile.objects.get(path="copy.txt").operation, "added")
+
+    def test_empty_commit_is_rejected(self):
+        commits_before = Commit.objects.count()
+
+        with self.assertRaises(ValidationError):
+            self.commit([("a.txt", b"alpha")], delete_paths=["missing.txt"])
+
+        response = self.client.post(
+            f"/api/repositories/{self.repository.id}/commits/create/",
+            {"message": "noop", "files": [SimpleUploadedFile("a.txt", b"alpha")], "paths": ["a.txt"]},
+            **auth_header(self.owner),
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Commit.objects.count(), commits_before)
+
+
+# =========================================================
+# COMMIT SUMMARY
+# =========================================================
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class CommitSummaryTests(TestCase):
+    """
+    Сводка изменений коммита считается при создании и восстанавливается backfill-командой.
+    """
+
+    summary_fields = ("added_count", "modified_count", "deleted_count", "renamed_count", "size_delta")
+
+    def setUp(self):
+        clear_session_cache()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.repository = Repository.objects.create(owner_user=self.owner, created_by=self.owner, name="repo")
+        self.first = self.commit([("a.txt", b"alpha"), ("b.txt", b"bravo")])
+        self.second = self.commit([("docs/a.txt", b"alpha"), ("b.txt", b"b")], delete_paths=["a.txt"])
+
+    def commit(self, files=(), delete_paths=()):
+        commit, _changed = create_repository_commit(
+            repository=self.repository,
+            user=self.owner,
+            message="change",
+            uploaded_files=[SimpleUploadedFile(path.rsplit("/", 1)[-1], content) for path, content in files],
+            paths=[path for path, _content in files],
+            delete_paths=list(delete_paths),
+        )
+        return commit
+
+    def summaries(self):
+        return list(Commit.objects.order_by("id").values_list(*self.summary_fields))
+
+    def test_summary_is_stored_at_creation(self):
+        self.assertEqual(self.summaries(), [(2, 0, 0, 0, 10), (0, 1, 1, 1, -4)])
+
+    def test_commits_endpoint_exposes_summary(self):
+        response = self.client.get(f"/api/repositories/{self.repository.id}/commits/", **auth_header(self.owner))
+
+        latest = response.json()["results"][0]
+        self.assertEqual(
+            [latest[field] for field in self.summary_fields],
+            [0, 1, 1, 1, -4],
+        )
+
+    def test_backfill(self):
+        expected = self.summaries()
+        Commit.objects.update(**{field: None for field in self.summary_fields})
+
+        call_command("backfill_commit_summaries", batch_size=1, stdout=io.StringIO())
+
+        self.assertEqual(self.summaries(), expected)
+
+
+# =========================================================
+# REFRESH TOKEN LOOKUP
+# =========================================================
+class RefreshTokenLookupTests(TestCase):
+    """
+    Refresh token "<selector>.<verifier>" находится одним индексным запросом;
+    старые сессии без selector отзываются миграцией 0015.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.request = RequestFactory().post("/api/auth/refresh/")
+
+    def test_lookup_by_selector(self):
+        raw_token, session = create_refresh_session(self.request, self.user)
+        selector, verifier = raw_token.split(".")
+
+        self.assertEqual(session.selector, selector)
+        self.assertNotIn(verifier, session.token_hash)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(find_refresh_session(raw_token), session)
+
+        self.assertIsNone(find_refresh_session(f"{selector}.wrong"))
+
+    def test_token_without_selector_is_rejected(self):
+        with mock.patch("api.utils.session.verify_token") as verify, self.assertNumQueries(0):
+            self.assertIsNone(find_refresh_session(secrets.token_urlsafe(64)))
+            self.assertIsNone(find_refresh_session(".verifier"))
+
+        verify.assert_not_called()
+
+    def test_migration_revokes_sessions_without_selector(self):
+        migration = importlib.import_module("api.migrations.0015_refresh_session_selector")
+        legacy = AuthRefreshSession.objects.create(
+            user=self.user,
+            token_hash=hash_token(secrets.token_urlsafe(64)),
+            expires_at=timezone.now() + timezone.timedelta(days=1),
+        )
+        raw_token, session = create_refresh_session(self.request, self.user)
+
+        migration.revoke_legacy_sessions(apps, SimpleNamespace(connection=connection))
+
+        legacy.refresh_from_db()
+        session.refresh_from_db()
+        self.assertIsNotNone(legacy.revoked_at)
+        self.assertIsNone(session.revoked_at)
+        self.assertEqual(find_refresh_session(raw_token), session)
+
+
+# =========================================================
+# ACCESS SESSION CACHE
+# =========================================================
+class SessionCacheTests(TestCase):
+    """
+    Access token проверяется по общему кэшу сессий;
+    revoke и изменение пользователя сразу удаляют запись из кэша.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.user = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        _, self.session = create_refresh_session(RequestFactory().post("/api/auth/login/"), self.user)
+        self.token = create_access_token(self.user, self.session)
+
+    def test_cache_hit_does_not_query_db(self):
+        parse_access_token(self.token)
+
+        with self.assertNumQueries(0):
+            user, session = parse_access_token(self.token)
+
+        self.assertEqual((user.id, session.id), (self.user.id, self.session.id))
+        self.assertNotIn("password", user.__dict__)
+        self.assertEqual(
+            {name: user.__dict__[name] for name in USER_FIELDS},
+            {name: getattr(self.user, name) for name in USER_FIELDS},
+        )
+
+    def test_revoked_session_is_rejected_immediately(self):
+        parse_access_token(self.token)
+
+        self.session.revoke()
+
+        self.assertIsNone(get_cached_session(self.session.id))
+        with self.assertRaises(AuthenticationFailed):
+            parse_access_token(self.token)
+
+    def test_deactivated_user_is_rejected_immediately(self):
+        parse_access_token(self.token)
+
+        self.user.is_active = False
+        self.user.save(update_fields=["is_active"])
+
+        with self.assertRaises(AuthenticationFailed):
+            parse_access_token(self.token)
+
+    def test_last_login_update_keeps_cache(self):
+        parse_access_token(self.token)
+
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=["last_login"])
+
+        self.assertIsNotNone(get_cached_session(self.session.id))
+
+    def test_record_for_other_fields_is_not_used(self):
+        # запись, сохранённая до изменения полей User
+        old_fields = USER_FIELDS[:-1]
+        with mock.patch.multiple(
+            "api.utils.session_cache",
+            USER_FIELDS=old_fields,
+            RECORD_VERSION=session_cache._fields_version(SESSION_FIELDS, old_fields),
+        ):
+            parse_access_token(self.token)
+
+        user, session = parse_access_token(self.token)
+
+        self.assertEqual((user.id, session.id), (self.user.id, self.session.id))
+        self.assertIsNotNone(get_cached_session(self.session.id))
+
+
+# =========================================================
+# LOGIN BACKEND
+# =========================================================
+class LoginBackendTests(TestCase):
+    """
+    Вход по username или email: один запрос и одна проверка пароля.
+    """
+
+    def setUp(self):
+        reset_rate_limits()
+        self.user = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+
+    def login(self, login, password="pass"):
+        return self.client.post("/api/auth/login/", {"login": login, "password": password}, content_type="application/json")
+
+    def test_login_by_username_or_email(self):
+        for login in ("owner", "OWNER@example.com"):
+            response = self.login(login)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["user"]["id"], self.user.id)
+
+        self.assertEqual(self.login("owner", "wrong").json()["error"], "invalid_credentials")
+
+    def test_password_is_checked_once(self):
+        with mock.patch.object(User, "check_password", autospec=True, return_value=False) as check_password:
+            self.login("owner@example.com", "wrong")
+
+        self.assertEqual(check_password.call_count, 1)
+
+    def test_unknown_user_still_hashes_password(self):
+        with mock.patch("api.backends.User.set_password", autospec=True) as set_password:
+            response = self.login("nobody", "pass")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set_password.call_count, 1)
+
+    @override_settings(PASSWORD_HASHERS=[
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.MD5PasswordHasher",
+    ])
+    def test_stale_hash_is_upgraded(self):
+        User.objects.filter(id=self.user.id).update(password=make_password("pass", hasher="md5"))
+
+        self.assertEqual(self.login("owner").status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+
+# =========================================================
+# RATE LIMITS
+# =========================================================
+@override_settings(RATE_LIMITS={"login": {"capacity": 2, "period_seconds": 60}})
+class RateLimitTests(TestCase):
+    """
+    Token bucket на login: ограничение по IP и по login, 429 с Retry-After.
+    """
+
+    def setUp(self):
+        reset_rate_limits()
+        User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+
+    def login(self, login, ip="10.0.0.1"):
+        return self.client.post(
+            "/api/auth/login/",
+            {"login": login, "password": "wrong"},
+            content_type="application/json",
+            REMOTE_ADDR=ip,
+        )
+
+    def test_limit_by_login(self):
+        statuses = [self.login("owner", ip=f"10.0.0.{index}").status_code for index in range(3)]
+        self.assertEqual(statuses, [400, 400, 429])
+
+        response = self.login("OWNER", ip="10.0.0.9")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()["error"], "rate_limited")
+        self.assertEqual(response["Retry-After"], "30")
+
+        self.assertEqual(get_rate_limit_counters(), {"login.allowed": 2, "login.limited": 2})
+
+    def test_limit_by_ip(self):
+        statuses = [self.login(f"user{index}").status_code for index in range(3)]
+        self.assertEqual(statuses, [400, 400, 429])
+
+        self.assertEqual(self.login("owner", ip="10.0.0.2").status_code, 400)
+
+    def test_spoofed_forwarded_for_does_not_reset_ip_bucket(self):
+        statuses = [
+            self.client.post(
+                "/api/auth/login/",
+                {"login": f"user{index}", "password": "wrong"},
+                content_type="application/json",
+                REMOTE_ADDR="10.0.0.1",
+                HTTP_X_FORWARDED_FOR=f"192.0.2.{index}",
+            ).status_code
+            for index in range(3)
+        ]
+
+        self.assertEqual(statuses, [400, 400, 429])
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_trusted_proxy_hop_is_used(self):
+        request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="192.0.2.1, 198.51.100.7")
+        self.assertEqual(get_client_ip(request), "198.51.100.7")
+
+        request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(get_client_ip(request), "10.0.0.1")
+
+    def test_unconfigured_scope_is_not_limited(self):
+        for _ in range(5):
+            response = self.client.post("/api/auth/refresh/")
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_non_string_body_is_rejected(self):
+        for body in ({"login": 123, "password": "wrong"}, ["owner"], {"login": ["owner"]}):
+            response = self.client.post("/api/auth/login/", body, content_type="application/json")
+            self.assertIn(response.status_code, (400, 429))
+
+    def test_counters_endpoint_is_admin_only(self):
+        self.login("owner")
+        admin = User.objects.create_user(username="admin", email="admin@example.com", password="pass", role=UserRole.ADMIN)
+        user = User.objects.get(username="owner")
+
+        self.assertEqual(self.client.get("/api/auth/rate-limits/", **auth_header(user)).status_code, 403)
+
+        response = self.client.get("/api/auth/rate-limits/", **auth_header(admin))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"counters": {"login.allowed": 1}})
+
+
+# =========================================================
+# REFRESH SESSION REAPER
+# =========================================================
+class RefreshSessionReaperTests(TestCase):
+    """
+    Истёкшие и давно отозванные сессии удаляются пачками, активные остаются.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        now = timezone.now()
+        day = timezone.timedelta(days=1)
+
+        def session(token, expires_at, revoked_at=None):
+            return AuthRefreshSession.objects.create(
+                user=self.user,
+                token_hash=token,
+                expires_at=expires_at,
+                revoked_at=revoked_at,
+            )
+
+        self.active = session("active", now + day)
+        self.recently_revoked = session("recently-revoked", now + day, revoked_at=now)
+        for index in range(3):
+            session(f"expired-{index}", now - 10 * day)
+        session("revoked", now + day, revoked_at=now - 10 * day)
+
+    def test_reap(self):
+        with mock.patch("api.signals._invalidate_sessions") as per_row, \
+                mock.patch("api.utils.session.invalidate_sessions") as per_batch:
+            self.assertEqual(reap_refresh_sessions(retention_seconds=7 * 24 * 60 * 60, batch_size=2), 4)
+
+        per_row.assert_not_called()
+        self.assertEqual([len(call.args[0]) for call in per_batch.call_args_list], [2, 2])
+
+        self.assertEqual(
+            set(AuthRefreshSession.objects.values_list("id", flat=True)),
+            {self.active.id, self.recently_revoked.id},
+        )
+
+    def test_commands(self):
+        out = io.StringIO()
+        call_command("reap_refresh_sessions", batch_size=2, stdout=out)
+        self.assertIn("Deleted 4", out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command("partition_refresh_sessions", stdout=io.StringIO())
+
+
+# =========================================================
+# MEMBERSHIP CLAIMS
+# =========================================================
+class MembershipClaimsTests(TestCase):
+    """
+    Access token несёт компании пользователя: права на repository проверяются без запросов,
+    а изменение членства делает старый token недействительным.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.member = User.objects.create_user(username="member", email="member@example.com", password="pass")
+        self.company = Company.objects.create(owner=self.owner, name="Acme")
+        CompanyMember.objects.create(company=self.company, user=self.member)
+        self.repository = Repository.objects.create(
+            owner_company=self.company,
+            created_by=self.owner,
+            name="company",
+            visibility=RepositoryVisibility.PRIVATE,
+        )
+
+    def parse(self, user):
+        token = auth_header(user)["HTTP_AUTHORIZATION"].split(" ", 1)[1]
+        return token, parse_access_token(token)[0]
+
+    def test_permissions_from_claims(self):
+        _, member = self.parse(self.member)
+        _, owner = self.parse(self.owner)
+        repository = Repository.objects.get(id=self.repository.id)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(can_view_repository(member, repository))
+            self.assertTrue(can_edit_repository(member, repository))
+            self.assertEqual(get_user_company_ids(owner), ({self.company.id}, {self.company.id}))
+
+    def test_membership_change_invalidates_token(self):
+        token, _ = self.parse(self.member)
+        version = User.objects.get(id=self.member.id).membership_version
+
+        CompanyMember.objects.filter(user=self.member).delete()
+
+        self.assertEqual(User.objects.get(id=self.member.id).membership_version, version + 1)
+        with self.assertRaises(AuthenticationFailed) as error:
+            parse_access_token(token)
+        self.assertEqual(error.exception.detail, "membership_changed")
+
+        _, member = self.parse(self.member)
+        self.assertFalse(can_view_repository(member, self.repository))
+
+    def test_owner_change_bumps_both_owners(self):
+        versions = dict(User.objects.values_list("id", "membership_version"))
+
+        self.company.owner = self.member
+        self.company.save()
+
+        self.assertEqual(
+            dict(User.objects.values_list("id", "membership_version")),
+            {user_id: version + 1 for user_id, version in versions.items()},
+        )
+
+
+# =========================================================
+# REQUEST ACCESS
+# =========================================================
+class RequestAccessTests(TestCase):
+    """
+    Access token разбирается один раз за запрос, решения о правах кэшируются в пределах запроса.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.repository = Repository.objects.create(
+            owner_user=self.owner,
+            created_by=self.owner,
+            name="personal",
+            visibility=RepositoryVisibility.PRIVATE,
+        )
+
+    def test_token_is_parsed_once_per_request(self):
+        request = RequestFactory().get("/api/repositories/", **auth_header(self.owner))
+
+        with mock.patch("api.utils.auth_service.parse_access_token", wraps=parse_access_token) as parse:
+            first, _ = get_user_from_request_data(request)
+            second, _ = get_user_from_request_data(request)
+
+        self.assertEqual(parse.call_count, 1)
+        self.assertIs(first, second)
+        self.assertIs(get_request_access(request).session.user, first)
+
+    def test_middleware_attaches_lazy_access(self):
+        with mock.patch("api.utils.auth_service.parse_access_token", wraps=parse_access_token) as parse:
+            response = self.client.get(f"/api/repositories/{self.repository.id}/", **auth_header(self.owner))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(parse.call_count, 1)
+
+        # view без авторизации token не разбирает
+        with mock.patch("api.utils.auth_service.parse_access_token") as parse:
+            response = self.client.get("/api/faq/answered/", **auth_header(self.owner))
+
+        self.assertEqual(response.status_code, 200)
+        parse.assert_not_called()
+
+    def test_permission_resolver_is_shared_per_request(self):
+        request = RequestFactory().get("/api/repositories/", **auth_header(self.owner))
+        user, _ = get_user_from_request_data(request)
+
+        self.assertTrue(can_edit_repository(user, self.repository))
+        self.assertIs(
+            get_request_access(request).permission_cache[PermissionResolver],
+            get_permission_resolver(user),
+        )
+
+        self.repository.owner_user = User.objects.create_user(username="other", email="other@example.com")
+        self.assertFalse(can_edit_repository(user, self.repository))
+
+
+# =========================================================
+# PERMISSION RESOLVER
+# =========================================================
+class PermissionResolverTests(TestCase):
+    """
+    Компании пользователя загружаются один раз, все проверки дальше — в памяти.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.member = User.objects.create_user(username="member", email="member@example.com", password="pass")
+        self.company = Company.objects.create(owner=self.owner, name="Acme")
+        CompanyMember.objects.create(company=self.company, user=self.owner)
+        CompanyMember.objects.create(company=self.company, user=self.member)
+
+        self.repositories = [
+            Repository.objects.create(
+                owner_company=self.company,
+                created_by=self.owner,
+                name=f"company-{visibility}",
+                visibility=visibility,
+            )
+            for visibility in RepositoryVisibility.values
+        ] + [
+            Repository.objects.create(
+                owner_user=user,
+                created_by=user,
+                name=f"personal-{user.username}",
+                visibility=RepositoryVisibility.PRIVATE,
+            )
+            for user in (self.owner, self.member)
+        ]
+
+    def test_matches_single_checks_with_one_query(self):
+        expected = {
+            repository.id: (
+                can_view_repository(self.member, repository),
+                can_edit_repository(self.member, repository),
+                can_delete_repository(self.member, repository),
+            )
+            for repository in self.repositories
+        }
+
+        resolver = PermissionResolver(self.member)
+        with self.assertNumQueries(1):
+            self.assertEqual(resolver.check_repositories(self.repositories), expected)
+            self.assertTrue(resolver.is_company_member(self.company))
+            self.assertFalse(resolver.can_manage_company(self.company))
+
+    def test_personal_and_public_checks_do_not_load_companies(self):
+        resolver = PermissionResolver(self.member)
+
+        with self.assertNumQueries(0):
+            for repository in self.repositories:
+                if repository.is_personal or repository.visibility == RepositoryVisibility.PUBLIC:
+                    resolver.can_view_repository(repository)
+
+    def test_create_company_sees_new_membership(self):
+        response = self.client.post(
+            "/api/companies/create/",
+            data={"name": "Globex"},
+            content_type="application/json",
+            **auth_header(self.member),
+        )
+
+        self.assertEqual(response.status_code, 201)
+        company = response.json()["company"]
+        self.assertTrue(company["is_member"])
+        self.assertTrue(company["can_manage"])
+
+
+# =========================================================
+# NOTIFICATION EVENTS
+# =========================================================
+class NotificationEventsTests(TestCase):
+    """
+    SSE-поток ждёт событий broker-а: изменения уведомлений приходят сразу после commit,
+    между ними идут heartbeat, сверх лимита соединений новое вытесняет самое старое.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.user = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.headers = {"Authorization": auth_header(self.user)["HTTP_AUTHORIZATION"]}
+
+        # свой broker на тест: незакрытые потоки не влияют на другие тесты
+        broker = mock.patch("api.utils.notification_broker._broker", InProcessBroker())
+        broker.start()
+        self.addCleanup(broker.stop)
+
+    def create_notification(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(recipient=self.user, title="Hello")
+
+    def mark_read(self, notification):
+        with self.captureOnCommitCallbacks(execute=True):
+            notification.mark_read()
+
+    async def test_stream_pushes_unread_count(self):
+        response = await self.async_client.get("/api/notifications/events/", headers=self.headers)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        content = aiter(response.streaming_content)
+        self.assertEqual(await anext(content), b"retry: 3000\n\n")
+        self.assertEqual(await anext(content), b"event: notifications_changed\ndata: 0\n\n")
+
+        notification = await sync_to_async(self.create_notification)()
+        self.assertEqual(await anext(content), b"event: notifications_changed\ndata: 1\n\n")
+
+        await sync_to_async(self.mark_read)(notification)
+        self.assertEqual(await anext(content), b"event: notifications_changed\ndata: 0\n\n")
+
+    @mock.patch("api.views.notifications.NOTIFICATION_HEARTBEAT_SECONDS", 0.01)
+    @mock.patch("api.views.notifications.NOTIFICATION_STREAM_MAX_SECONDS", 0.1)
+    async def test_heartbeat_and_stream_lifetime(self):
+        response = await self.async_client.get("/api/notifications/events/", headers=self.headers)
+        self.assertEqual(get_broker().connection_count(self.user.id), 1)
+
+        chunks = [chunk async for chunk in response.streaming_content]
+
+        self.assertIn(b": heartbeat\n\n", chunks[2:])
+        self.assertEqual(get_broker().connection_count(self.user.id), 0)
+
+    def test_requires_asgi(self):
+        response = self.client.get("/api/notifications/events/", headers=self.headers)
+
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(response.json(), {"error": "asgi_required"})
+
+    async def test_requires_token(self):
+        response = await self.async_client.get("/api/notifications/events/")
+
+        self.assertEqual(response.status_code, 401)
+
+    async def test_new_connection_evicts_oldest(self):
+        broker = InProcessBroker(max_per_user=2)
+        subscriptions = [broker.subscribe(self.user.id) for _ in range(3)]
+
+        self.assertEqual(broker.connection_count(self.user.id), 2)
+        self.assertEqual([subscription.evicted for subscription in subscriptions], [True, False, False])
+
+        subscriptions[0].close()
+        self.assertEqual(broker.connection_count(self.user.id), 2)
+
+    async def test_evicted_stream_ends(self):
+        get_broker().max_per_user = 1
+
+        first = await self.async_client.get("/api/notifications/events/", headers=self.headers)
+        second = await self.async_client.get("/api/notifications/events/", headers=self.headers)
+
+        self.assertEqual(second.status_code, 200)
+        chunks = [chunk async for chunk in first.streaming_content]
+        self.assertEqual(chunks, [b"retry: 3000\n\n", b"event: notifications_changed\ndata: 0\n\n"])
+        self.assertEqual(get_broker().connection_count(self.user.id), 1)
+
+
+# =========================================================
+# UNREAD NOTIFICATION COUNTER
+# =========================================================
+class NotificationCounterTests(TestCase):
+    """
+    NotificationCounter следует за созданием, прочтением и удалением уведомлений,
+    включая сценарии приглашений; reconcile исправляет расхождения.
+    """
+
+    def setUp(self):
+        clear_session_cache()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.member = User.objects.create_user(username="member", email="member@example.com", password="pass")
+        self.company = Company.objects.create(owner=self.owner, name="Acme")
+
+    def counters(self):
+        return {user.id: get_unread_count(user.id) for user in (self.owner, self.member)}
+
+    def test_create_read_delete(self):
+        first, second, third = [
+            Notification.objects.create(recipient=self.member, title=f"n{index}")
+            for index in range(3)
+        ]
+        self.assertEqual(get_unread_count(self.member.id), 3)
+
+        first.mark_read()
+        first.mark_read()
+        Notification.objects.get(id=second.id).delete()
+        first.delete()
+        self.assertEqual(get_unread_count(self.member.id), 1)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_unread_count(self.member.id), 1)
+
+        response = self.client.get("/api/notifications/unread-count/", **auth_header(self.member))
+        self.assertEqual(response.json(), {"unread_count": 1})
+
+    def test_stale_instances_mark_read_once(self):
+        Notification.objects.create(recipient=self.member, title="other")
+        notification = Notification.objects.create(recipient=self.member, title="n")
+        first = Notification.objects.get(id=notification.id)
+        second = Notification.objects.get(id=notification.id)
+
+        first.mark_read()
+        second.mark_read()
+        second.save()
+
+        self.assertEqual(get_unread_count(self.member.id), 1)
+        self.assertEqual(Notification.objects.get(id=notification.id).status, NotificationStatus.READ)
+
+    def test_concurrent_first_increment_is_not_lost(self):
+        # строку счётчика уже создал параллельный запрос, его подсчёт не видел нового уведомления
+        NotificationCounter.objects.create(user=self.member, unread_count=0)
+        update_counter = notification_counter._update_counter
+        calls = []
+
+        def update_after_race(user_id, delta):
+            calls.append(delta)
+            return 0 if len(calls) == 1 else update_counter(user_id, delta)
+
+        with mock.patch("api.utils.notification_counter._update_counter", side_effect=update_after_race):
+            notification_counter.change_unread_count(self.member.id, 1)
+
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(get_unread_count(self.member.id), 1)
+
+    def test_invite_flow(self):
+        invite = CompanyInvite.create_invite(self.company, self.member, self.owner)
+        self.assertEqual(self.counters(), {self.owner.id: 0, self.member.id: 1})
+
+        invite.accept(self.member)
+        self.assertEqual(self.counters(), {self.owner.id: 1, self.member.id: 0})
+
+    def test_reconcile(self):
+        for index in range(2):
+            Notification.objects.create(recipient=self.member, title=f"n{index}")
+        Notification.objects.create(recipient=self.owner, title="owner")
+
+        NotificationCounter.objects.filter(user=self.member).update(unread_count=7)
+        NotificationCounter.objects.filter(user=self.owner).delete()
+
+        out = io.StringIO()
+        call_command("reconcile_notification_counters", stdout=out)
+
+        self.assertIn("Fixed 2", out.getvalue())
+        self.assertEqual(
+            dict(NotificationCounter.objects.values_list("user_id", "unread_count")),
+            {self.member.id: 2, self.owner.id: 1},
+        )
@@ -6,6 +6,7 @@ from api.views.auth import (
     validate_token,
     refresh_token,
     logout_user,
+    rate_limit_stats,
 )
 
 urlpatterns = [
@@ -14,4 +15,5 @@ urlpatterns = [
     path("validate/", validate_token),
     path("refresh/", refresh_token),
     path("logout/", logout_user),
+    path("rate-limits/", rate_limit_stats),
 ]
\ No newline at end of file
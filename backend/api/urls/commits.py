@@ -0,0 +1,11 @@
+from django.urls import path
+
+from api.views.commits import download_commit_file, download_commit_files_batch, get_commit_files, get_commit_snapshot
+
+urlpatterns = [
+    path("commits/<int:commit_id>/files/", get_commit_files),
+    path("commits/<int:commit_id>/snapshot/", get_commit_snapshot),
+
+    path("commit-files/<int:commit_file_id>/download/", download_commit_file),
+    path("commit-files/batch/", download_commit_files_batch),
+]
@@ -1,6 +1,7 @@
 from django.urls import path
 from api.views.notifications import (
     get_notifications,
+    get_unread_notification_count,
     create_notification,
     notification_events,
     mark_notification_read,
@@ -9,6 +10,7 @@ from api.views.notifications import (
 
 urlpatterns = [
     path("list/", get_notifications),
+    path("unread-count/", get_unread_notification_count),
     path("create/", create_notification),
     path("events/", notification_events),
 
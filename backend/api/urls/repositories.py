@@ -5,7 +5,8 @@ from api.views.repositories import get_repositories, download_repository_file
 from api.views.commits import create_commit
 from api.views.repositories import revert_repository_to_commit, get_repository_commits, delete_repository_file, \
     get_repository_files, download_repository, get_repository, get_repository_detail, update_repository, \
-    delete_repository, get_my_repositories, get_public_repositories, create_repository,get_commit_snapshot
+    delete_repository, get_my_repositories, get_public_repositories, create_repository,get_commit_snapshot, \
+    get_repository_tree, get_repository_file_history
 
 urlpatterns = [
     path("list/", get_repositories),
@@ -25,6 +26,10 @@ urlpatterns = [
     path("<int:repository_id>/files/<int:file_id>/download/",download_repository_file),
 
     path("<int:repository_id>/files/", get_repository_files),
+    path("<int:repository_id>/files/history/", get_repository_file_history),
+
+    path("<int:repository_id>/tree/<str:ref>/", get_repository_tree),
+    path("<int:repository_id>/tree/<str:ref>/<path:directory>", get_repository_tree),
 
     path("<int:repository_id>/files/delete/", delete_repository_file),
 
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from api.views.search import search
+
+urlpatterns = [
+    path("", search),
+]
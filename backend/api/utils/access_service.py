@@ -0,0 +1,126 @@
+from django.db import transaction
+
+from api.models.companies import Company, CompanyMember
+from api.models.repositories import Repository, RepositoryAccess
+
+
+def _company_access_rows(owner_id, repository_ids, member_ids):
+    user_ids = set(member_ids) | {owner_id}
+
+    return [
+        RepositoryAccess(
+            user_id=user_id,
+            repository_id=repository_id,
+            can_edit=True,
+            can_delete=user_id == owner_id,
+        )
+        for repository_id in repository_ids
+        for user_id in user_ids
+    ]
+
+
+@transaction.atomic
+def rebuild_repository_access(repository):
+    """
+    Пересобирает строки доступа одного repository (создание, смена владельца).
+    """
+
+    RepositoryAccess.objects.filter(repository_id=repository.id).delete()
+
+    if repository.owner_user_id is not None:
+        RepositoryAccess.objects.create(
+            user_id=repository.owner_user_id,
+            repository_id=repository.id,
+            can_edit=True,
+            can_delete=True,
+        )
+        return
+
+    company = Company.objects.only("id", "owner_id").get(id=repository.owner_company_id)
+    member_ids = CompanyMember.objects.filter(company_id=company.id).values_list("user_id", flat=True)
+
+    RepositoryAccess.objects.bulk_create(
+        _company_access_rows(company.owner_id, [repository.id], member_ids)
+    )
+
+
+@transaction.atomic
+def rebuild_company_access(company):
+    """
+    Пересобирает строки доступа всех repository компании (смена owner).
+    Возвращает число repository компании.
+    """
+
+    repository_ids = list(Repository.objects.filter(owner_company_id=company.id).values_list("id", flat=True))
+    if not repository_ids:
+        return 0
+
+    member_ids = CompanyMember.objects.filter(company_id=company.id).values_list("user_id", flat=True)
+
+    RepositoryAccess.objects.filter(repository_id__in=repository_ids).delete()
+    RepositoryAccess.objects.bulk_create(
+        _company_access_rows(company.owner_id, repository_ids, member_ids)
+    )
+
+    return len(repository_ids)
+
+
+def grant_company_member_access(company_id, user_id):
+    """
+    Новый участник получает can_edit на все repository компании.
+    """
+
+    repository_ids = Repository.objects.filter(owner_company_id=company_id).values_list("id", flat=True)
+
+    RepositoryAccess.objects.bulk_create(
+        [
+            RepositoryAccess(user_id=user_id, repository_id=repository_id, can_edit=True)
+            for repository_id in repository_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def revoke_company_member_access(company_id, user_id):
+    """
+    Бывший участник теряет доступ к repository компании.
+
+    Owner компании доступ не теряет: он участник по Company.owner, а не по CompanyMember.
+    """
+
+    if Company.objects.filter(id=company_id, owner_id=user_id).exists():
+        return
+
+    RepositoryAccess.objects.filter(user_id=user_id, repository__owner_company_id=company_id).delete()
+
+
+def rebuild_all_repository_access(batch_size=500):
+    """
+    Полная пересборка таблицы доступа пачками. Возвращает число обработанных repository.
+    """
+
+    count = 0
+    personal = Repository.objects.filter(owner_user__isnull=False).order_by("id").values_list("id", "owner_user_id")
+    last_id = 0
+
+    while True:
+        rows = list(personal.filter(id__gt=last_id)[:batch_size])
+        if not rows:
+            break
+
+        with transaction.atomic():
+            RepositoryAccess.objects.filter(repository_id__in=[repository_id for repository_id, _ in rows]).delete()
+            RepositoryAccess.objects.bulk_create(
+                [
+                    RepositoryAccess(user_id=user_id, repository_id=repository_id, can_edit=True, can_delete=True)
+                    for repository_id, user_id in rows
+                ]
+            )
+
+        count += len(rows)
+        last_id = rows[-1][0]
+
+    for company in Company.objects.only("id", "owner_id").iterator(chunk_size=batch_size):
+        count += rebuild_company_access(company)
+
+    return count
@@ -6,24 +6,76 @@ from api.utils.session import get_bearer_token
 from api.utils.token import parse_access_token
 
 
+class RequestAccess:
+    """
+    Результат проверки access token для одного запроса.
+
+    - token разбирается лениво, при первом обращении, и только один раз за запрос;
+    - permission_cache — решения о правах в пределах запроса,
+      тот же dict доступен как user.permission_cache (см. api/models/companies.py).
+    """
+
+    def __init__(self, request):
+        self._request = request
+        self._resolved = False
+        self.user = None
+        self.session = None
+        self.error_code = None
+        self.permission_cache = {}
+
+    def resolve(self):
+        if self._resolved:
+            return self
+
+        self._resolved = True
+        token = get_bearer_token(self._request)
+
+        if not token:
+            self.error_code = "missing"
+            return self
+
+        try:
+            self.user, self.session = parse_access_token(token)
+        except AuthenticationFailed as exc:
+            self.error_code = str(exc.detail)
+            return self
+
+        self.user.permission_cache = self.permission_cache
+        return self
+
+
+def get_request_access(request):
+    """
+    RequestAccess запроса. Обычно его создаёт AccessTokenMiddleware;
+    без middleware (RequestFactory, прямой вызов view) создаётся здесь же.
+    """
+
+    # DRF Request читает атрибуты из HttpRequest, но записывает в себя — храним на HttpRequest
+    request = getattr(request, "_request", request)
+
+    access = getattr(request, "access", None)
+    if access is None:
+        access = request.access = RequestAccess(request)
+
+    return access.resolve()
+
+
 def get_user_from_access_token(request):
-    token = get_bearer_token(request)
+    access = get_request_access(request)
 
-    if not token:
+    if access.error_code == "missing":
         return None, Response(
             {"error": "Access token required"},
             status=status.HTTP_401_UNAUTHORIZED,
         )
 
-    try:
-        user, _session = parse_access_token(token)
-    except AuthenticationFailed as exc:
+    if access.error_code:
         return None, Response(
-            {"error": "Access token invalid", "code": str(exc.detail)},
+            {"error": "Access token invalid", "code": access.error_code},
             status=status.HTTP_401_UNAUTHORIZED,
         )
 
-    return user, None
+    return access.user, None
 
 
 def get_user_from_request_data(request):
@@ -0,0 +1,79 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from api.utils.constants import BLOB_PREFETCH_MAX_INFLIGHT_BYTES, BLOB_PREFETCH_WORKERS
+
+
+_MISSING = object()
+
+
+def read_blob(blob):
+    """
+    Читает содержимое FileBlob целиком.
+
+    Файл открывается напрямую через storage, а не через blob.blob.open():
+    FieldFile хранит открытый handle в себе и не рассчитан на чтение из нескольких потоков.
+    """
+
+    with blob.blob.storage.open(blob.blob.name, "rb") as file_handle:
+        return file_handle.read()
+
+
+def prefetch_blobs(
+    items,
+    get_blob=None,
+    read=read_blob,
+    workers=BLOB_PREFETCH_WORKERS,
+    max_inflight_bytes=BLOB_PREFETCH_MAX_INFLIGHT_BYTES,
+):
+    """
+    Отдаёт пары (item, content) строго в порядке items, читая blob-ы заранее в пуле потоков.
+
+    Пока вызывающий код сжимает и отдаёт текущую запись, следующие workers blob-ов уже читаются.
+
+    Ограничения:
+    - одновременно читается/ждёт отдачи не больше workers blob-ов;
+    - их суммарный size не больше max_inflight_bytes;
+    - blob больше лимита читается только когда очередь пуста, поэтому он всё равно будет отдан;
+    - если get_blob(item) вернул None, item отдаётся с content=None без чтения.
+
+    Используется для сборки архивов и любых других проходов по многим blob-ам подряд.
+    """
+
+    get_blob = get_blob or (lambda item: item)
+    items = iter(items)
+    pending = deque()
+    inflight_bytes = 0
+    next_item = _MISSING
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="blob-prefetch")
+
+    try:
+        while True:
+            while len(pending) < max(1, workers):
+                if next_item is _MISSING:
+                    next_item = next(items, _MISSING)
+                    if next_item is _MISSING:
+                        break
+
+                blob = get_blob(next_item)
+                size = blob.size if blob is not None else 0
+
+                if pending and inflight_bytes + size > max_inflight_bytes:
+                    break
+
+                future = executor.submit(read, blob) if blob is not None else None
+                pending.append((next_item, future, size))
+                inflight_bytes += size
+                next_item = _MISSING
+
+            if not pending:
+                return
+
+            item, future, size = pending.popleft()
+            content = future.result() if future is not None else None
+            inflight_bytes -= size
+
+            yield item, content
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
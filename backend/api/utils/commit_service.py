@@ -1,39 +1,113 @@
 from api.models.commit import Commit, CommitFile
 from api.models.content import FileBlob, File
+from api.models.repositories import Repository
 
+from django.core import signing
+from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
+from django.db.models import F
+from django.utils import timezone
 import hashlib
 import mimetypes
 
 from api.choices import CommitFileOperation
+from api.utils.constants import FILE_HISTORY_CURSOR_SALT
+from api.utils.pagination import InvalidCursor
 from api.utils.repository_service import build_commit_hash, get_latest_commit, get_current_repository_file_versions
+from api.utils.tree_service import apply_tree_changes
 
 
-def get_commit_snapshot_files(commit):
-    repository = commit.repository
+def get_commit_snapshot_files(commit, path_filter=None):
+    """
+    Состояние файлов репозитория на момент commit.
 
-    commits = repository.commits.filter(
-        id__lte=commit.id
-    ).order_by("id")
+    path_filter (см. build_path_filter) применяется в БД,
+    поэтому для поддерева не загружаются строки остальных файлов.
+    """
 
-    files_map = {}
+    rows = CommitFile.objects.filter(
+        commit__repository_id=commit.repository_id,
+        commit_id__lte=commit.id,
+    )
 
-    for c in commits:
-        rows = CommitFile.objects.filter(
-            commit=c
-        ).select_related("blob", "file")
+    if path_filter is not None:
+        rows = rows.filter(path_filter)
 
-        for row in rows:
-            if row.operation == CommitFileOperation.DELETED:
-                files_map.pop(row.path, None)
-            else:
-                files_map[row.path] = row
+    rows = rows.select_related("blob", "file").order_by("commit_id", "id")
+
+    files_map = {}
+
+    for row in rows:
+        if row.operation == CommitFileOperation.DELETED:
+            files_map.pop(row.path, None)
+        else:
+            files_map[row.path] = row
 
     return list(files_map.values())
 
-def _serialize_commit_file(commit_file, file_obj, blob=None):
+REPOSITORY_STATS_FIELDS = ("file_count", "total_size", "commit_count", "last_commit_at", "last_commit_by", "updated_at")
+
+
+def live_file_sizes(file_versions):
+    """
+    {path: size} для живых файлов (результат get_current_repository_file_versions или snapshot).
+    """
+
     return {
-        "file_id": file_obj.id,
+        commit_file.path: commit_file.blob.size if commit_file.blob_id else 0
+        for commit_file in file_versions
+        if commit_file.operation != CommitFileOperation.DELETED
+    }
+
+
+def record_commit_stats(repository, commit, before, after):
+    """
+    Инкрементально обновляет статистику repository после commit.
+
+    before/after — {path: size} до и после коммита.
+    Обновление одним UPDATE с F(), поэтому параллельные коммиты не теряют изменения.
+    updated_at тоже обновляется: по нему сортируется список "недавно обновлённые".
+    """
+
+    Repository.objects.filter(id=repository.id).update(
+        file_count=F("file_count") + (len(after) - len(before)),
+        total_size=F("total_size") + (sum(after.values()) - sum(before.values())),
+        commit_count=F("commit_count") + 1,
+        last_commit_at=commit.created_at,
+        last_commit_by_id=commit.created_by_id,
+        updated_at=timezone.now(),
+    )
+
+    repository.refresh_from_db(fields=REPOSITORY_STATS_FIELDS)
+
+
+COMMIT_SUMMARY_FIELDS = ("added_count", "modified_count", "deleted_count", "renamed_count", "size_delta")
+
+_SUMMARY_FIELD_BY_OPERATION = {
+    CommitFileOperation.ADDED: "added_count",
+    CommitFileOperation.MODIFIED: "modified_count",
+    CommitFileOperation.DELETED: "deleted_count",
+    CommitFileOperation.RENAMED: "renamed_count",
+}
+
+
+def build_commit_summary(operations, size_delta):
+    """
+    Поля сводки Commit: число строк каждого типа и изменение суммарного размера живых файлов.
+    """
+
+    summary = {field: 0 for field in COMMIT_SUMMARY_FIELDS}
+
+    for operation in operations:
+        summary[_SUMMARY_FIELD_BY_OPERATION[operation]] += 1
+
+    summary["size_delta"] = size_delta
+    return summary
+
+
+def _serialize_commit_file(commit_file, blob=None):
+    return {
+        "file_id": commit_file.file_id,
         "commit_file_id": commit_file.id,
         "path": commit_file.path,
         "previous_path": commit_file.previous_path,
@@ -47,6 +121,84 @@ def _serialize_commit_file(commit_file, file_obj, blob=None):
         ),
     }
 
+def _plan_commit(current_file_versions, uploaded_files, paths, delete_paths):
+    """
+    Сравнивает загруженные файлы с HEAD по sha256 и решает, какие строки писать.
+
+    - тот же sha256 по тому же пути — файл пропускается;
+    - sha256 файла, удаляемого в этом же коммите, по новому пути — RENAMED
+      (blob переиспользуется, previous_path = старый путь);
+    - удаление несуществующего пути — пропускается;
+    - остальное — ADDED/MODIFIED.
+
+    Возвращает (deletes, uploads): deletes — пути, uploads — dict-и с path, content, sha256,
+    name, operation и renamed_from.
+    """
+
+    deletes = []
+    for delete_path in delete_paths:
+        path = str(delete_path).strip()
+        if path and path in current_file_versions and path not in deletes:
+            deletes.append(path)
+
+    # удаляемые файлы, которые ещё могут стать источником переименования: sha256 -> [path]
+    rename_sources = {}
+    for path in deletes:
+        blob = current_file_versions[path].blob
+        if blob is not None:
+            rename_sources.setdefault(blob.sha256, []).append(path)
+
+    uploads = []
+    for index, uploaded_file in enumerate(uploaded_files):
+        path = paths[index] if index < len(paths) and paths[index] else uploaded_file.name
+        content = uploaded_file.read()
+        sha256 = hashlib.sha256(content).hexdigest()
+        current = current_file_versions.get(path)
+
+        if current is not None and path not in deletes and current.blob and current.blob.sha256 == sha256:
+            continue
+
+        renamed_from = None
+        if current is None and rename_sources.get(sha256):
+            renamed_from = rename_sources[sha256].pop(0)
+
+        uploads.append({
+            "path": path,
+            "name": uploaded_file.name,
+            "content": content,
+            "sha256": sha256,
+            "renamed_from": renamed_from,
+            "operation": (
+                CommitFileOperation.RENAMED if renamed_from
+                else CommitFileOperation.MODIFIED if current is not None
+                else CommitFileOperation.ADDED
+            ),
+        })
+
+    return deletes, uploads
+
+
+def _get_or_create_blob(repository, upload, reusable_blob=None):
+    """
+    Одинаковое содержимое внутри repository хранится одним FileBlob.
+    """
+
+    blob = reusable_blob or FileBlob.objects.filter(repository=repository, sha256=upload["sha256"]).first()
+    if blob is not None:
+        return blob
+
+    mime_type, _ = mimetypes.guess_type(upload["name"])
+
+    return FileBlob.objects.create(
+        repository=repository,
+        blob=ContentFile(upload["content"], name=upload["name"]),
+        sha256=upload["sha256"],
+        size=len(upload["content"]),
+        mime_type=mime_type,
+        original_name=upload["name"],
+    )
+
+
 def create_repository_commit(
     repository,
     user,
@@ -55,12 +207,32 @@ def create_repository_commit(
     paths=None,
     delete_paths=None,
 ):
+    """
+    Создаёт линейный commit поверх HEAD.
+
+    Сначала строится план (_plan_commit), и только потом пишутся Commit и CommitFile:
+    неизменённые файлы не создают ни blob, ни строк истории.
+    Если после сравнения с HEAD изменений нет — ValidationError, commit не создаётся.
+    """
+
     uploaded_files = uploaded_files or []
     paths = paths or []
     delete_paths = delete_paths or []
 
     latest_commit = get_latest_commit(repository)
     current_file_versions = get_current_repository_file_versions(repository)
+    deletes, uploads = _plan_commit(current_file_versions, uploaded_files, paths, delete_paths)
+
+    if not deletes and not uploads:
+        raise ValidationError("Нет изменений: все файлы совпадают с текущей версией.")
+
+    sizes_before = live_file_sizes(current_file_versions.values())
+    sizes_after = dict(sizes_before)
+
+    for path in deletes:
+        sizes_after.pop(path, None)
+    for upload in uploads:
+        sizes_after[upload["path"]] = len(upload["content"])
 
     commit = Commit.objects.create(
         repository=repository,
@@ -68,59 +240,125 @@ def create_repository_commit(
         message=message,
         parent=latest_commit,
         commit_hash=build_commit_hash(repository, user, message),
+        **build_commit_summary(
+            [CommitFileOperation.DELETED] * len(deletes) + [upload["operation"] for upload in uploads],
+            sum(sizes_after.values()) - sum(sizes_before.values()),
+        ),
     )
 
     changed_files = []
+    tree_changes = {}
 
-
-    for delete_path in delete_paths:
-        path = str(delete_path).strip()
-        if not path:
-            continue
-
-        file_obj, _ = File.objects.get_or_create(repository=repository, path=path)
-
+    for path in deletes:
         commit_file = CommitFile.objects.create(
             commit=commit,
-            file=file_obj,
+            file_id=current_file_versions[path].file_id,
             path=path,
             operation=CommitFileOperation.DELETED,
             blob=None,
         )
 
-        changed_files.append(_serialize_commit_file(commit_file, file_obj))
-
-
-    for index, uploaded_file in enumerate(uploaded_files):
-        path = paths[index] if index < len(paths) and paths[index] else uploaded_file.name
-
-        content = uploaded_file.read()
-        sha256 = hashlib.sha256(content).hexdigest()
-        mime_type, _ = mimetypes.guess_type(uploaded_file.name)
+        tree_changes[path] = None
+        changed_files.append(_serialize_commit_file(commit_file))
 
+    for upload in uploads:
+        path = upload["path"]
+        renamed_from = upload["renamed_from"]
         file_obj, _ = File.objects.get_or_create(repository=repository, path=path)
-
-        blob = FileBlob.objects.create(
-            repository=repository,
-            blob=ContentFile(content, name=uploaded_file.name),
-            sha256=sha256,
-            size=len(content),
-            mime_type=mime_type,
-            original_name=uploaded_file.name,
+        blob = _get_or_create_blob(
+            repository,
+            upload,
+            reusable_blob=current_file_versions[renamed_from].blob if renamed_from else None,
         )
 
         commit_file = CommitFile.objects.create(
             commit=commit,
             file=file_obj,
             path=path,
-            operation=(
-                CommitFileOperation.MODIFIED
-                if path in current_file_versions
-                else CommitFileOperation.ADDED
-            ),
+            previous_path=renamed_from,
+            operation=upload["operation"],
             blob=blob,
         )
 
-        changed_files.append(_serialize_commit_file(commit_file, file_obj, blob))
+        tree_changes[path] = commit_file
+        changed_files.append(_serialize_commit_file(commit_file, blob))
+
+    apply_tree_changes(repository, sizes_before, tree_changes)
+    record_commit_stats(repository, commit, sizes_before, sizes_after)
 
     return commit, changed_files
+
+
+FILE_HISTORY_FIELDS = (
+    "id",
+    "commit_id",
+    "path",
+    "previous_path",
+    "operation",
+    "blob_id",
+    "blob__size",
+    "blob__sha256",
+    "commit__commit_hash",
+    "commit__message",
+    "commit__created_at",
+    "commit__created_by_id",
+    "commit__created_by__username",
+)
+
+
+def encode_file_history_cursor(path, before_commit_id):
+    return signing.dumps({"p": path, "c": before_commit_id}, salt=FILE_HISTORY_CURSOR_SALT, compress=True)
+
+
+def decode_file_history_cursor(cursor):
+    try:
+        payload = signing.loads(cursor, salt=FILE_HISTORY_CURSOR_SALT)
+        return str(payload["p"]), int(payload["c"])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise InvalidCursor()
+
+
+def _file_history_state_after(row):
+    if row["operation"] == CommitFileOperation.RENAMED and row["previous_path"]:
+        return row["previous_path"], row["commit_id"]
+    return row["path"], row["commit_id"]
+
+
+def get_file_history(repository, path, before_commit_id=None, limit=50):
+    """
+    Версии одного пути, новые первыми, с переходом через переименования.
+
+    Состояние обхода — (path, before_commit_id): берутся строки File(path)
+    с commit_id < before_commit_id по индексу commit_file_history_idx.
+    Строка RENAMED переключает обход на previous_path с границей её commit,
+    поэтому DELETED старого пути из того же коммита в историю не попадает.
+
+    Возвращает (rows, next_state); next_state = None, если версий больше нет.
+    """
+
+    rows = []
+    state = (path, before_commit_id)
+
+    while state is not None and len(rows) <= limit:
+        path, before_commit_id = state
+        state = None
+
+        file_id = File.objects.filter(repository=repository, path=path).values_list("id", flat=True).first()
+        if file_id is None:
+            break
+
+        versions = CommitFile.objects.filter(file_id=file_id)
+        if before_commit_id is not None:
+            versions = versions.filter(commit_id__lt=before_commit_id)
+
+        for row in versions.order_by("-commit_id").values(*FILE_HISTORY_FIELDS)[:limit + 1 - len(rows)]:
+            rows.append(row)
+
+            if row["operation"] == CommitFileOperation.RENAMED and row["previous_path"]:
+                state = _file_history_state_after(row)
+                break
+
+    if len(rows) > limit:
+        return rows[:limit], _file_history_state_after(rows[limit - 1])
+
+    return rows, None
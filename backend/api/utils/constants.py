@@ -1,4 +1,41 @@
 ACCESS_TOKEN_TTL_SECONDS = 15 * 60
 REFRESH_TOKEN_TTL_SECONDS = 7 * 24 * 60 * 60
 REFRESH_COOKIE_NAME = "refresh_token"
-ACCESS_SALT = "access-token"
\ No newline at end of file
+ACCESS_SALT = "access-token"
+MEMBERSHIP_CLAIMS_MAX_COMPANIES = 100
+REFRESH_SELECTOR_BYTES = 12
+REFRESH_VERIFIER_BYTES = 48
+REFRESH_SESSION_RETENTION_SECONDS = 7 * 24 * 60 * 60
+REFRESH_SESSION_REAP_BATCH_SIZE = 1000
+REFRESH_SESSION_PARTITION_MONTHS_AHEAD = 2
+
+BLOB_PREFETCH_WORKERS = 4
+BLOB_PREFETCH_MAX_INFLIGHT_BYTES = 64 * 1024 * 1024
+BATCH_DOWNLOAD_MAX_ITEMS = 1000
+
+COMMIT_REF_MIN_PREFIX_LENGTH = 7
+
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 200
+CURSOR_SALT = "list-cursor"
+FILE_HISTORY_CURSOR_SALT = "file-history-cursor"
+
+SEARCH_CONFIG = "simple"
+SEARCH_MAX_RESULTS = 50
+USER_SEARCH_LIMIT = 10
+USER_SEARCH_MIN_TRIGRAM_LENGTH = 3
+
+SESSION_CACHE_ALIAS = "sessions"
+SESSION_CACHE_TTL_SECONDS = 5 * 60
+SESSION_LOCAL_CACHE_TTL_SECONDS = 5
+SESSION_LOCAL_CACHE_MAX_ENTRIES = 10_000
+
+RATE_LIMIT_CACHE_ALIAS = "ratelimit"
+
+NOTIFICATION_CHANNEL = "notifications"
+NOTIFICATION_LISTEN_RETRY_SECONDS = 5
+NOTIFICATION_STREAM_MAX_PER_USER = 5
+NOTIFICATION_STREAM_QUEUE_SIZE = 16
+NOTIFICATION_HEARTBEAT_SECONDS = 15
+NOTIFICATION_STREAM_MAX_SECONDS = 5 * 60
+NOTIFICATION_STREAM_RETRY_MS = 3000
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+from api.utils.constants import (
+    NOTIFICATION_CHANNEL,
+    NOTIFICATION_LISTEN_RETRY_SECONDS,
+    NOTIFICATION_STREAM_MAX_PER_USER,
+    NOTIFICATION_STREAM_QUEUE_SIZE,
+)
+from api.utils.notification_counter import get_unread_count
+
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Подписка одного SSE-соединения на события пользователя.
+
+    Очередь принадлежит event loop-у соединения; события кладутся в неё через
+    call_soon_threadsafe, поэтому publish можно вызывать из любого потока.
+    При переполнении выбрасывается самое старое событие: клиенту важно последнее состояние.
+    """
+
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=NOTIFICATION_STREAM_QUEUE_SIZE)
+        self.evicted = False
+
+    def _put(self, data):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(data)
+
+    def deliver(self, data):
+        try:
+            self.loop.call_soon_threadsafe(self._put, data)
+        except RuntimeError:
+            # loop уже закрыт — соединение завершилось, не успев отписаться
+            self.broker.unsubscribe(self)
+
+    def evict(self):
+        """
+        Подписку вытеснило новое соединение: get() просыпается, поток видит evicted и завершается.
+        """
+
+        self.evicted = True
+        self.deliver(None)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class InProcessBroker:
+    """
+    Pub/sub внутри процесса: события доходят только до соединений этого же процесса.
+    Используется в тестах и без Postgres.
+    """
+
+    def __init__(self, max_per_user=NOTIFICATION_STREAM_MAX_PER_USER):
+        self.max_per_user = max_per_user
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(list)
+
+    def subscribe(self, user_id):
+        """
+        Вызывается из event loop-а соединения. Лимит соединений считается на процесс.
+
+        Django 4.2 не сообщает об отключении клиента, поэтому закрытая вкладка держит
+        подписку до конца NOTIFICATION_STREAM_MAX_SECONDS. Чтобы перезагрузки не упирались
+        в лимит, новое соединение сверх max_per_user вытесняет самое старое.
+        """
+
+        subscription = Subscription(self, user_id)
+
+        with self._lock:
+            subscriptions = self._subscriptions[user_id]
+            evicted = subscriptions[:len(subscriptions) + 1 - self.max_per_user]
+            del subscriptions[:len(evicted)]
+            subscriptions.append(subscription)
+
+        for old in evicted:
+            old.evict()
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is None:
+                return
+
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    def connection_count(self, user_id):
+        with self._lock:
+            return len(self._subscriptions.get(user_id, ()))
+
+    def deliver(self, user_id, data):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+
+        for subscription in subscriptions:
+            subscription.deliver(data)
+
+    def publish(self, user_id, data):
+        self.deliver(user_id, data)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Pub/sub через Postgres LISTEN/NOTIFY — события доходят до всех процессов.
+
+    - publish делает pg_notify через обычное соединение Django;
+    - в каждом процессе один поток слушает канал на отдельном соединении
+      и раздаёт события локальным подпискам; поток запускается при первой подписке
+      и переподключается после ошибок.
+    """
+
+    def __init__(self, channel=NOTIFICATION_CHANNEL, **kwargs):
+        super().__init__(**kwargs)
+        self.channel = channel
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, user_id, data):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)",
+                [self.channel, json.dumps({"user_id": user_id, "data": data})],
+            )
+
+    def subscribe(self, user_id):
+        self._ensure_listener()
+        return super().subscribe(user_id)
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="notification-listener", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            db = connections.create_connection(DEFAULT_DB_ALIAS)
+
+            try:
+                db.ensure_connection()
+                db.set_autocommit(True)
+                raw = db.connection
+
+                with raw.cursor() as cursor:
+                    cursor.execute(f"LISTEN {db.ops.quote_name(self.channel)}")
+
+                while True:
+                    if not select.select([raw], [], [], 60)[0]:
+                        continue
+
+                    raw.poll()
+                    while raw.notifies:
+                        self._dispatch(raw.notifies.pop(0).payload)
+            except Exception:
+                logger.exception("notification listener failed, reconnecting")
+            finally:
+                db.close()
+
+            time.sleep(NOTIFICATION_LISTEN_RETRY_SECONDS)
+
+    def _dispatch(self, payload):
+        try:
+            message = json.loads(payload)
+            self.deliver(message["user_id"], message["data"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("invalid notification payload: %r", payload)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Broker процесса. settings.NOTIFICATION_BROKER: "postgres" или "memory";
+    по умолчанию postgres, если база — PostgreSQL.
+    """
+
+    global _broker
+
+    with _broker_lock:
+        if _broker is None:
+            kind = getattr(settings, "NOTIFICATION_BROKER", None)
+            if not kind:
+                kind = "postgres" if connection.vendor == "postgresql" else "memory"
+
+            _broker = PostgresBroker() if kind == "postgres" else InProcessBroker()
+
+        return _broker
+
+
+def publish_unread_count(user_id):
+    """
+    Отправляет подписчикам пользователя новое число непрочитанных уведомлений.
+    Один запрос к NotificationCounter на изменение, а не на каждое открытое соединение.
+    """
+
+    try:
+        get_broker().publish(user_id, get_unread_count(user_id))
+    except Exception:
+        # уведомление уже сохранено; клиент получит актуальное число при переподключении
+        logger.exception("failed to publish notification event for user %s", user_id)
@@ -0,0 +1,100 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from api.choices import NotificationStatus
+from api.models.notifications import Notification, NotificationCounter
+
+
+def _unread_notifications(user_id):
+    return Notification.objects.filter(recipient_id=user_id, status=NotificationStatus.UNREAD)
+
+
+def _update_counter(user_id, delta):
+    return NotificationCounter.objects.filter(user_id=user_id).update(
+        unread_count=Greatest(F("unread_count") + delta, 0),
+    )
+
+
+def _create_counter(user_id, delta=0):
+    """
+    Счётчик, которого ещё нет, создаётся по реальным данным.
+
+    При гонке двух запросов строку создаёт первый. Второй читает её, а если он создавал
+    счётчик ради изменения (delta), применяет его через F(): подсчёт первого мог не увидеть
+    ещё не зафиксированное уведомление второго.
+    """
+
+    try:
+        with transaction.atomic():
+            return NotificationCounter.objects.create(
+                user_id=user_id,
+                unread_count=_unread_notifications(user_id).count(),
+            )
+    except IntegrityError:
+        if delta:
+            _update_counter(user_id, delta)
+        return NotificationCounter.objects.get(user_id=user_id)
+
+
+def change_unread_count(user_id, delta):
+    """
+    Атомарно меняет счётчик через F(), не опуская его ниже нуля.
+
+    Если строки ещё нет, при увеличении она создаётся подсчётом — уже с учётом текущего
+    изменения. При уменьшении не создаётся: так бывает и при каскадном удалении пользователя,
+    а отсутствующий счётчик всё равно будет посчитан при первом чтении.
+    """
+
+    updated = _update_counter(user_id, delta)
+
+    if not updated and delta > 0:
+        _create_counter(user_id, delta)
+
+
+def get_unread_count(user_id):
+    """
+    Число непрочитанных уведомлений: один запрос по первичному ключу.
+    """
+
+    count = NotificationCounter.objects.filter(user_id=user_id).values_list("unread_count", flat=True).first()
+
+    if count is None:
+        count = _create_counter(user_id).unread_count
+
+    return count
+
+
+def reconcile_notification_counters():
+    """
+    Исправляет расхождения счётчиков с реальными данными. Возвращает число исправленных строк.
+    """
+
+    actual = Coalesce(
+        Subquery(
+            Notification.objects
+            .filter(recipient_id=OuterRef("user_id"), status=NotificationStatus.UNREAD)
+            .order_by()
+            .values("recipient_id")
+            .annotate(count=Count("id"))
+            .values("count")
+        ),
+        0,
+    )
+
+    fixed = NotificationCounter.objects.exclude(unread_count=actual).update(unread_count=actual)
+
+    missing = (
+        Notification.objects
+        .filter(status=NotificationStatus.UNREAD)
+        .exclude(recipient_id__in=NotificationCounter.objects.values("user_id"))
+        .order_by()
+        .values("recipient_id")
+        .annotate(count=Count("id"))
+    )
+    created = NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=row["recipient_id"], unread_count=row["count"]) for row in missing],
+        ignore_conflicts=True,
+    )
+
+    return fixed + len(created)
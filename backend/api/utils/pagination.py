@@ -0,0 +1,174 @@
+import datetime
+
+from django.core import signing
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.utils.constants import CURSOR_SALT, LIST_MAX_PAGE_SIZE, LIST_PAGE_SIZE
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def wants_full_list(request):
+    """
+    Старое поведение (весь список одним ответом) доступно только явно: ?all=true.
+    """
+
+    return request.GET.get("all") in ("1", "true", "True")
+
+
+def get_page_size(request):
+    try:
+        limit = int(request.GET.get("limit") or LIST_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return LIST_PAGE_SIZE
+
+    return min(max(limit, 1), LIST_MAX_PAGE_SIZE)
+
+
+def _parse_ordering(ordering):
+    return [(field.lstrip("-"), field.startswith("-")) for field in ordering]
+
+
+def _dump_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def _get_value(item, field):
+    # страница может состоять из моделей или из .values()-словарей
+    return item[field] if isinstance(item, dict) else getattr(item, field)
+
+
+def encode_cursor(item, ordering):
+    values = [_dump_value(_get_value(item, field)) for field, _desc in _parse_ordering(ordering)]
+    return signing.dumps({"o": list(ordering), "v": values}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor, ordering, model):
+    try:
+        payload = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        raise InvalidCursor()
+
+    if payload.get("o") != list(ordering) or len(payload.get("v") or []) != len(ordering):
+        raise InvalidCursor()
+
+    try:
+        return [
+            model._meta.get_field(field).to_python(value)
+            for (field, _desc), value in zip(_parse_ordering(ordering), payload["v"])
+        ]
+    except Exception:
+        raise InvalidCursor()
+
+
+def keyset_filter(ordering, values):
+    """
+    Условие "строго после курсора" для составной сортировки.
+
+    Для ("-created_at", "-id") это:
+    created_at < v1 OR (created_at = v1 AND id < v2).
+
+    Условие использует тот же индекс, что и ORDER BY,
+    поэтому время ответа не зависит от глубины страницы.
+    """
+
+    condition = Q()
+    fields = _parse_ordering(ordering)
+
+    for index, (field, desc) in enumerate(fields):
+        step = Q(**{f"{field}__{'lt' if desc else 'gt'}": values[index]})
+
+        for previous_index in range(index):
+            step &= Q(**{fields[previous_index][0]: values[previous_index]})
+
+        condition |= step
+
+    return condition
+
+
+def paginate_queryset(request, queryset, ordering):
+    """
+    Keyset (cursor) пагинация.
+
+    ordering должен однозначно упорядочивать строки, поэтому последним полем всегда идёт id.
+    Возвращает (items, next_cursor); next_cursor = None на последней странице.
+    """
+
+    return get_page(queryset, ordering, cursor=request.GET.get("cursor"), limit=get_page_size(request))
+
+
+def get_page(queryset, ordering, cursor=None, limit=LIST_PAGE_SIZE):
+    """
+    Одна страница без request: для ответов, которые встраивают первую страницу
+    нескольких списков (например, detail repository).
+    """
+
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        values = decode_cursor(cursor, ordering, queryset.model)
+        queryset = queryset.filter(keyset_filter(ordering, values))
+
+    items = list(queryset[:limit + 1])
+    next_cursor = encode_cursor(items[limit - 1], ordering) if len(items) > limit else None
+
+    return items[:limit], next_cursor
+
+
+def paginate_list(request, items, ordering, model):
+    """
+    Та же курсорная пагинация для списка, уже отсортированного по ordering в памяти
+    (например, агрегированного из snapshot). Курсор указывает на последний отданный элемент.
+    """
+
+    limit = get_page_size(request)
+    cursor = request.GET.get("cursor")
+    start = 0
+
+    if cursor:
+        values = decode_cursor(cursor, ordering, model)
+        fields = [field for field, _desc in _parse_ordering(ordering)]
+        keys = [[_get_value(item, field) for field in fields] for item in items]
+
+        if values not in keys:
+            raise InvalidCursor()
+        start = keys.index(values) + 1
+
+    page = items[start:start + limit + 1]
+    next_cursor = encode_cursor(page[limit - 1], ordering) if len(page) > limit else None
+
+    return page[:limit], next_cursor
+
+
+def paginated_response(request, queryset, ordering, serialize_page):
+    """
+    Общий ответ для list endpoint-ов.
+
+    - по умолчанию: {"results": [...], "next_cursor": "..."};
+    - ?cursor=<next_cursor> — следующая страница, ?limit= — размер страницы;
+    - ?all=true — весь список массивом, как раньше.
+
+    serialize_page получает список объектов страницы целиком.
+    """
+
+    if wants_full_list(request):
+        return Response(serialize_page(list(queryset.order_by(*ordering))), status=status.HTTP_200_OK)
+
+    try:
+        items, next_cursor = paginate_queryset(request, queryset, ordering)
+    except InvalidCursor:
+        return Response({"error": "invalid_cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(
+        {
+            "results": serialize_page(items),
+            "next_cursor": next_cursor,
+        },
+        status=status.HTTP_200_OK,
+    )
@@ -0,0 +1,163 @@
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from api.utils.constants import RATE_LIMIT_CACHE_ALIAS
+from api.utils.session import get_client_ip, request_get_str
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket: capacity запросов подряд, дальше capacity / period_seconds запросов в секунду.
+
+    Состояние — пара (tokens, updated_at), поэтому его можно хранить в любом кэше.
+    """
+
+    def __init__(self, capacity, period_seconds):
+        self.capacity = capacity
+        self.refill_rate = capacity / period_seconds
+
+    def take(self, state, now):
+        """
+        Возвращает (новое состояние, retry_after). retry_after == 0 — запрос разрешён.
+        """
+
+        tokens, updated_at = state or (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_rate)
+
+        if tokens >= 1:
+            return (tokens - 1, now), 0
+
+        return (tokens, now), max(1, math.ceil((1 - tokens) / self.refill_rate))
+
+
+class LocalBucketStore:
+    """
+    Хранилище в памяти процесса — запасной вариант, если общий кэш недоступен.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = {}
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < time.monotonic():
+                return None
+            return item[1]
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._items[key] = (time.monotonic() + timeout, value)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_local_store = LocalBucketStore()
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def _count(scope, outcome):
+    with _counters_lock:
+        _counters[(scope, outcome)] += 1
+
+
+def get_rate_limit_counters():
+    """
+    Счётчики процесса для метрик: {"<scope>.allowed": n, "<scope>.limited": n, "<scope>.fallback": n}.
+    """
+
+    with _counters_lock:
+        return {f"{scope}.{outcome}": value for (scope, outcome), value in _counters.items()}
+
+
+def reset_rate_limits():
+    caches[RATE_LIMIT_CACHE_ALIAS].clear()
+    _local_store.clear()
+
+    with _counters_lock:
+        _counters.clear()
+
+
+def _take(scope, key, bucket, timeout):
+    cache_key = f"rate_limit:{scope}:{key}"
+    now = time.time()
+
+    # get + set не атомарны: при гонке worker-ов лимит может быть превышен на единицы запросов
+    try:
+        cache = caches[RATE_LIMIT_CACHE_ALIAS]
+        state, retry_after = bucket.take(cache.get(cache_key), now)
+        cache.set(cache_key, state, timeout)
+        return retry_after
+    except Exception:
+        logger.warning("rate limit cache unavailable, using local buckets", exc_info=True)
+        _count(scope, "fallback")
+
+    state, retry_after = bucket.take(_local_store.get(cache_key), now)
+    _local_store.set(cache_key, state, timeout)
+    return retry_after
+
+
+def _request_keys(request, identifier_fields):
+    keys = [f"ip:{get_client_ip(request) or 'unknown'}"]
+
+    for field in identifier_fields:
+        value = request_get_str(request.data, field).lower()
+        if value:
+            keys.append(f"{field}:{value}")
+
+    return keys
+
+
+def rate_limit(scope, identifier_fields=()):
+    """
+    Декоратор DRF view: token bucket по IP и по полям-идентификаторам из request.data.
+
+    - лимиты берутся из settings.RATE_LIMITS[scope] = {"capacity": ..., "period_seconds": ...};
+    - scope без настроек не ограничивается;
+    - при превышении — 429 {"error": "rate_limited"} и заголовок Retry-After.
+
+    Ставится под @api_view, чтобы request.data был уже разобран.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            config = getattr(settings, "RATE_LIMITS", {}).get(scope)
+            if not config:
+                return view(request, *args, **kwargs)
+
+            bucket = TokenBucket(config["capacity"], config["period_seconds"])
+            timeout = math.ceil(config["period_seconds"])
+
+            retry_after = max(
+                _take(scope, key, bucket, timeout)
+                for key in _request_keys(request, identifier_fields)
+            )
+
+            if retry_after:
+                _count(scope, "limited")
+                response = Response({"error": "rate_limited"}, status=429)
+                response["Retry-After"] = str(retry_after)
+                return response
+
+            _count(scope, "allowed")
+            return view(request, *args, **kwargs)
+
+        return wrapped
+
+    return decorator
@@ -1,4 +1,5 @@
 import hashlib
+from django.db.models import Q
 from django.utils import timezone
 from django.core.files.base import ContentFile
 
@@ -19,32 +20,17 @@ def with_user(view_func):
 def get_latest_commit(repository):
     return repository.commits.order_by("-created_at", "-id").first()
 
-def get_current_repository_file_versions(repository):
+def get_current_repository_file_versions(repository, path_filter=None):
     current_files = {}
 
     commit_files = CommitFile.objects.filter(
         commit__repository=repository
-    ).select_related("blob").order_by(
-        "commit__created_at",
-        "commit_id",
-        "id",
     )
 
-    for cf in commit_files:
-        current_files[cf.path] = cf
-
-    return {
-        path: cf
-        for path, cf in current_files.items()
-        if cf.operation != CommitFileOperation.DELETED
-    }
-
-def get_current_repository_file_versions(repository):
-    current_files = {}
+    if path_filter is not None:
+        commit_files = commit_files.filter(path_filter)
 
-    commit_files = CommitFile.objects.filter(
-        commit__repository=repository
-    ).select_related("blob").order_by(
+    commit_files = commit_files.select_related("blob").order_by(
         "commit__created_at",
         "commit_id",
         "id",
@@ -68,4 +54,109 @@ def sanitize_archive_path(path):
         p for p in str(path).replace("\\", "/").split("/")
         if p not in ("", ".", "..")
     ]
-    return "/".join(parts) or "file"
\ No newline at end of file
+    return "/".join(parts) or "file"
+
+
+def normalize_path_prefix(path):
+    """
+    Приводит ?path= к виду "dir/subdir/".
+
+    Пустой путь означает весь репозиторий и возвращается как "".
+    """
+
+    parts = [
+        p for p in str(path or "").replace("\\", "/").split("/")
+        if p not in ("", ".", "..")
+    ]
+    return "/".join(parts) + "/" if parts else ""
+
+
+_REGEX_SPECIAL_CHARS = ".^$+()[]{}|\\"
+
+
+def _escape_regex(value):
+    return "".join("\\" + char if char in _REGEX_SPECIAL_CHARS else char for char in value)
+
+
+def glob_to_regex(pattern, path_prefix=""):
+    """
+    Переводит glob в регулярное выражение, которое понимают и PostgreSQL, и SQLite.
+
+    - * — любые символы внутри одного сегмента пути;
+    - ** — любые символы, включая "/" (**/ может совпасть и с пустой строкой);
+    - ? — один символ внутри сегмента.
+
+    Шаблон без "/" сравнивается с именем файла (*.png найдёт png на любой глубине),
+    шаблон со "/" — с путём относительно path_prefix.
+    """
+
+    pattern = str(pattern).strip().lstrip("/")
+    body = []
+    index = 0
+
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            body.append("(.*/)?")
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            body.append(".*")
+            index += 2
+            continue
+        if char == "*":
+            body.append("[^/]*")
+        elif char == "?":
+            body.append("[^/]")
+        else:
+            body.append(_escape_regex(char))
+        index += 1
+
+    if "/" not in pattern:
+        return "(^|/)" + "".join(body) + "$"
+
+    return "^" + _escape_regex(path_prefix) + "".join(body) + "$"
+
+
+def build_path_filter(path_prefix=None, include=None, exclude=None):
+    """
+    Q-фильтр по CommitFile.path для частичных выгрузок.
+
+    Фильтрация выполняется в БД, до загрузки строк и blob-ов.
+    Возвращает None, если ограничений нет.
+    """
+
+    path_prefix = normalize_path_prefix(path_prefix)
+    include = [pattern for pattern in (include or []) if str(pattern).strip()]
+    exclude = [pattern for pattern in (exclude or []) if str(pattern).strip()]
+
+    if not path_prefix and not include and not exclude:
+        return None
+
+    path_filter = Q()
+
+    if path_prefix:
+        path_filter &= Q(path__startswith=path_prefix)
+
+    if include:
+        include_filter = Q()
+        for pattern in include:
+            include_filter |= Q(path__regex=glob_to_regex(pattern, path_prefix))
+        path_filter &= include_filter
+
+    for pattern in exclude:
+        path_filter &= ~Q(path__regex=glob_to_regex(pattern, path_prefix))
+
+    return path_filter
+
+
+def path_filter_from_request(request):
+    """
+    Читает ?path=, ?include= и ?exclude= (include/exclude можно повторять).
+    """
+
+    return build_path_filter(
+        path_prefix=request.GET.get("path"),
+        include=request.GET.getlist("include"),
+        exclude=request.GET.getlist("exclude"),
+    )
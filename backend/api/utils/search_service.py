@@ -0,0 +1,385 @@
+import bisect
+import re
+import threading
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from api.choices import CommitFileOperation, SearchDocumentKind
+from api.models.repositories import Repository
+from api.models.search import SearchDocument
+from api.utils.constants import SEARCH_CONFIG, SEARCH_MAX_RESULTS, USER_SEARCH_LIMIT, USER_SEARCH_MIN_TRIGRAM_LENGTH
+from api.utils.repository_service import get_current_repository_file_versions
+
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def tokenize(text):
+    """
+    Слова в нижнем регистре. Путь "src/main_view.py" даёт src, main, view, py.
+    """
+
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def _normalize(text):
+    return " ".join(tokenize(text))
+
+
+def _uses_postgres():
+    return connection.vendor == "postgresql"
+
+
+# =========================================================
+# IN-PROCESS FALLBACK
+# =========================================================
+
+class InvertedIndex:
+    """
+    Инвертированный индекс в памяти процесса: token -> {document_id}.
+
+    Используется вместо tsvector, когда БД не Postgres (SQLite в тестах и локально).
+    Индекс — только ускоритель выборки кандидатов: найденные документы
+    перечитываются из БД и перепроверяются, поэтому устаревшие записи
+    (например, после отката транзакции) в результат не попадают.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._document_tokens = {}
+        self._sorted_tokens = []
+
+    def add(self, document_id, text):
+        with self._lock:
+            self._remove(document_id)
+            counts = Counter(tokenize(text))
+            self._document_tokens[document_id] = counts
+
+            for token in counts:
+                if token not in self._postings:
+                    self._postings[token] = set()
+                    bisect.insort(self._sorted_tokens, token)
+                self._postings[token].add(document_id)
+
+    def remove(self, document_id):
+        with self._lock:
+            self._remove(document_id)
+
+    def _remove(self, document_id):
+        for token in self._document_tokens.pop(document_id, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.discard(document_id)
+
+    def _prefix_matches(self, prefix):
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+        result = set()
+
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            result |= self._postings[token]
+
+        return result
+
+    def candidates(self, query_tokens):
+        """
+        Документы, где для каждого слова запроса есть token с таким префиксом.
+        """
+
+        with self._lock:
+            result = None
+
+            for prefix in query_tokens:
+                matches = self._prefix_matches(prefix)
+                result = matches if result is None else result & matches
+                if not result:
+                    return set()
+
+            return result or set()
+
+
+_fallback_index = None
+_fallback_lock = threading.Lock()
+
+
+def get_fallback_index():
+    """
+    Индекс строится из SearchDocument при первом поиске, дальше обновляется при записи.
+    """
+
+    global _fallback_index
+
+    with _fallback_lock:
+        if _fallback_index is None:
+            index = InvertedIndex()
+            for document_id, text in SearchDocument.objects.values_list("id", "text").iterator():
+                index.add(document_id, text)
+            _fallback_index = index
+
+        return _fallback_index
+
+
+def reset_fallback_index():
+    global _fallback_index
+
+    with _fallback_lock:
+        _fallback_index = None
+
+
+def _fallback_score(text, query_tokens):
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+
+    score = 0
+    for prefix in query_tokens:
+        matched = sum(1 for token in tokens if token.startswith(prefix))
+        if not matched:
+            return None
+        # точное совпадение весит больше префиксного
+        score += matched + sum(1 for token in tokens if token == prefix)
+
+    return score / len(tokens)
+
+
+# =========================================================
+# WRITE PATH
+# =========================================================
+
+def _refresh_search_vectors(queryset):
+    if _uses_postgres():
+        queryset.update(search_vector=SearchVector("text", config=SEARCH_CONFIG))
+
+
+def _after_write(documents):
+    _refresh_search_vectors(SearchDocument.objects.filter(id__in=[document.id for document in documents]))
+
+    if _fallback_index is not None:
+        for document in documents:
+            _fallback_index.add(document.id, document.text)
+
+
+def save_document(kind, repository_id, object_id, title, source_text):
+    document, _ = SearchDocument.objects.update_or_create(
+        kind=kind,
+        object_id=object_id,
+        defaults={
+            "repository_id": repository_id,
+            "title": title,
+            "text": _normalize(source_text),
+        },
+    )
+    _after_write([document])
+    return document
+
+
+def remove_document(kind, object_id):
+    document_ids = list(SearchDocument.objects.filter(kind=kind, object_id=object_id).values_list("id", flat=True))
+    SearchDocument.objects.filter(id__in=document_ids).delete()
+
+    if _fallback_index is not None:
+        for document_id in document_ids:
+            _fallback_index.remove(document_id)
+
+
+def index_repository(repository):
+    return save_document(
+        SearchDocumentKind.REPOSITORY,
+        repository.id,
+        repository.id,
+        repository.name,
+        f"{repository.name} {repository.description or ''}",
+    )
+
+
+def index_commit(commit):
+    return save_document(SearchDocumentKind.COMMIT, commit.repository_id, commit.id, commit.message, commit.message)
+
+
+def index_commit_file(commit_file, repository_id):
+    """
+    В индексе только текущие пути: DELETED убирает документ файла.
+    """
+
+    if commit_file.operation == CommitFileOperation.DELETED:
+        remove_document(SearchDocumentKind.FILE, commit_file.file_id)
+        return None
+
+    return save_document(
+        SearchDocumentKind.FILE,
+        repository_id,
+        commit_file.file_id,
+        commit_file.path,
+        commit_file.path,
+    )
+
+
+@transaction.atomic
+def rebuild_repository_index(repository):
+    """
+    Пересобирает все документы одного repository. Возвращает число документов.
+    """
+
+    SearchDocument.objects.filter(repository_id=repository.id).delete()
+
+    documents = [
+        SearchDocument(
+            kind=SearchDocumentKind.REPOSITORY,
+            repository_id=repository.id,
+            object_id=repository.id,
+            title=repository.name,
+            text=_normalize(f"{repository.name} {repository.description or ''}"),
+        )
+    ]
+    documents.extend(
+        SearchDocument(
+            kind=SearchDocumentKind.COMMIT,
+            repository_id=repository.id,
+            object_id=commit_id,
+            title=message,
+            text=_normalize(message),
+        )
+        for commit_id, message in repository.commits.values_list("id", "message")
+    )
+    documents.extend(
+        SearchDocument(
+            kind=SearchDocumentKind.FILE,
+            repository_id=repository.id,
+            object_id=commit_file.file_id,
+            title=path,
+            text=_normalize(path),
+        )
+        for path, commit_file in get_current_repository_file_versions(repository).items()
+    )
+
+    SearchDocument.objects.bulk_create(documents, batch_size=1000)
+    _refresh_search_vectors(SearchDocument.objects.filter(repository_id=repository.id))
+    reset_fallback_index()
+
+    return len(documents)
+
+
+# =========================================================
+# SEARCH
+# =========================================================
+
+def search_documents(user, query, kinds=None, limit=SEARCH_MAX_RESULTS):
+    """
+    Ранжированный поиск по repository, коммитам и путям файлов.
+
+    - каждое слово запроса ищется как префикс, все слова обязательны;
+    - в выдачу попадают только repository, которые user может видеть
+      (Repository.objects.visible_to — те же правила, что can_view_repository);
+    - на Postgres: tsvector + GIN, ранжирование ts_rank;
+    - иначе: InvertedIndex в памяти процесса.
+
+    Возвращает список SearchDocument с атрибутом rank, лучшие первыми.
+    """
+
+    query_tokens = tokenize(query)
+    if not query_tokens:
+        return []
+
+    documents = SearchDocument.objects.filter(
+        repository_id__in=Repository.objects.visible_to(user).values("id")
+    ).select_related("repository")
+
+    if kinds:
+        documents = documents.filter(kind__in=kinds)
+
+    if _uses_postgres():
+        search_query = SearchQuery(
+            " & ".join(f"{token}:*" for token in query_tokens),
+            config=SEARCH_CONFIG,
+            search_type="raw",
+        )
+        return list(
+            documents
+            .filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "id")[:limit]
+        )
+
+    candidate_ids = get_fallback_index().candidates(query_tokens)
+    if not candidate_ids:
+        return []
+
+    results = []
+    for document in documents.filter(id__in=candidate_ids):
+        rank = _fallback_score(document.text, query_tokens)
+        if rank is not None:
+            document.rank = rank
+            results.append(document)
+
+    results.sort(key=lambda document: (-document.rank, document.id))
+    return results[:limit]
+
+
+# =========================================================
+# USERS
+# =========================================================
+
+USER_SEARCH_FIELDS = ("id", "username", "email")
+
+
+def search_user_rows(query, limit=USER_SEARCH_LIMIT):
+    """
+    Поиск пользователей для диалога приглашения. Возвращает dict-ы USER_SEARCH_FIELDS.
+
+    username и email хранятся в нижнем регистре (User.save), поэтому запрос
+    тоже приводится к нижнему регистру и сравнивается с колонками напрямую.
+
+    - сначала префикс (LIKE 'q%' по индексам varchar_pattern_ops) — самый частый случай при наборе;
+    - если префиксных совпадений меньше limit, добираем подстроку/похожие
+      через pg_trgm (GIN gin_trgm_ops), по убыванию similarity;
+    - не на Postgres вместо pg_trgm — обычный поиск подстроки.
+    """
+
+    query = (query or "").strip().lower()
+    if not query:
+        return []
+
+    User = get_user_model()
+    users = User.objects.values(*USER_SEARCH_FIELDS)
+
+    rows = list(
+        users
+        .filter(Q(username__startswith=query) | Q(email__startswith=query))
+        .order_by("username", "id")[:limit]
+    )
+
+    if len(rows) >= limit:
+        return rows
+
+    rest = users.exclude(id__in=[row["id"] for row in rows])
+    remaining = limit - len(rows)
+
+    if not _uses_postgres():
+        return rows + list(
+            rest
+            .filter(Q(username__contains=query) | Q(email__contains=query))
+            .order_by("username", "id")[:remaining]
+        )
+
+    if len(query) < USER_SEARCH_MIN_TRIGRAM_LENGTH:
+        # у короткого запроса нет полных триграмм — индекс не поможет, хватит префикса
+        return rows
+
+    return rows + list(
+        rest
+        .filter(
+            Q(username__contains=query)
+            | Q(email__contains=query)
+            | Q(username__trigram_similar=query)
+        )
+        .annotate(similarity=Greatest(TrigramSimilarity("username", query), TrigramSimilarity("email", query)))
+        .order_by("-similarity", "username", "id")
+        .values(*USER_SEARCH_FIELDS)[:remaining]
+    )
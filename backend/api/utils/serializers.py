@@ -1,11 +1,10 @@
-from api.models.companies import (
-    CompanyMember,
-    can_delete_repository,
-    can_edit_repository,
-    can_manage_company,
-    can_view_repository,
-    is_company_member,
-)
+from django.db.models import prefetch_related_objects
+
+from api.models.companies import get_permission_resolver
+
+
+# связи, которые читает serialize_repository; для списков их нужно загрузить заранее
+REPOSITORY_RELATED_FIELDS = ("owner_user__profile", "owner_company", "created_by", "last_commit_by")
 
 
 def _file_url(file_field):
@@ -46,7 +45,16 @@ def serialize_user(user):
     }
 
 
-def serialize_repository(repository, user=None):
+def serialize_repository(repository, user=None, permissions=None):
+    """
+    permissions — заранее посчитанные (can_view, can_edit, can_delete).
+    Без них права берутся из PermissionResolver пользователя; для списков используйте serialize_repositories.
+    """
+
+    if permissions is None:
+        permissions = get_permission_resolver(user).repository_permissions(repository)
+
+    can_view, can_edit, can_delete = permissions
     owner_user = repository.owner_user
     owner_company = repository.owner_company
 
@@ -80,15 +88,40 @@ def serialize_repository(repository, user=None):
         "logo_company": company_logo,  # логотип компании
         "is_personal": repository.is_personal,
         "is_company_repository": repository.is_company_repository,
-        "can_view": bool(user and can_view_repository(user, repository)),
-        "can_edit": bool(user and can_edit_repository(user, repository)),
-        "can_delete": bool(user and can_delete_repository(user, repository)),
+        "can_view": can_view,
+        "can_edit": can_edit,
+        "can_delete": can_delete,
+        "file_count": repository.file_count,
+        "total_size": repository.total_size,
+        "commit_count": repository.commit_count,
+        "last_commit_at": _iso(repository.last_commit_at),
+        "last_commit_by_id": repository.last_commit_by_id,
+        "last_commit_by_username": repository.last_commit_by.username if repository.last_commit_by_id else None,
         "created_at": _iso(repository.created_at),
         "updated_at": _iso(repository.updated_at),
     }
 
 
-def serialize_company(company, user=None):
+def serialize_repositories(repositories, user=None):
+    """
+    Сериализует список repository за постоянное число запросов.
+
+    - owner_user/profile, owner_company, created_by и last_commit_by подгружаются пачкой
+      (если queryset уже сделал select_related, повторных запросов нет);
+    - компании пользователя загружаются один раз, права считаются в памяти.
+    """
+
+    repositories = list(repositories)
+    prefetch_related_objects(repositories, *REPOSITORY_RELATED_FIELDS)
+    permissions = get_permission_resolver(user).check_repositories(repositories)
+
+    return [
+        serialize_repository(repository, user, permissions=permissions[repository.id])
+        for repository in repositories
+    ]
+
+
+def serialize_company(company, user=None, is_member=None):
     logo_url = _file_url(company.logo)
 
     base_data = {
@@ -98,12 +131,17 @@ def serialize_company(company, user=None):
         "owner_id": company.owner_id,
         "owner_username": company.owner.username if company.owner_id else None,
         "logo": logo_url,
-        "member_count": CompanyMember.objects.filter(company=company).count(),
+        "member_count": company.member_count,
         "created_at": _iso(company.created_at),
         "updated_at": _iso(company.updated_at),
     }
 
-    if not user or not user.is_authenticated or not is_company_member(user, company):
+    resolver = get_permission_resolver(user)
+
+    if is_member is None:
+        is_member = resolver.is_company_member(company)
+
+    if not user or not user.is_authenticated or not is_member:
         return {
             **base_data,
             "is_member": False,
@@ -115,5 +153,24 @@ def serialize_company(company, user=None):
         **base_data,
         "is_owner": company.owner_id == user.id,
         "is_member": True,
-        "can_manage": can_manage_company(user, company),
+        "can_manage": resolver.can_manage_company(company),
     }
+
+
+def serialize_companies(companies, user=None):
+    """
+    Сериализует список компаний без запросов на каждую строку.
+
+    - member_count берётся из денормализованного поля;
+    - owner подгружается пачкой;
+    - членство пользователя загружается один раз.
+    """
+
+    companies = list(companies)
+    prefetch_related_objects(companies, "owner")
+    resolver = get_permission_resolver(user)
+
+    return [
+        serialize_company(company, user, is_member=resolver.is_company_member(company))
+        for company in companies
+    ]
@@ -1,12 +1,15 @@
 import secrets
 
 from django.conf import settings
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Q
 from django.utils import timezone
 
 from api.models.auth import AuthRefreshSession
 from api.utils.token import hash_token, verify_token
-from api.utils.constants import REFRESH_TOKEN_TTL_SECONDS, REFRESH_COOKIE_NAME
+from api.utils.session_cache import invalidate_sessions
+from api.utils.constants import REFRESH_COOKIE_NAME, REFRESH_SELECTOR_BYTES, REFRESH_SESSION_REAP_BATCH_SIZE, \
+    REFRESH_SESSION_RETENTION_SECONDS, REFRESH_TOKEN_TTL_SECONDS, REFRESH_VERIFIER_BYTES
 
 def request_get_list(data, key):
     if hasattr(data, "getlist"):
@@ -22,21 +25,58 @@ def request_get_list(data, key):
 
     return [value]
 
+def request_get_str(data, key, strip=True):
+    """
+    Строковое поле тела запроса: "" для тела-не-объекта и отсутствующего поля,
+    не-строки (число в JSON) приводятся через str.
+    """
+
+    if not isinstance(data, dict):
+        return ""
+
+    value = data.get(key)
+
+    if value is None:
+        return ""
+
+    value = value if isinstance(value, str) else str(value)
+    return value.strip() if strip else value
+
 def get_client_ip(request):
-    forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
+    """
+    IP клиента для сессий и rate limit.
+
+    - по умолчанию REMOTE_ADDR: X-Forwarded-For присылает сам клиент и ему нельзя верить;
+    - за TRUSTED_PROXY_COUNT обратными прокси берётся TRUSTED_PROXY_COUNT-й адрес справа
+      в X-Forwarded-For — его дописал самый внешний доверенный прокси;
+    - если адресов меньше, чем прокси, заголовок не от них и используется REMOTE_ADDR.
+    """
 
-    if forwarded_for:
-        return forwarded_for.split(",")[0].strip()
+    remote_addr = request.META.get("REMOTE_ADDR")
+    proxy_count = getattr(settings, "TRUSTED_PROXY_COUNT", 0)
 
-    return request.META.get("REMOTE_ADDR")
+    if proxy_count <= 0:
+        return remote_addr
+
+    forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+
+    if len(hops) < proxy_count:
+        return remote_addr
+
+    return hops[-proxy_count]
 
 
 def create_refresh_session(request, user):
-    raw_token = secrets.token_urlsafe(64)
+    # token_urlsafe не содержит ".", поэтому разделитель однозначен
+    selector = secrets.token_urlsafe(REFRESH_SELECTOR_BYTES)
+    verifier = secrets.token_urlsafe(REFRESH_VERIFIER_BYTES)
+    raw_token = f"{selector}.{verifier}"
 
     session = AuthRefreshSession.objects.create(
         user=user,
-        token_hash=hash_token(raw_token),
+        selector=selector,
+        token_hash=hash_token(verifier),
         expires_at=timezone.now() + timezone.timedelta(seconds=REFRESH_TOKEN_TTL_SECONDS),
         user_agent=request.META.get("HTTP_USER_AGENT", ""),
         ip_address=get_client_ip(request),
@@ -70,21 +110,78 @@ def revoke_refresh_session(raw_token):
 
 
 def find_refresh_session(raw_token, for_update=False):
+    """
+    Активная сессия по refresh token.
+
+    - "<selector>.<verifier>": одна строка по индексу selector и одна проверка PBKDF2;
+    - token без selector отклоняется без запросов: старые сессии отозваны миграцией 0015,
+      их владельцам нужно войти заново.
+    """
+
+    if not raw_token:
+        return None
+
     sessions = AuthRefreshSession.objects.filter(
         revoked_at__isnull=True,
         expires_at__gt=timezone.now(),
     ).select_related("user")
 
     if for_update:
-        sessions = sessions.select_for_update()
+        sessions = sessions.select_for_update(of=("self",))
 
-    for session in sessions:
-        if verify_token(raw_token, session.token_hash):
-            return session
+    selector, separator, verifier = raw_token.partition(".")
+
+    if not separator or not selector:
+        return None
+
+    session = sessions.filter(selector=selector).first()
+    if session and verify_token(verifier, session.token_hash):
+        return session
 
     return None
 
 
+def _delete_sessions(ids):
+    table = connection.ops.quote_name(AuthRefreshSession._meta.db_table)
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(f"DELETE FROM {table} WHERE id = ANY(%s)", [ids])
+        else:
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(f"DELETE FROM {table} WHERE id IN ({placeholders})", ids)
+
+
+def reap_refresh_sessions(retention_seconds=REFRESH_SESSION_RETENTION_SECONDS,
+                          batch_size=REFRESH_SESSION_REAP_BATCH_SIZE):
+    """
+    Удаляет сессии, истёкшие или отозванные раньше, чем retention_seconds назад.
+
+    - удаление пачками по batch_size, каждая пачка в своей короткой транзакции,
+      чтобы не держать долгих блокировок и не раздувать WAL одним DELETE;
+    - оба условия идут по индексам: expires_at и частичный индекс по revoked_at;
+    - пачка удаляется одним явным DELETE по id, без загрузки строк и post_delete сигналов,
+      кэш сессий сбрасывается одним invalidate_sessions на пачку.
+
+    Возвращает число удалённых сессий.
+    """
+
+    cutoff = timezone.now() - timezone.timedelta(seconds=retention_seconds)
+    stale = AuthRefreshSession.objects.filter(Q(expires_at__lt=cutoff) | Q(revoked_at__lt=cutoff))
+    deleted = 0
+
+    while True:
+        with transaction.atomic():
+            ids = list(stale.values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return deleted
+
+            _delete_sessions(ids)
+
+        invalidate_sessions(ids)
+        deleted += len(ids)
+
+
 def set_refresh_cookie(response, token):
     response.set_cookie(
         REFRESH_COOKIE_NAME,
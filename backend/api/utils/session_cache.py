@@ -0,0 +1,152 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from api.models.auth import AuthRefreshSession
+from api.models.user import User
+from api.utils.constants import (
+    SESSION_CACHE_ALIAS,
+    SESSION_CACHE_TTL_SECONDS,
+    SESSION_LOCAL_CACHE_MAX_ENTRIES,
+    SESSION_LOCAL_CACHE_TTL_SECONDS,
+)
+
+
+def _concrete_attnames(model, include=None, exclude=()):
+    # from_db ожидает значения в порядке concrete_fields
+    return tuple(
+        field.attname
+        for field in model._meta.concrete_fields
+        if (include is None or field.attname in include) and field.attname not in exclude
+    )
+
+
+# в запись попадают только эти поля; password не кэшируется и при необходимости догружается из БД
+SESSION_FIELDS = _concrete_attnames(AuthRefreshSession, include={"id", "user_id", "expires_at", "revoked_at"})
+USER_FIELDS = _concrete_attnames(User, exclude={"password"})
+
+
+def _fields_version(*field_groups):
+    names = "|".join(",".join(fields) for fields in field_groups)
+    return hashlib.sha1(names.encode()).hexdigest()[:8]
+
+
+# запись — позиционные списки значений, поэтому ключ зависит от набора полей:
+# после изменения моделей старые записи просто не читаются и истекают по TTL
+RECORD_VERSION = _fields_version(SESSION_FIELDS, USER_FIELDS)
+
+
+class LocalLRU:
+    """
+    Маленький LRU-кэш процесса с TTL.
+
+    TTL короткий: запись, инвалидированная в другом worker-е,
+    живёт здесь не дольше SESSION_LOCAL_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_local = LocalLRU(SESSION_LOCAL_CACHE_MAX_ENTRIES, SESSION_LOCAL_CACHE_TTL_SECONDS)
+
+
+def _key(session_id):
+    return f"access_session:{RECORD_VERSION}:{session_id}"
+
+
+def _record(session, user):
+    return {
+        "s": [getattr(session, name) for name in SESSION_FIELDS],
+        "u": [getattr(user, name) for name in USER_FIELDS],
+    }
+
+
+def _restore(record):
+    """
+    Модели собираются через from_db: объект считается загруженным из БД,
+    незакэшированные поля (password и т.п.) остаются отложенными и догружаются при обращении.
+    """
+
+    session = AuthRefreshSession.from_db(DEFAULT_DB_ALIAS, SESSION_FIELDS, record["s"])
+    user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, record["u"])
+    session.user = user
+    return session
+
+
+def get_cached_session(session_id):
+    """
+    AuthRefreshSession (с user) из кэша: сначала LRU процесса, потом общий кэш.
+    None, если записи нет.
+    """
+
+    key = _key(session_id)
+    record = _local.get(key)
+
+    if record is None:
+        record = caches[SESSION_CACHE_ALIAS].get(key)
+        if record is None:
+            return None
+        _local.set(key, record)
+
+    return _restore(record)
+
+
+def cache_session(session):
+    record = _record(session, session.user)
+    key = _key(session.id)
+
+    caches[SESSION_CACHE_ALIAS].set(key, record, SESSION_CACHE_TTL_SECONDS)
+    _local.set(key, record)
+
+
+def invalidate_sessions(session_ids):
+    keys = [_key(session_id) for session_id in session_ids]
+    if not keys:
+        return
+
+    caches[SESSION_CACHE_ALIAS].delete_many(keys)
+    for key in keys:
+        _local.delete(key)
+
+
+def clear_session_cache():
+    caches[SESSION_CACHE_ALIAS].clear()
+    _local.clear()
@@ -0,0 +1,192 @@
+import re
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.models.auth import AuthRefreshSession
+from api.models.user import User
+from api.utils.constants import REFRESH_SESSION_PARTITION_MONTHS_AHEAD, REFRESH_TOKEN_TTL_SECONDS
+
+
+# Помесячное партиционирование таблицы сессий по expires_at (только Postgres).
+#
+# После конвертации старые данные удаляются через DETACH + DROP партиции целиком,
+# а не большим DELETE. Ограничения партиционированной таблицы:
+# - первичный ключ и уникальные индексы включают expires_at, поэтому уникальность
+#   token_hash и selector проверяется в пределах партиции (значения случайные);
+# - партиции создаются на REFRESH_SESSION_PARTITION_MONTHS_AHEAD месяцев вперёд,
+#   поэтому reap_refresh_sessions нужно запускать регулярно — он же создаёт новые партиции;
+# - строки вне созданных месяцев попадают в DEFAULT партицию, а не в ошибку вставки.
+#   Новая месячная партиция забирает из неё свои строки; устаревшие строки DEFAULT
+#   партиции удаляет обычный reap_refresh_sessions.
+
+TABLE = AuthRefreshSession._meta.db_table
+PARTITION_NAME_RE = re.compile(rf"^{re.escape(TABLE)}_p(\d{{4}})(\d{{2}})$")
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _month_start(value):
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month_start):
+    return (month_start + timezone.timedelta(days=32)).replace(day=1)
+
+
+def _partition_name(month_start):
+    return f"{TABLE}_p{month_start:%Y%m}"
+
+
+def is_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABLE])
+        return cursor.fetchone() is not None
+
+
+def _create_default_partition(cursor):
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {_quote(DEFAULT_PARTITION)} PARTITION OF {_quote(TABLE)} DEFAULT")
+
+
+def _create_partition(cursor, month, end):
+    """
+    Партиция месяца [month, end). Строки этого диапазона из DEFAULT партиции переносятся
+    в неё: Postgres не подключит партицию, диапазон которой уже занят строками DEFAULT.
+    """
+
+    name = _quote(_partition_name(month))
+    default = _quote(DEFAULT_PARTITION)
+
+    cursor.execute(f"CREATE TABLE {name} (LIKE {_quote(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cursor.execute(
+        f"INSERT INTO {name} SELECT * FROM {default} WHERE expires_at >= %s AND expires_at < %s",
+        [month, end],
+    )
+    cursor.execute(f"DELETE FROM {default} WHERE expires_at >= %s AND expires_at < %s", [month, end])
+    cursor.execute(
+        f"ALTER TABLE {_quote(TABLE)} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def _create_partitions(cursor, first, last):
+    """
+    Партиции на каждый месяц от first до last включительно; существующие пропускаются.
+    Возвращает число созданных.
+    """
+
+    _create_default_partition(cursor)
+
+    month = _month_start(first)
+    created = 0
+
+    while month <= last:
+        end = _next_month(month)
+        cursor.execute("SELECT to_regclass(%s)", [_partition_name(month)])
+
+        if cursor.fetchone()[0] is None:
+            _create_partition(cursor, month, end)
+            created += 1
+
+        month = end
+
+    return created
+
+
+def _horizon(months_ahead):
+    last = timezone.now() + timezone.timedelta(seconds=REFRESH_TOKEN_TTL_SECONDS)
+    for _ in range(months_ahead):
+        last = _next_month(_month_start(last))
+    return last
+
+
+def ensure_partitions(months_ahead=REFRESH_SESSION_PARTITION_MONTHS_AHEAD):
+    with transaction.atomic(), connection.cursor() as cursor:
+        return _create_partitions(cursor, timezone.now(), _horizon(months_ahead))
+
+
+def drop_partitions_before(cutoff):
+    """
+    Отсоединяет и удаляет месячные партиции, весь диапазон которых закончился до cutoff.
+    Возвращает имена удалённых партиций.
+
+    DEFAULT партиция не отсоединяется: в ней могут быть и будущие строки.
+    Её устаревшие строки удаляет reap_refresh_sessions по индексам expires_at/revoked_at.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [TABLE],
+        )
+        names = sorted(row[0] for row in cursor.fetchall())
+
+    dropped = []
+
+    for name in names:
+        match = PARTITION_NAME_RE.match(name)
+        if not match:
+            continue
+
+        month = _month_start(timezone.now()).replace(year=int(match[1]), month=int(match[2]))
+        if _next_month(month) > cutoff:
+            continue
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {_quote(TABLE)} DETACH PARTITION {_quote(name)}")
+            cursor.execute(f"DROP TABLE {_quote(name)}")
+
+        dropped.append(name)
+
+    return dropped
+
+
+def convert_to_partitioned(months_ahead=REFRESH_SESSION_PARTITION_MONTHS_AHEAD):
+    """
+    Одноразово переводит таблицу сессий в партиционированную по expires_at.
+
+    Таблица блокируется на время копирования — запускать в окно обслуживания
+    (после reap_refresh_sessions строк остаётся немного).
+    """
+
+    table = _quote(TABLE)
+    legacy = _quote(f"{TABLE}_legacy")
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT min(expires_at) FROM {table}")
+        first = cursor.fetchone()[0] or timezone.now()
+
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        cursor.execute(f"CREATE TABLE {table} (LIKE {legacy}) PARTITION BY RANGE (expires_at)")
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+
+        _create_partitions(cursor, first, _horizon(months_ahead))
+
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+        cursor.execute(f"DROP TABLE {legacy}")
+
+        cursor.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, expires_at)")
+        cursor.execute(f"CREATE INDEX ON {table} (user_id, expires_at)")
+        cursor.execute(f"CREATE UNIQUE INDEX ON {table} (token_hash, expires_at)")
+        cursor.execute(f"CREATE UNIQUE INDEX ON {table} (selector, expires_at)")
+        cursor.execute(f"CREATE INDEX ON {table} (revoked_at) WHERE revoked_at IS NOT NULL")
+        cursor.execute(
+            f"ALTER TABLE {table} ADD FOREIGN KEY (user_id) "
+            f"REFERENCES {_quote(User._meta.db_table)} (id) DEFERRABLE INITIALLY DEFERRED"
+        )
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 0) + 1, false) FROM {table}",
+            [TABLE],
+        )
@@ -0,0 +1,83 @@
+import io
+import zipfile
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+
+_DONE = object()
+
+
+def is_asgi_request(request):
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+async def iterate_in_thread(iterator):
+    """
+    Async-обёртка над синхронным iterator: каждый next() выполняется в sync-потоке запроса
+    (thread_sensitive — то же соединение с БД, что у view), между кусками event loop свободен.
+    """
+
+    iterator = iter(iterator)
+
+    while True:
+        chunk = await sync_to_async(next)(iterator, _DONE)
+        if chunk is _DONE:
+            return
+        yield chunk
+
+
+def stream_in_thread(request, response):
+    """
+    Готовит StreamingHttpResponse/FileResponse с синхронным содержимым к отдаче.
+
+    Под ASGI Django 4.2 читает синхронный iterator через sync_to_async(list), то есть
+    собирает весь ответ в памяти до первого байта. Для ASGI-запроса содержимое
+    заменяется async iterator-ом, который отдаёт куски по мере чтения;
+    под WSGI ответ не меняется. Заголовки (Content-Length и т.п.) и закрытие
+    исходного iterator/файла остаются за response.
+    """
+
+    if is_asgi_request(request):
+        response.streaming_content = iterate_in_thread(response.streaming_content)
+
+    return response
+
+
+class _ArchiveSink(io.RawIOBase):
+    """
+    Поток для ZipFile без seek: zipfile пишет data descriptor после каждой записи
+    и не возвращается к заголовкам. Записанное забирается через take().
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip_archive(files):
+    """
+    ZIP из пар (name, content) по частям: после каждой записи отдаётся её сжатый кусок,
+    в конце — центральный каталог. В памяти одновременно только текущая запись.
+    """
+
+    sink = _ArchiveSink()
+
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files:
+            archive.writestr(name, content)
+            yield sink.take()
+
+    yield sink.take()
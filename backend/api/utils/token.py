@@ -4,12 +4,13 @@ from typing import Tuple
 
 from django.conf import settings
 from django.core import signing
-from django.core.cache import cache
 from rest_framework.exceptions import AuthenticationFailed
 
 from api.models.auth import AuthRefreshSession
+from api.models.companies import get_user_company_ids
 from api.models.user import User
-from api.utils.constants import ACCESS_TOKEN_TTL_SECONDS, ACCESS_SALT
+from api.utils.constants import ACCESS_TOKEN_TTL_SECONDS, ACCESS_SALT, MEMBERSHIP_CLAIMS_MAX_COMPANIES
+from api.utils.session_cache import cache_session, get_cached_session, invalidate_sessions
 
 
 def hash_token(token: str) -> str:
@@ -40,14 +41,34 @@ def verify_token(token: str, stored_hash: str) -> bool:
         return False
 
 
-def create_access_token(user: User, session: AuthRefreshSession) -> str:
-    """Create a signed access token"""
+def create_access_token(user: User, session: AuthRefreshSession, with_claims: bool = True) -> str:
+    """
+    Create a signed access token.
+
+    With with_claims the token also carries the user's companies:
+    mc — member company ids, oc — owned company ids, mv — user.membership_version.
+    Claims are skipped for users with more than MEMBERSHIP_CLAIMS_MAX_COMPANIES companies.
+    """
     payload = {
         "user_id": user.id,
         "session_id": session.id,
         "revoked_at": session.revoked_at.isoformat() if session.revoked_at else None,
         "type": "access",
     }
+
+    if with_claims:
+        # версия читается из БД до компаний: при гонке token окажется устаревшим, а не неверным
+        user.refresh_from_db(fields=["membership_version"])
+        membership_version = user.membership_version
+        member_company_ids, owned_company_ids = get_user_company_ids(user)
+
+        if len(member_company_ids) <= MEMBERSHIP_CLAIMS_MAX_COMPANIES:
+            payload.update({
+                "mc": sorted(member_company_ids),
+                "oc": sorted(owned_company_ids),
+                "mv": membership_version,
+            })
+
     return signing.dumps(payload, salt=ACCESS_SALT)
 
 
@@ -71,27 +92,33 @@ def parse_access_token(token: str) -> Tuple[User, AuthRefreshSession]:
     if payload.get("revoked_at"):
         raise AuthenticationFailed("session_revoked")
 
-    # Try cache first
-    cache_key = f"session_{payload['session_id']}"
-    session = cache.get(cache_key)
+    # LRU процесса -> общий кэш "sessions" -> БД
+    session = get_cached_session(payload["session_id"])
 
-    if not session:
+    if session is None or session.user_id != payload["user_id"]:
         try:
             session = AuthRefreshSession.objects.select_related("user").get(
                 id=payload["session_id"],
                 user_id=payload["user_id"],
                 user__is_active=True,
             )
-            # Cache for 5 minutes
-            cache.set(cache_key, session, 300)
         except AuthRefreshSession.DoesNotExist:
             raise AuthenticationFailed("session_not_found")
 
-    if not session.user:
+        cache_session(session)
+
+    if not session.user or not session.user.is_active:
         raise AuthenticationFailed("user_not_found")
 
     if session.revoked_at:
-        cache.delete(cache_key)
+        invalidate_sessions([session.id])
         raise AuthenticationFailed("session_revoked")
 
+    if "mv" in payload:
+        # членство изменилось после выдачи token — клиент получит новые claims через refresh
+        if payload["mv"] != session.user.membership_version:
+            raise AuthenticationFailed("membership_changed")
+
+        session.user.membership_claims = (frozenset(payload["mc"]), frozenset(payload["oc"]))
+
     return session.user, session
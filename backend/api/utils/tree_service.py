@@ -0,0 +1,203 @@
+from collections import defaultdict
+
+from api.models.tree import TreeEntry
+from api.utils.repository_service import get_current_repository_file_versions, normalize_path_prefix
+
+
+TREE_ORDERING = ("-is_dir", "name")
+TREE_FIELDS = ("path", "name", "is_dir", "size", "file_count", "commit_file_id")
+
+
+def split_path(path):
+    parent_path, _, name = path.rpartition("/")
+    return parent_path, name
+
+
+def _ancestors(path):
+    parts = path.split("/")
+    return ["/".join(parts[:index]) for index in range(1, len(parts))]
+
+
+def _blob_size(commit_file):
+    return commit_file.blob.size if commit_file.blob_id else 0
+
+
+def apply_tree_changes(repository, before, changes):
+    """
+    Инкрементально обновляет TreeEntry после коммита.
+
+    - before — {path: size} живых файлов до коммита;
+    - changes — {path: CommitFile} для новых/изменённых файлов и {path: None} для удалённых.
+
+    Для папок считаются дельты size/file_count по всем изменённым путям,
+    поэтому число запросов зависит от числа изменённых папок, а не от размера repository.
+
+    Если файлы до коммита были, а TreeEntry нет (дерево ещё не построено),
+    дельты применять не к чему — дерево пересобирается целиком.
+    """
+
+    entries = TreeEntry.objects.filter(repository_id=repository.id)
+
+    if before and not entries.exists():
+        rebuild_repository_tree(repository)
+        return
+
+    dir_deltas = defaultdict(lambda: [0, 0])
+    deleted_paths = []
+    upserted = {}
+
+    for path, commit_file in changes.items():
+        old_size = before.get(path)
+
+        if commit_file is None:
+            if old_size is None:
+                continue
+            deleted_paths.append(path)
+            delta = (-old_size, -1)
+        else:
+            new_size = _blob_size(commit_file)
+            upserted[path] = (commit_file, new_size)
+            delta = (new_size - old_size, 0) if old_size is not None else (new_size, 1)
+
+        for directory in _ancestors(path):
+            dir_deltas[directory][0] += delta[0]
+            dir_deltas[directory][1] += delta[1]
+
+    if deleted_paths:
+        entries.filter(is_dir=False, path__in=deleted_paths).delete()
+
+    _upsert_files(repository, entries, upserted)
+    _apply_dir_deltas(repository, entries, dir_deltas)
+
+
+def _upsert_files(repository, entries, upserted):
+    if not upserted:
+        return
+
+    existing = {entry.path: entry for entry in entries.filter(is_dir=False, path__in=list(upserted))}
+    created = []
+
+    for path, (commit_file, size) in upserted.items():
+        entry = existing.get(path)
+
+        if entry is None:
+            parent_path, name = split_path(path)
+            created.append(TreeEntry(
+                repository_id=repository.id,
+                path=path,
+                parent_path=parent_path,
+                name=name,
+                size=size,
+                file_count=1,
+                commit_file=commit_file,
+            ))
+        else:
+            entry.size = size
+            entry.commit_file = commit_file
+
+    TreeEntry.objects.bulk_update(list(existing.values()), ["size", "commit_file"], batch_size=500)
+    TreeEntry.objects.bulk_create(created, batch_size=500)
+
+
+def _apply_dir_deltas(repository, entries, dir_deltas):
+    if not dir_deltas:
+        return
+
+    existing = {entry.path: entry for entry in entries.filter(is_dir=True, path__in=list(dir_deltas))}
+    created = []
+    updated = []
+    emptied = []
+
+    for path, (size_delta, count_delta) in dir_deltas.items():
+        entry = existing.get(path)
+
+        if entry is None:
+            if count_delta <= 0:
+                continue
+            parent_path, name = split_path(path)
+            created.append(TreeEntry(
+                repository_id=repository.id,
+                path=path,
+                parent_path=parent_path,
+                name=name,
+                is_dir=True,
+                size=max(size_delta, 0),
+                file_count=count_delta,
+            ))
+            continue
+
+        entry.size = max(entry.size + size_delta, 0)
+        entry.file_count = max(entry.file_count + count_delta, 0)
+
+        if entry.file_count:
+            updated.append(entry)
+        else:
+            emptied.append(entry.id)
+
+    TreeEntry.objects.bulk_update(updated, ["size", "file_count"], batch_size=500)
+    TreeEntry.objects.bulk_create(created, batch_size=500)
+
+    if emptied:
+        TreeEntry.objects.filter(id__in=emptied).delete()
+
+
+def rebuild_repository_tree(repository):
+    """
+    Пересобирает TreeEntry repository с нуля. Возвращает число файлов.
+    """
+
+    TreeEntry.objects.filter(repository_id=repository.id).delete()
+    current_versions = get_current_repository_file_versions(repository)
+    apply_tree_changes(repository, {}, current_versions)
+    return len(current_versions)
+
+
+def head_tree_entries(repository, directory):
+    """
+    Содержимое папки на HEAD из TreeEntry (values(): без моделей и связей).
+    """
+
+    return TreeEntry.objects.filter(repository_id=repository.id, parent_path=directory).values(*TREE_FIELDS)
+
+
+def head_directory_exists(repository, directory):
+    return not directory or TreeEntry.objects.filter(repository_id=repository.id, path=directory, is_dir=True).exists()
+
+
+def aggregate_tree_entries(files, directory):
+    """
+    Содержимое папки из списка живых CommitFile (snapshot произвольного commit,
+    уже ограниченный префиксом папки). Отсортировано как TREE_ORDERING.
+    """
+
+    prefix = normalize_path_prefix(directory)
+    entries = {}
+
+    for commit_file in files:
+        relative = commit_file.path[len(prefix):]
+        name, separator, _rest = relative.partition("/")
+        size = _blob_size(commit_file)
+
+        if not separator:
+            entries[(False, name)] = {
+                "path": commit_file.path,
+                "name": name,
+                "is_dir": False,
+                "size": size,
+                "file_count": 1,
+                "commit_file_id": commit_file.id,
+            }
+            continue
+
+        entry = entries.setdefault((True, name), {
+            "path": prefix + name,
+            "name": name,
+            "is_dir": True,
+            "size": 0,
+            "file_count": 0,
+            "commit_file_id": None,
+        })
+        entry["size"] += size
+        entry["file_count"] += 1
+
+    return sorted(entries.values(), key=lambda entry: (not entry["is_dir"], entry["name"]))
@@ -5,12 +5,14 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
 from api.models.user import UserProfile
-from api.utils.auth_service import get_user_from_request_data
+from api.utils.auth_service import get_user_from_request_data, is_admin
 from api.utils.constants import ACCESS_TOKEN_TTL_SECONDS, REFRESH_COOKIE_NAME
+from api.utils.rate_limit import get_rate_limit_counters, rate_limit
 from api.utils.serializers import serialize_user
 from api.utils.session import (
     clear_refresh_cookie,
     create_refresh_session,
+    request_get_str,
     revoke_refresh_session,
     rotate_refresh_session,
     set_refresh_cookie,
@@ -32,10 +34,11 @@ def serialize_auth_response(user, session):
 
 
 @api_view(["POST"])
+@rate_limit("register", identifier_fields=("username", "email"))
 def register_user(request):
-    username = (request.data.get("username") or "").strip().lower()
-    email = (request.data.get("email") or "").strip().lower()
-    password = request.data.get("password")
+    username = request_get_str(request.data, "username").lower()
+    email = request_get_str(request.data, "email").lower()
+    password = request_get_str(request.data, "password", strip=False)
 
     if not username or not email or not password:
         return Response({"error": "missing_fields"}, status=400)
@@ -61,15 +64,15 @@ def register_user(request):
 
 
 @api_view(["POST"])
+@rate_limit("login", identifier_fields=("login",))
 def login_user(request):
-    login = (request.data.get("login") or "").strip().lower()
-    password = request.data.get("password")
+    login = request_get_str(request.data, "login").lower()
+    password = request_get_str(request.data, "password", strip=False)
 
     if not login or not password:
         return Response({"error": "missing_fields"}, status=400)
 
-    user = authenticate(username=login, password=password) \
-           or authenticate(email=login, password=password)
+    user = authenticate(request, login=login, password=password)
 
     if not user:
         return Response({"error": "invalid_credentials"}, status=400)
@@ -94,6 +97,7 @@ def validate_token(request):
 
 
 @api_view(["POST"])
+@rate_limit("refresh")
 def refresh_token(request):
     raw_token = request.COOKIES.get(REFRESH_COOKIE_NAME)
 
@@ -122,3 +126,19 @@ def logout_user(request):
 
     response = Response({"message": "logged_out"})
     return clear_refresh_cookie(response)
+
+
+@api_view(["GET"])
+def rate_limit_stats(request):
+    """
+    Счётчики rate limit этого процесса (allowed / limited / fallback по scope). Только для admin.
+    """
+
+    user, error = get_user_from_request_data(request)
+    if error:
+        return error
+
+    if not is_admin(user):
+        return Response({"error": "forbidden"}, status=403)
+
+    return Response({"counters": get_rate_limit_counters()})
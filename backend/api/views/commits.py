@@ -1,17 +1,25 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django.db import transaction
-from django.http import HttpResponse
+from django.db.models import F
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import status
+import json
 import os
+import struct
 
 from api.models.commit import Commit, CommitFile
 from api.models.companies import can_edit_repository, can_view_repository
+from api.models.content import FileBlob
 from api.models.repositories import Repository
 from api.utils.auth_service import get_user_from_request_data
+from api.utils.blob_reader import prefetch_blobs
+from api.utils.constants import BATCH_DOWNLOAD_MAX_ITEMS
 from api.utils.commit_service import get_commit_snapshot_files, create_repository_commit
 from api.utils.logging_service import log_action
+from api.utils.repository_service import path_filter_from_request
 from api.utils.session import request_get_list
+from api.utils.streaming import stream_in_thread
 
 
 @api_view(["POST"])
@@ -25,8 +33,10 @@ def create_commit(request, repository_id):
     - files[] multipart, опционально
     - paths[] multipart, опционально
 
-    Упрощение для MVP:
-    каждый загруженный файл создаёт/обновляет File + CommitFile с operation added/modified.
+    Файлы сравниваются с HEAD по sha256:
+    - без изменений — пропускаются;
+    - содержимое удаляемого файла по новому пути — renamed;
+    - если изменений нет совсем — 400.
     """
 
     user, error = get_user_from_request_data(request)
@@ -177,7 +187,7 @@ def get_commit_snapshot(request, commit_id):
             status=status.HTTP_403_FORBIDDEN,
         )
 
-    snapshot = get_commit_snapshot_files(commit)
+    snapshot = get_commit_snapshot_files(commit, path_filter=path_filter_from_request(request))
 
     result = []
 
@@ -198,3 +208,118 @@ def get_commit_snapshot(request, commit_id):
         )
 
     return Response(result, status=status.HTTP_200_OK)
+
+
+def _parse_id_list(data, key):
+    ids = []
+    for value in request_get_list(data, key):
+        if isinstance(value, str) and "," in value:
+            ids.extend(part for part in value.split(",") if part.strip())
+        else:
+            ids.append(value)
+    return [int(value) for value in ids]
+
+
+def _build_frame(header, content=b""):
+    header_bytes = json.dumps(header, ensure_ascii=False).encode()
+    return struct.pack(">I", len(header_bytes)) + header_bytes + content
+
+
+@api_view(["POST"])
+def download_commit_files_batch(request):
+    """
+    Скачать много файлов одним запросом.
+
+    Request:
+    - Authorization: Bearer <access_token>
+    - commit_file_ids[] и/или blob_ids[] (список или строка через запятую)
+
+    Response (application/octet-stream) — последовательность кадров в порядке запроса:
+    - 4 байта big-endian: длина JSON-заголовка;
+    - JSON-заголовок: type, id, path, blob_id, size, sha256, mime_type или error;
+    - ровно size байт содержимого (у кадра с error содержимого нет).
+
+    Права проверяются один раз на каждый repository, а не на каждый файл.
+    """
+
+    user, error = get_user_from_request_data(request)
+    if error:
+        return error
+
+    try:
+        commit_file_ids = _parse_id_list(request.data, "commit_file_ids")
+        blob_ids = _parse_id_list(request.data, "blob_ids")
+    except (TypeError, ValueError):
+        return Response({"error": "Некорректный список id"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not commit_file_ids and not blob_ids:
+        return Response({"error": "Нужно передать commit_file_ids или blob_ids"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if len(commit_file_ids) + len(blob_ids) > BATCH_DOWNLOAD_MAX_ITEMS:
+        return Response(
+            {"error": f"За один запрос можно скачать не больше {BATCH_DOWNLOAD_MAX_ITEMS} файлов"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    commit_files = {
+        commit_file.id: commit_file
+        for commit_file in CommitFile.objects.filter(id__in=commit_file_ids)
+        .select_related("blob")
+        .annotate(repository_id=F("commit__repository_id"))
+    }
+    blobs = {blob.id: blob for blob in FileBlob.objects.filter(id__in=blob_ids)}
+
+    repository_ids = {commit_file.repository_id for commit_file in commit_files.values()}
+    repository_ids |= {blob.repository_id for blob in blobs.values()}
+    visible_repository_ids = {
+        repository.id
+        for repository in Repository.objects.filter(id__in=repository_ids).select_related("owner_company")
+        if can_view_repository(user, repository)
+    }
+
+    entries = []
+
+    for commit_file_id in commit_file_ids:
+        commit_file = commit_files.get(commit_file_id)
+        header = {"type": "commit_file", "id": commit_file_id}
+
+        if commit_file is None:
+            entries.append(({**header, "error": "not_found"}, None))
+        elif commit_file.repository_id not in visible_repository_ids:
+            entries.append(({**header, "error": "forbidden"}, None))
+        elif not commit_file.blob:
+            entries.append(({**header, "path": commit_file.path, "error": "no_content"}, None))
+        else:
+            entries.append(({**header, "path": commit_file.path}, commit_file.blob))
+
+    for blob_id in blob_ids:
+        blob = blobs.get(blob_id)
+        header = {"type": "blob", "id": blob_id}
+
+        if blob is None:
+            entries.append(({**header, "error": "not_found"}, None))
+        elif blob.repository_id not in visible_repository_ids:
+            entries.append(({**header, "error": "forbidden"}, None))
+        else:
+            entries.append(({**header, "path": blob.original_name}, blob))
+
+    def stream():
+        for (header, blob), content in prefetch_blobs(entries, get_blob=lambda entry: entry[1]):
+            if blob is None:
+                yield _build_frame(header)
+                continue
+
+            yield _build_frame(
+                {
+                    **header,
+                    "blob_id": blob.id,
+                    "size": len(content),
+                    "sha256": blob.sha256,
+                    "mime_type": blob.mime_type,
+                },
+                content,
+            )
+
+    response = StreamingHttpResponse(stream(), content_type="application/octet-stream")
+    response["Content-Disposition"] = 'attachment; filename="files.bin"'
+    return stream_in_thread(request, response)
@@ -15,9 +15,10 @@ from api.models.companies import (
 )
 from api.utils.auth_service import get_user_from_request_data
 from api.utils.logging_service import log_action
+from api.utils.pagination import paginated_response
 from api.utils.repository_service import with_user
 
-from api.utils.serializers import serialize_user, serialize_repository, serialize_company
+from api.utils.serializers import REPOSITORY_RELATED_FIELDS, serialize_user, serialize_repositories, serialize_company, serialize_companies
 
 from django.contrib.auth import get_user_model
 User = get_user_model()
@@ -59,7 +60,7 @@ def get_companies(request, user):
     )
 
     return Response(
-        [serialize_company(company, user) for company in companies],
+        serialize_companies(companies, user),
         status=status.HTTP_200_OK
     )
 
@@ -179,9 +180,14 @@ def get_company_members(request, user, company_id):
     if not is_company_member(user, company):
         return Response({"error": "Нет прав"}, status=403)
 
-    members = User.objects.filter(companymember__company=company)
+    members = User.objects.filter(companymember__company=company).select_related("profile")
 
-    return Response([serialize_user(m) for m in members])
+    return paginated_response(
+        request,
+        members,
+        ("username", "id"),
+        lambda page: [serialize_user(m) for m in page],
+    )
 
 
 
@@ -261,9 +267,9 @@ def get_company_repositories(request, user, company_id):
     if not is_member:
         repos = repos.filter(visibility="public")
 
-    repos = repos.order_by("name")
+    repos = repos.select_related(*REPOSITORY_RELATED_FIELDS).order_by("name")
 
-    return Response([serialize_repository(r, user) for r in repos])
+    return Response(serialize_repositories(repos, user))
 
 
 @api_view(["POST"])
@@ -11,6 +11,8 @@ from api.models.content import (
 )
 from api.utils.auth_service import get_user_from_request_data, is_admin
 from api.utils.logging_service import log_action
+from api.utils.pagination import paginated_response
+from api.utils.streaming import stream_in_thread
 
 
 def build_document_text(title, content, category=None):
@@ -83,9 +85,14 @@ def serialize_documentation(item):
 def news_view(request):
     news = Documentation.objects.filter(
         type=DocumentationType.NEWS
-    ).order_by("-created_at")
+    ).select_related("admin")
 
-    return Response([serialize_documentation(n) for n in news])
+    return paginated_response(
+        request,
+        news,
+        ("-created_at", "-id"),
+        lambda page: [serialize_documentation(n) for n in page],
+    )
 
 
 @api_view(["POST"])
@@ -260,11 +267,12 @@ def download_file(request, version_id):
     except AppVersion.DoesNotExist:
         return Response({"error": "not_found"}, status=404)
 
-    return FileResponse(
+    response = FileResponse(
         version.file.open("rb"),
         as_attachment=True,
         filename=version.original_name
     )
+    return stream_in_thread(request, response)
 
 
 @api_view(["POST"])
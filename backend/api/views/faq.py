@@ -5,6 +5,7 @@ from rest_framework import status
 from api.models.content import FAQ
 from api.utils.auth_service import get_user_from_request_data, is_admin
 from api.utils.logging_service import log_action
+from api.utils.pagination import paginated_response
 
 
 def serialize_faq(faq):
@@ -23,8 +24,13 @@ def serialize_faq(faq):
 
 @api_view(["GET"])
 def get_QA_list(request):
-    qs = FAQ.objects.select_related("questioner", "answerer").order_by("-created_at")
-    return Response([serialize_faq(q) for q in qs])
+    qs = FAQ.objects.select_related("questioner", "answerer")
+    return paginated_response(
+        request,
+        qs,
+        ("-created_at", "-id"),
+        lambda page: [serialize_faq(q) for q in page],
+    )
 
 
 @api_view(["GET"])
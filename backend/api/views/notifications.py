@@ -1,6 +1,8 @@
+import asyncio
 import time
 
-from django.http import StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib.auth import get_user_model
 
 from rest_framework.decorators import api_view
@@ -14,28 +16,63 @@ from api.models.notifications import Notification, NotificationStatus
 from django.contrib.auth import get_user_model
 
 from api.utils.auth_service import get_user_from_request_data, is_admin
+from api.utils.constants import (
+    NOTIFICATION_HEARTBEAT_SECONDS,
+    NOTIFICATION_STREAM_MAX_SECONDS,
+    NOTIFICATION_STREAM_RETRY_MS,
+)
+from api.utils.notification_broker import get_broker
+from api.utils.notification_counter import get_unread_count
+from api.utils.pagination import paginated_response
+from api.utils.streaming import is_asgi_request
 
 User = get_user_model()
 
-def notification_events(request):
-    user, error = get_user_from_request_data(request)
+async def notification_events(request):
+    """
+    SSE-поток числа непрочитанных уведомлений (нужен ASGI-сервер).
+
+    - соединение ждёт события broker-а, а не опрашивает БД;
+    - раз в NOTIFICATION_HEARTBEAT_SECONDS уходит комментарий-heartbeat;
+    - поток закрывается через NOTIFICATION_STREAM_MAX_SECONDS, EventSource переподключается сам
+      (Django 4.2 не сообщает view об отключении клиента, так подписки не копятся);
+    - не больше NOTIFICATION_STREAM_MAX_PER_USER соединений пользователя на процесс:
+      новое соединение вытесняет самое старое (обычно уже закрытую вкладку), а не получает 429;
+    - под WSGI бесконечный поток собрался бы в памяти целиком, поэтому сразу 501.
+    """
+
+    if not is_asgi_request(request):
+        return JsonResponse({"error": "asgi_required"}, status=501)
+
+    user, error = await sync_to_async(get_user_from_request_data)(request)
     if error:
-        return error
+        return JsonResponse(error.data, status=error.status_code)
 
-    def stream():
-        last_count = None
+    subscription = get_broker().subscribe(user.id)
 
-        while True:
-            count = Notification.objects.filter(
-                recipient=user,
-                status=NotificationStatus.UNREAD,
-            ).count()
+    async def stream():
+        with subscription:
+            yield f"retry: {NOTIFICATION_STREAM_RETRY_MS}\n\n"
 
-            if count != last_count:
-                last_count = count
-                yield f"event: notifications_changed\ndata: {count}\n\n"
+            count = await sync_to_async(get_unread_count)(user.id)
+            yield f"event: notifications_changed\ndata: {count}\n\n"
+
+            deadline = time.monotonic() + NOTIFICATION_STREAM_MAX_SECONDS
+
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    count = await asyncio.wait_for(
+                        subscription.get(),
+                        timeout=min(NOTIFICATION_HEARTBEAT_SECONDS, remaining),
+                    )
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
 
-            time.sleep(5)
+                if subscription.evicted:
+                    return
+
+                yield f"event: notifications_changed\ndata: {count}\n\n"
 
     response = StreamingHttpResponse(stream(), content_type="text/event-stream")
     response["Cache-Control"] = "no-cache"
@@ -75,39 +112,21 @@ def get_notifications(request):
             )
         notifications = notifications.filter(status=status_filter)
 
-    notifications = notifications.order_by("-created_at")
-
-    return Response(
-        [serialize_notification(n) for n in notifications],
-        status=status.HTTP_200_OK,
+    return paginated_response(
+        request,
+        notifications,
+        ("-created_at", "-id"),
+        lambda page: [serialize_notification(n) for n in page],
     )
 
-
-
 @api_view(["GET"])
-def get_notifications(request):
+def get_unread_notification_count(request):
     user, error = get_user_from_request_data(request)
     if error:
         return error
 
-    status_filter = request.GET.get("status")
-
-    notifications = Notification.objects.filter(recipient=user)
+    return Response({"unread_count": get_unread_count(user.id)})
 
-    if status_filter:
-        if status_filter not in NotificationStatus.values:
-            return Response(
-                {"error": "invalid_status"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        notifications = notifications.filter(status=status_filter)
-
-    notifications = notifications.order_by("-created_at")
-
-    return Response(
-        [serialize_notification(n) for n in notifications],
-        status=status.HTTP_200_OK,
-    )
 
 @api_view(["POST"])
 def create_notification(request):
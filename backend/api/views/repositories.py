@@ -1,14 +1,13 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q
+import hashlib
 import os
-import io
+import re
 from django.core.files.base import ContentFile
 from django.utils import timezone
 from django.db import transaction
-from django.http import HttpResponse
-import zipfile
+from django.http import HttpResponse, StreamingHttpResponse
 
 from api.choices import CommitFileOperation, RepositoryVisibility
 from api.models.companies import can_view_repository, can_edit_repository, can_delete_repository, \
@@ -16,13 +15,22 @@ from api.models.companies import can_view_repository, can_edit_repository, can_d
 from api.models.content import File, FileBlob
 from api.models.commit import CommitFile, Commit
 from api.models.repositories import Repository
+from api.models.tree import TreeEntry
 from api.utils.auth_service import get_user_from_request_data
-from api.utils.commit_service import create_repository_commit, get_commit_snapshot_files
+from api.utils.blob_reader import prefetch_blobs
+from api.utils.commit_service import create_repository_commit, get_commit_snapshot_files, live_file_sizes, \
+    record_commit_stats, get_file_history, encode_file_history_cursor, decode_file_history_cursor, build_commit_summary, \
+    COMMIT_SUMMARY_FIELDS
+from api.utils.constants import COMMIT_REF_MIN_PREFIX_LENGTH
 from api.utils.logging_service import log_action
+from api.utils.pagination import InvalidCursor, get_page, get_page_size, paginate_list, paginate_queryset, paginated_response
 from api.utils.repository_service import get_current_repository_file_versions, sanitize_archive_path, build_commit_hash, \
-    get_latest_commit
-from api.utils.serializers import serialize_repository
+    get_latest_commit, path_filter_from_request, build_path_filter, normalize_path_prefix
+from api.utils.serializers import REPOSITORY_RELATED_FIELDS, serialize_repositories, serialize_repository
 from api.utils.session import request_get_list
+from api.utils.streaming import iter_zip_archive, stream_in_thread
+from api.utils.tree_service import TREE_ORDERING, aggregate_tree_entries, apply_tree_changes, head_directory_exists, \
+    head_tree_entries
 
 
 @api_view(["GET"])
@@ -44,7 +52,7 @@ def get_commit_snapshot(request, repository_id, commit_id):
     except Commit.DoesNotExist:
         return Response({"error": "Коммит не найден"}, status=status.HTTP_404_NOT_FOUND)
 
-    snapshot = get_commit_snapshot_files(commit)
+    snapshot = get_commit_snapshot_files(commit, path_filter=path_filter_from_request(request))
 
     return Response([
         {
@@ -65,20 +73,31 @@ def get_commit_snapshot(request, repository_id, commit_id):
 # =========================================================
 # REPOSITORIES
 # =========================================================
+# ?sort= для списков repository; "updated" идёт по индексу repository_updated_idx
+REPOSITORY_LIST_ORDERINGS = {
+    "name": ("name", "id"),
+    "updated": ("-updated_at", "-id"),
+}
+
+
+def _repository_list_ordering(request):
+    return REPOSITORY_LIST_ORDERINGS.get(request.GET.get("sort"), REPOSITORY_LIST_ORDERINGS["name"])
+
+
 @api_view(["GET"])
 def get_repositories(request):
     user, error = get_user_from_request_data(request)
     if error:
         return error
 
-    repositories = Repository.objects.filter(
-        Q(visibility=RepositoryVisibility.PUBLIC)
-        | Q(owner_user=user)
-        | Q(owner_company__owner=user)
-        | Q(owner_company__companymember__user=user)
-    ).distinct().order_by("name")
+    repositories = Repository.objects.visible_to(user).select_related(*REPOSITORY_RELATED_FIELDS)
 
-    return Response([serialize_repository(repository, user) for repository in repositories], status=status.HTTP_200_OK)
+    return paginated_response(
+        request,
+        repositories,
+        _repository_list_ordering(request),
+        lambda page: serialize_repositories(page, user),
+    )
 
 
 @api_view(["GET"])
@@ -87,8 +106,12 @@ def get_my_repositories(request):
     if error:
         return error
 
-    repositories = Repository.objects.filter(owner_user=user).order_by("name")
-    return Response([serialize_repository(repository, user) for repository in repositories], status=status.HTTP_200_OK)
+    repositories = (
+        Repository.objects.filter(owner_user=user)
+        .select_related(*REPOSITORY_RELATED_FIELDS)
+        .order_by(*_repository_list_ordering(request))
+    )
+    return Response(serialize_repositories(repositories, user), status=status.HTTP_200_OK)
 
 
 @api_view(["GET"])
@@ -97,8 +120,15 @@ def get_public_repositories(request):
     if error:
         return error
 
-    repositories = Repository.objects.filter(visibility=RepositoryVisibility.PUBLIC).order_by("name")
-    return Response([serialize_repository(repository, user) for repository in repositories], status=status.HTTP_200_OK)
+    repositories = Repository.objects.filter(
+        visibility=RepositoryVisibility.PUBLIC
+    ).select_related(*REPOSITORY_RELATED_FIELDS)
+    return paginated_response(
+        request,
+        repositories,
+        _repository_list_ordering(request),
+        lambda page: serialize_repositories(page, user),
+    )
 
 
 @api_view(["POST"])
@@ -274,7 +304,7 @@ def get_repository_files(request, repository_id):
     if not can_view_repository(user, repository):
         return Response({"error": "Недостаточно прав"}, status=status.HTTP_403_FORBIDDEN)
 
-    current_versions = get_current_repository_file_versions(repository)
+    current_versions = get_current_repository_file_versions(repository, path_filter=path_filter_from_request(request))
     return Response(
         [
             {
@@ -294,7 +324,13 @@ def get_repository_files(request, repository_id):
 
 
 @api_view(["GET"])
-def get_repository_detail(request, repository_id):
+def get_repository_file_history(request, repository_id):
+    """
+    Версии одного файла (?path=), новые первыми, включая версии до переименований.
+
+    ?cursor=/?limit= — как в остальных списках.
+    """
+
     user, error = get_user_from_request_data(request)
     if error:
         return error
@@ -307,44 +343,118 @@ def get_repository_detail(request, repository_id):
     if not can_view_repository(user, repository):
         return Response({"error": "Недостаточно прав"}, status=status.HTTP_403_FORBIDDEN)
 
-    current_versions = get_current_repository_file_versions(repository)
-    commits = repository.commits.select_related("created_by").order_by("-created_at", "-id")
+    path = (request.GET.get("path") or "").strip()
+    if not path:
+        return Response({"error": "path обязателен"}, status=status.HTTP_400_BAD_REQUEST)
+
+    before_commit_id = None
+    cursor = request.GET.get("cursor")
+
+    if cursor:
+        try:
+            path, before_commit_id = decode_file_history_cursor(cursor)
+        except InvalidCursor:
+            return Response({"error": "invalid_cursor"}, status=status.HTTP_400_BAD_REQUEST)
+    elif not File.objects.filter(repository=repository, path=path).exists():
+        return Response({"error": "Файл не найден"}, status=status.HTTP_404_NOT_FOUND)
+
+    rows, next_state = get_file_history(repository, path, before_commit_id, limit=get_page_size(request))
 
     return Response(
         {
-            "repository": serialize_repository(repository, user),
-            "files": [
+            "results": [
                 {
-                    "id": commit_file.file_id,
-                    "path": path,
-                    "name": os.path.basename(path),
-                    "commit_file_id": commit_file.id,
-                    "blob_id": commit_file.blob_id,
-                    "size": commit_file.blob.size if commit_file.blob else None,
-                    "sha256": commit_file.blob.sha256 if commit_file.blob else None,
-                    "download_url": f"/api/commit-files/{commit_file.id}/download/" if commit_file.blob_id else None,
+                    "commit_file_id": row["id"],
+                    "commit_id": row["commit_id"],
+                    "commit_hash": row["commit__commit_hash"],
+                    "message": row["commit__message"],
+                    "created_at": row["commit__created_at"].isoformat(),
+                    "created_by_id": row["commit__created_by_id"],
+                    "created_by_username": row["commit__created_by__username"],
+                    "path": row["path"],
+                    "previous_path": row["previous_path"],
+                    "operation": row["operation"],
+                    "size": row["blob__size"],
+                    "sha256": row["blob__sha256"],
+                    "download_url": f"/api/commit-files/{row['id']}/download/" if row["blob_id"] else None,
                 }
-                for path, commit_file in sorted(current_versions.items())
-            ],
-            "commits": [
-                {
-                    "id": commit.id,
-                    "message": commit.message,
-                    "commit_hash": commit.commit_hash,
-                    "parent_id": commit.parent_id,
-                    "created_by_id": commit.created_by_id,
-                    "created_by_username": commit.created_by.username,
-                    "created_at": commit.created_at.isoformat(),
-                }
-                for commit in commits
+                for row in rows
             ],
+            "next_cursor": encode_file_history_cursor(*next_state) if next_state else None,
         },
         status=status.HTTP_200_OK,
     )
 
 
+class InvalidCommitRef(Exception):
+    pass
+
+
+class AmbiguousCommitRef(Exception):
+    pass
+
+
+COMMIT_ID_REF_RE = re.compile(r"^id:(\d+)$")
+COMMIT_HASH_REF_RE = re.compile(rf"^[0-9a-fA-F]{{{COMMIT_REF_MIN_PREFIX_LENGTH},64}}$")
+
+
+def resolve_commit_ref(repository, ref):
+    """
+    ref — "HEAD", "id:<id коммита>" или префикс commit_hash не короче COMMIT_REF_MIN_PREFIX_LENGTH.
+    Возвращает (commit, is_head); commit = None для пустого repository на HEAD.
+
+    - InvalidCommitRef — ref не подходит ни под один вид;
+    - AmbiguousCommitRef — префиксу соответствует больше одного коммита;
+    - Commit.DoesNotExist — коммит не найден.
+    """
+
+    latest_commit = get_latest_commit(repository)
+
+    if ref == "HEAD":
+        return latest_commit, True
+
+    commits = repository.commits.all()
+
+    if match := COMMIT_ID_REF_RE.match(ref):
+        commit = commits.get(id=int(match[1]))
+    elif COMMIT_HASH_REF_RE.match(ref):
+        matches = list(commits.filter(commit_hash__startswith=ref.lower())[:2])
+        if len(matches) > 1:
+            raise AmbiguousCommitRef()
+        if not matches:
+            raise Commit.DoesNotExist()
+        commit = matches[0]
+    else:
+        raise InvalidCommitRef()
+
+    return commit, latest_commit is not None and commit.id == latest_commit.id
+
+
+def _serialize_tree_entry(entry):
+    commit_file_id = entry["commit_file_id"]
+
+    return {
+        "name": entry["name"],
+        "path": entry["path"],
+        "type": "dir" if entry["is_dir"] else "file",
+        "size": entry["size"],
+        "file_count": entry["file_count"],
+        "commit_file_id": commit_file_id,
+        "download_url": f"/api/commit-files/{commit_file_id}/download/" if commit_file_id else None,
+    }
+
+
 @api_view(["GET"])
-def get_repository_commits(request, repository_id):
+def get_repository_tree(request, repository_id, ref, directory=""):
+    """
+    Содержимое одной папки: только непосредственные дети, папки первыми.
+
+    - для папок size и file_count — суммы по всему поддереву;
+    - HEAD читается из TreeEntry одним индексным запросом;
+    - другой commit — из snapshot, ограниченного префиксом папки;
+    - ?cursor=/?limit= — как в остальных списках.
+    """
+
     user, error = get_user_from_request_data(request)
     if error:
         return error
@@ -357,24 +467,154 @@ def get_repository_commits(request, repository_id):
     if not can_view_repository(user, repository):
         return Response({"error": "Недостаточно прав"}, status=status.HTTP_403_FORBIDDEN)
 
-    commits = repository.commits.select_related("created_by").order_by("-created_at")
+    try:
+        commit, is_head = resolve_commit_ref(repository, ref)
+    except Commit.DoesNotExist:
+        return Response({"error": "Коммит не найден"}, status=status.HTTP_404_NOT_FOUND)
+    except InvalidCommitRef:
+        return Response({"error": "invalid_ref"}, status=status.HTTP_400_BAD_REQUEST)
+    except AmbiguousCommitRef:
+        return Response({"error": "ambiguous_ref"}, status=status.HTTP_409_CONFLICT)
+
+    directory = normalize_path_prefix(directory).rstrip("/")
+
+    try:
+        if is_head or commit is None:
+            if not head_directory_exists(repository, directory):
+                return Response({"error": "Папка не найдена"}, status=status.HTTP_404_NOT_FOUND)
+            entries, next_cursor = paginate_queryset(request, head_tree_entries(repository, directory), TREE_ORDERING)
+        else:
+            files = get_commit_snapshot_files(commit, path_filter=build_path_filter(directory))
+            all_entries = aggregate_tree_entries(files, directory)
+            if directory and not all_entries:
+                return Response({"error": "Папка не найдена"}, status=status.HTTP_404_NOT_FOUND)
+            entries, next_cursor = paginate_list(request, all_entries, TREE_ORDERING, TreeEntry)
+    except InvalidCursor:
+        return Response({"error": "invalid_cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
     return Response(
-        [
-            {
-                "id": commit.id,
-                "message": commit.message,
-                "commit_hash": commit.commit_hash,
-                "parent_id": commit.parent_id,
-                "created_by_id": commit.created_by_id,
-                "created_by_username": commit.created_by.username,
-                "created_at": commit.created_at.isoformat(),
-            }
-            for commit in commits
-        ],
+        {
+            "commit_id": commit.id if commit else None,
+            "path": directory,
+            "entries": [_serialize_tree_entry(entry) for entry in entries],
+            "next_cursor": next_cursor,
+        },
         status=status.HTTP_200_OK,
     )
 
 
+# проекция коммита для списков: без загрузки моделей Commit/User
+COMMIT_LIST_FIELDS = (
+    "id",
+    "message",
+    "commit_hash",
+    "parent_id",
+    "created_by_id",
+    "created_by__username",
+    "created_at",
+    *COMMIT_SUMMARY_FIELDS,
+)
+COMMIT_LIST_ORDERING = ("-created_at", "-id")
+
+
+def _serialize_commit_row(row):
+    return {
+        "id": row["id"],
+        "message": row["message"],
+        "commit_hash": row["commit_hash"],
+        "parent_id": row["parent_id"],
+        "created_by_id": row["created_by_id"],
+        "created_by_username": row["created_by__username"],
+        "created_at": row["created_at"].isoformat(),
+        **{field: row[field] for field in COMMIT_SUMMARY_FIELDS},
+    }
+
+
+def _repository_etag(repository, head_commit_id, user, permissions):
+    raw = f"{repository.id}:{head_commit_id}:{repository.updated_at.isoformat()}:{user.id}:{permissions}"
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+@api_view(["GET"])
+def get_repository_detail(request, repository_id):
+    """
+    Шапка repository + первая страница корня дерева и первая страница коммитов.
+
+    - ?limit= — размер обеих первых страниц;
+    - остальное догружается по курсорам: tree.next_cursor -> /tree/HEAD/?cursor=,
+      commits_next_cursor -> /commits/?cursor=;
+    - ETag строится из head commit, updated_at repository и прав пользователя;
+      при совпадении If-None-Match возвращается 304 без тела.
+    """
+
+    user, error = get_user_from_request_data(request)
+    if error:
+        return error
+
+    try:
+        repository = Repository.objects.select_related(*REPOSITORY_RELATED_FIELDS).get(id=repository_id)
+    except Repository.DoesNotExist:
+        return Response({"error": "Репозиторий не найден"}, status=status.HTTP_404_NOT_FOUND)
+
+    permissions = (
+        can_view_repository(user, repository),
+        can_edit_repository(user, repository),
+        can_delete_repository(user, repository),
+    )
+
+    if not permissions[0]:
+        return Response({"error": "Недостаточно прав"}, status=status.HTTP_403_FORBIDDEN)
+
+    commits = repository.commits.values(*COMMIT_LIST_FIELDS)
+    head_commit_id = repository.commits.order_by(*COMMIT_LIST_ORDERING).values_list("id", flat=True).first()
+    etag = _repository_etag(repository, head_commit_id, user, permissions)
+
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    limit = get_page_size(request)
+    tree_entries, tree_next_cursor = get_page(head_tree_entries(repository, ""), TREE_ORDERING, limit=limit)
+    commit_rows, commits_next_cursor = get_page(commits, COMMIT_LIST_ORDERING, limit=limit)
+
+    return Response(
+        {
+            "repository": serialize_repository(repository, user, permissions=permissions),
+            "head_commit_id": head_commit_id,
+            "tree": {
+                "path": "",
+                "entries": [_serialize_tree_entry(entry) for entry in tree_entries],
+                "next_cursor": tree_next_cursor,
+            },
+            "commits": [_serialize_commit_row(row) for row in commit_rows],
+            "commits_next_cursor": commits_next_cursor,
+        },
+        status=status.HTTP_200_OK,
+        headers={"ETag": etag},
+    )
+
+
+@api_view(["GET"])
+def get_repository_commits(request, repository_id):
+    user, error = get_user_from_request_data(request)
+    if error:
+        return error
+
+    try:
+        repository = Repository.objects.get(id=repository_id)
+    except Repository.DoesNotExist:
+        return Response({"error": "Репозиторий не найден"}, status=status.HTTP_404_NOT_FOUND)
+
+    if not can_view_repository(user, repository):
+        return Response({"error": "Недостаточно прав"}, status=status.HTTP_403_FORBIDDEN)
+
+    return paginated_response(
+        request,
+        repository.commits.values(*COMMIT_LIST_FIELDS),
+        COMMIT_LIST_ORDERING,
+        lambda page: [_serialize_commit_row(row) for row in page],
+    )
+
+
 @api_view(["POST"])
 def delete_repository_file(request, repository_id):
     user, error = get_user_from_request_data(request)
@@ -437,21 +677,22 @@ def download_repository(request, repository_id):
     if not can_view_repository(user, repository):
         return Response({"error": "Недостаточно прав"}, status=status.HTTP_403_FORBIDDEN)
 
-    current_versions = get_current_repository_file_versions(repository)
-    buffer = io.BytesIO()
-
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
-        for path, commit_file in current_versions.items():
-            if not commit_file.blob:
-                continue
-            with commit_file.blob.blob.open("rb") as file_handle:
-                archive.writestr(sanitize_archive_path(path), file_handle.read())
+    current_versions = get_current_repository_file_versions(repository, path_filter=path_filter_from_request(request))
+    entries = [
+        (path, commit_file)
+        for path, commit_file in sorted(current_versions.items())
+        if commit_file.blob
+    ]
+    # следующие blob-ы читаются заранее, пока текущий сжимается и отдаётся
+    files = (
+        (sanitize_archive_path(path), content)
+        for (path, _commit_file), content in prefetch_blobs(entries, get_blob=lambda entry: entry[1].blob)
+    )
 
-    buffer.seek(0)
     filename = f"{repository.name}.zip"
-    response = HttpResponse(buffer.getvalue(), content_type="application/zip")
+    response = StreamingHttpResponse(iter_zip_archive(files), content_type="application/zip")
     response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    return response
+    return stream_in_thread(request, response)
 
 
 @api_view(["GET"])
@@ -505,14 +746,6 @@ def revert_repository_to_commit(request, repository_id, commit_id):
 
     with transaction.atomic():
 
-        new_commit = Commit.objects.create(
-            repository=repository,
-            created_by=user,
-            message=message,
-            parent=get_latest_commit(repository),
-            commit_hash=build_commit_hash(repository, user, message),
-        )
-
         # состояние target commit
         target_files = {
             f.path: f
@@ -522,13 +755,31 @@ def revert_repository_to_commit(request, repository_id, commit_id):
 
         # текущее состояние HEAD
         current_files = get_current_repository_file_versions(repository)
+        sizes_before = live_file_sizes(current_files.values())
+        sizes_after = live_file_sizes(target_files.values())
+
+        new_commit = Commit.objects.create(
+            repository=repository,
+            created_by=user,
+            message=message,
+            parent=get_latest_commit(repository),
+            commit_hash=build_commit_hash(repository, user, message),
+            **build_commit_summary(
+                [CommitFileOperation.DELETED for path in current_files if path not in target_files]
+                + [CommitFileOperation.MODIFIED] * len(target_files),
+                sum(sizes_after.values()) - sum(sizes_before.values()),
+            ),
+        )
 
         # ------------------------
         # 1. удаляем лишние файлы
         # ------------------------
+        tree_changes = {}
+
         for path in current_files.keys():
             if path not in target_files:
                 file_obj = current_files[path].file
+                tree_changes[path] = None
 
                 CommitFile.objects.create(
                     commit=new_commit,
@@ -547,7 +798,7 @@ def revert_repository_to_commit(request, repository_id, commit_id):
                 path=path
             )
 
-            CommitFile.objects.create(
+            tree_changes[path] = CommitFile.objects.create(
                 commit=new_commit,
                 file=file_obj,
                 path=path,
@@ -555,4 +806,7 @@ def revert_repository_to_commit(request, repository_id, commit_id):
                 blob=f.blob,
             )
 
+        apply_tree_changes(repository, sizes_before, tree_changes)
+        record_commit_stats(repository, new_commit, sizes_before, sizes_after)
+
     return Response({"message": "OK"})
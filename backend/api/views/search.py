@@ -0,0 +1,48 @@
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from api.choices import SearchDocumentKind
+from api.utils.auth_service import get_user_from_request_data
+from api.utils.pagination import get_page_size
+from api.utils.search_service import search_documents
+
+
+@api_view(["GET"])
+def search(request):
+    """
+    Поиск по repository, коммитам и текущим путям файлов.
+
+    - ?q= — запрос, каждое слово ищется как префикс;
+    - ?kind=repository,commit,file — ограничить типы документов;
+    - ?limit= — число результатов.
+    """
+
+    user, error = get_user_from_request_data(request)
+    if error:
+        return error
+
+    query = (request.GET.get("q") or "").strip()
+    kinds = [kind for kind in (request.GET.get("kind") or "").split(",") if kind]
+
+    if any(kind not in SearchDocumentKind.values for kind in kinds):
+        return Response({"error": "invalid_kind"}, status=status.HTTP_400_BAD_REQUEST)
+
+    documents = search_documents(user, query, kinds=kinds, limit=get_page_size(request))
+
+    return Response(
+        {
+            "results": [
+                {
+                    "kind": document.kind,
+                    "object_id": document.object_id,
+                    "repository_id": document.repository_id,
+                    "repository_name": document.repository.name,
+                    "title": document.title,
+                    "rank": document.rank,
+                }
+                for document in documents
+            ]
+        },
+        status=status.HTTP_200_OK,
+    )
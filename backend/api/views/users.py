@@ -11,8 +11,10 @@ from api.models.companies import Company
 
 from api.choices import RepositoryVisibility
 from api.utils.auth_service import get_user_from_request_data
+from api.utils.pagination import paginated_response
 from api.utils.repository_service import with_user
-from api.utils.serializers import serialize_user, serialize_repository, serialize_company
+from api.utils.search_service import search_user_rows
+from api.utils.serializers import REPOSITORY_RELATED_FIELDS, serialize_user, serialize_repositories, serialize_companies
 
 from django.contrib.auth import get_user_model
 User = get_user_model()
@@ -21,29 +23,17 @@ User = get_user_model()
 @api_view(["GET"])
 @with_user
 def search_users(request, user):
-    q = request.GET.get("q", "").strip()
-
-    if not q:
-        return Response([], status=200)
-
-    users = User.objects.filter(
-        Q(username__icontains=q) |
-        Q(email__icontains=q)
-    )[:10]
-
-    return Response([
-        {
-            "id": u.id,
-            "username": u.username,
-            "email": u.email
-        }
-        for u in users
-    ])
+    return Response(search_user_rows(request.GET.get("q", "")))
 
 @api_view(["GET"])
 def get_all_users(request):
-    users = User.objects.order_by("username")
-    return Response([serialize_user(user) for user in users], status=status.HTTP_200_OK)
+    users = User.objects.select_related("profile")
+    return paginated_response(
+        request,
+        users,
+        ("username", "id"),
+        lambda page: [serialize_user(user) for user in page],
+    )
 
 
 @api_view(["GET"])
@@ -57,14 +47,17 @@ def get_public_user_profile(request, user_id):
     except User.DoesNotExist:
         return Response({"error": "Пользователь не найден"}, status=status.HTTP_404_NOT_FOUND)
 
-    repositories = Repository.objects.filter(owner_user=user, visibility=RepositoryVisibility.PUBLIC).order_by("name")
+    repositories = Repository.objects.filter(
+        owner_user=user,
+        visibility=RepositoryVisibility.PUBLIC,
+    ).select_related(*REPOSITORY_RELATED_FIELDS).order_by("name")
     companies = Company.objects.filter(Q(owner=user) | Q(companymember__user=user)).distinct().order_by("name")
 
     return Response(
         {
             "user": serialize_user(user),
-            "repositories": [serialize_repository(repository, requester) for repository in repositories],
-            "companies": [serialize_company(company, requester) for company in companies],
+            "repositories": serialize_repositories(repositories, requester),
+            "companies": serialize_companies(companies, requester),
         },
         status=status.HTTP_200_OK,
     )
@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -31,6 +32,9 @@ ALLOWED_HOSTS = env_list(
     "localhost,127.0.0.1,backend",
 )
 
+# число обратных прокси перед приложением; 0 — X-Forwarded-For игнорируется
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "0"))
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -38,6 +42,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "corsheaders",
     "rest_framework",
     "django_extensions",
@@ -52,6 +57,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "api.middleware.AccessTokenMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -107,6 +113,37 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# "default" — локальный кэш процесса;
+# "sessions" — общий для всех worker-ов кэш записей access-сессий (api/utils/session_cache.py);
+# "ratelimit" — общие token bucket-ы для @rate_limit (api/utils/rate_limit.py).
+# По умолчанию файловые; в проде можно указать общий backend, например Redis.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "sessions": {
+        "BACKEND": os.getenv("SESSION_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv("SESSION_CACHE_LOCATION", str(Path(tempfile.gettempdir()) / "ourpainthub-sessions")),
+        "TIMEOUT": 300,
+    },
+    "ratelimit": {
+        "BACKEND": os.getenv("RATE_LIMIT_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv("RATE_LIMIT_CACHE_LOCATION", str(Path(tempfile.gettempdir()) / "ourpainthub-ratelimit")),
+    },
+}
+
+# token bucket на endpoint: capacity запросов подряд, затем capacity за period_seconds.
+# Ключи — IP клиента и login/email из тела запроса.
+RATE_LIMITS = {
+    "login": {"capacity": 10, "period_seconds": 60},
+    "refresh": {"capacity": 30, "period_seconds": 60},
+    "register": {"capacity": 5, "period_seconds": 60 * 60},
+}
+
+# pub/sub для SSE уведомлений: "postgres" (LISTEN/NOTIFY) или "memory" (в процессе);
+# по умолчанию postgres, если база — PostgreSQL
+NOTIFICATION_BROKER = os.getenv("NOTIFICATION_BROKER")
+
 REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "api.utils.exception_handler.api_exception_handler",
 }
@@ -141,3 +178,7 @@ if not DEBUG:
     X_FRAME_OPTIONS = "DENY"
 
 AUTH_USER_MODEL = 'api.User'
+
+AUTHENTICATION_BACKENDS = [
+    "api.backends.UsernameOrEmailBackend",
+]
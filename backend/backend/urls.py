@@ -26,6 +26,8 @@ urlpatterns = [
     path("api/notifications/", include("api.urls.notifications")),
     path("api/content/", include("api.urls.content")),
     path("api/faq/", include("api.urls.faq")),
+    path("api/search/", include("api.urls.search")),
+    path("api/", include("api.urls.commits")),
 ]
 
 if settings.DEBUG:
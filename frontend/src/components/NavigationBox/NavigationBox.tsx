@@ -33,15 +33,11 @@ const NavigationBox: React.FC<NavigationBoxProps> = ({
 
         const loadNotifications = async () => {
             try {
-                const data = await apiFetch<any[]>("/notifications/list/", {
+                const data = await apiFetch<{ unread_count: number }>("/notifications/unread-count/", {
                     auth: true,
                 });
 
-                const unread = (data || []).filter(
-                    (n) => n.status === "unread"
-                ).length;
-
-                setUnreadCount(unread);
+                setUnreadCount(data?.unread_count ?? 0);
             } catch (e) {
                 console.error("notifications load error", e);
             }
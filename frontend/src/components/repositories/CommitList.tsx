@@ -6,6 +6,9 @@ import { formatDate } from '../../utils/formatters';
 interface CommitListProps {
     commits: Commit[];
     canEdit: boolean;
+    hasMore: boolean;
+    isLoadingMore: boolean;
+    onLoadMore: () => void;
     onViewCommit: (commit: Commit) => void;
     onRevert: (commit: Commit) => void;
 }
@@ -13,6 +16,9 @@ interface CommitListProps {
 const CommitList: React.FC<CommitListProps> = ({
                                                    commits,
                                                    canEdit,
+                                                   hasMore,
+                                                   isLoadingMore,
+                                                   onLoadMore,
                                                    onViewCommit,
                                                    onRevert
                                                }) => {
@@ -60,6 +66,12 @@ const CommitList: React.FC<CommitListProps> = ({
                     )}
                 </div>
             ))}
+
+            {hasMore && (
+                <button className="load-more-btn" onClick={onLoadMore} disabled={isLoadingMore}>
+                    {isLoadingMore ? "Загрузка..." : "Показать ещё"}
+                </button>
+            )}
         </div>
     );
 };
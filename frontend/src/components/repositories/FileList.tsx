@@ -1,44 +1,78 @@
 import React from 'react';
-import { RepoFile } from '../../types/repository';
+import { TreeEntry } from '../../types/repository';
 import { formatFileSize } from '../../utils/formatters';
 
 interface FileListProps {
-    files: RepoFile[];
+    entries: TreeEntry[];
+    currentPath: string;
     canEdit: boolean;
     isViewingCommit: boolean;
-    onDownload: (file: RepoFile) => void;
-    onEdit: (file: RepoFile) => void;
-    onDelete: (file: RepoFile) => void;
+    hasMore: boolean;
+    isLoadingMore: boolean;
+    onOpenDirectory: (path: string) => void;
+    onLoadMore: () => void;
+    onDownload: (file: TreeEntry) => void;
+    onEdit: (file: TreeEntry) => void;
+    onDelete: (file: TreeEntry) => void;
 }
 
+const parentPath = (path: string): string => path.split("/").slice(0, -1).join("/");
+
 const FileList: React.FC<FileListProps> = ({
-                                               files,
+                                               entries,
+                                               currentPath,
                                                canEdit,
                                                isViewingCommit,
+                                               hasMore,
+                                               isLoadingMore,
+                                               onOpenDirectory,
+                                               onLoadMore,
                                                onDownload,
                                                onEdit,
                                                onDelete
                                            }) => {
-    if (files.length === 0) {
+    if (entries.length === 0 && !currentPath) {
         return <div className="empty-state">Нет файлов</div>;
     }
 
     return (
         <div className="repo-list">
-            {files.map((file) => (
-                <div key={file.commit_file_id} className="card file-card">
+            {currentPath && (
+                <div className="card file-card dir-card" onClick={() => onOpenDirectory(parentPath(currentPath))}>
+                    <div className="file-card-info">
+                        <strong>⬑ ..</strong>
+                        <p className="file-size-info">{currentPath}/</p>
+                    </div>
+                </div>
+            )}
+
+            {entries.map((entry) => entry.type === "dir" ? (
+                <div
+                    key={`dir:${entry.path}`}
+                    className="card file-card dir-card"
+                    onClick={() => onOpenDirectory(entry.path)}
+                >
                     <div className="file-card-info">
-                        <strong>{file.name}</strong>
-                        {file.size && (
+                        <strong>📁 {entry.name}</strong>
+                        <p className="file-size-info">
+                            Файлов: {entry.file_count} · {formatFileSize(entry.size)}
+                        </p>
+                    </div>
+                </div>
+            ) : (
+                <div key={`file:${entry.path}`} className="card file-card">
+                    <div className="file-card-info">
+                        <strong>{entry.name}</strong>
+                        {entry.size > 0 && (
                             <p className="file-size-info">
-                                Размер: {formatFileSize(file.size)}
+                                Размер: {formatFileSize(entry.size)}
                             </p>
                         )}
                     </div>
 
                     <div className="file-card-actions">
                         <button
-                            onClick={() => onDownload(file)}
+                            onClick={() => onDownload(entry)}
                             className="icon-btn"
                             title="Скачать"
                             aria-label="Скачать файл"
@@ -49,7 +83,7 @@ const FileList: React.FC<FileListProps> = ({
                         {canEdit && !isViewingCommit && (
                             <>
                                 <button
-                                    onClick={() => onEdit(file)}
+                                    onClick={() => onEdit(entry)}
                                     className="icon-btn"
                                     title="Изменить"
                                     aria-label="Изменить файл"
@@ -58,7 +92,7 @@ const FileList: React.FC<FileListProps> = ({
                                 </button>
 
                                 <button
-                                    onClick={() => onDelete(file)}
+                                    onClick={() => onDelete(entry)}
                                     className="icon-btn danger-icon-btn"
                                     title="Удалить"
                                     aria-label="Удалить файл"
@@ -70,8 +104,14 @@ const FileList: React.FC<FileListProps> = ({
                     </div>
                 </div>
             ))}
+
+            {hasMore && (
+                <button className="load-more-btn" onClick={onLoadMore} disabled={isLoadingMore}>
+                    {isLoadingMore ? "Загрузка..." : "Показать ещё"}
+                </button>
+            )}
         </div>
     );
 };
 
-export default FileList;
\ No newline at end of file
+export default FileList;
@@ -395,4 +395,48 @@ export const apiFetch = async <T = unknown>(
 
         throw new ApiError(appError);
     }
-};
\ No newline at end of file
+};
+export interface Page<T> {
+    results: T[];
+    next_cursor: string | null;
+}
+
+const withCursor = (path: string, cursor?: string | null): string => {
+    if (!cursor) {
+        return path;
+    }
+
+    const separator = path.includes("?") ? "&" : "?";
+    return `${path}${separator}cursor=${encodeURIComponent(cursor)}`;
+};
+
+// Одна страница списка: {"results": [...], "next_cursor": ...}
+export const apiFetchPage = async <T = unknown>(
+    path: string,
+    cursor?: string | null,
+    options: ApiFetchOptions = {},
+): Promise<Page<T>> => {
+    const page = await apiFetch<Page<T>>(withCursor(path, cursor), options);
+
+    return {
+        results: page?.results || [],
+        next_cursor: page?.next_cursor || null,
+    };
+};
+
+// Весь список: проходит по next_cursor, пока страницы не закончатся
+export const apiFetchAll = async <T = unknown>(
+    path: string,
+    options: ApiFetchOptions = {},
+): Promise<T[]> => {
+    const items: T[] = [];
+    let cursor: string | null = null;
+
+    do {
+        const page: Page<T> = await apiFetchPage<T>(path, cursor, options);
+        items.push(...page.results);
+        cursor = page.next_cursor;
+    } while (cursor);
+
+    return items;
+};
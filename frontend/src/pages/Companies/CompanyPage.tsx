@@ -1,7 +1,7 @@
 import React, { ChangeEvent, useEffect, useState } from "react";
 import { useNavigate, useParams } from "react-router-dom";
 import MainLayout from "../../layout/MainLayout";
-import { apiFetch, mediaUrl } from "../../contexts/api";
+import { apiFetch, apiFetchAll, mediaUrl } from "../../contexts/api";
 import { Company, CompanyMember, CompanyInvite } from "../../types/company";
 import { Repository, FileWithPreview } from "../../types/repository";
 import { User} from "../../types/company";
@@ -95,7 +95,7 @@ const CompanyPage: React.FC = () => {
             // Загружаем дополнительные данные если пользователь состоит в компании
             if (companyData.is_member) {
                 const [membersData, reposData, invitesData] = await Promise.all([
-                    apiFetch<CompanyMember[]>(`/companies/${id}/members/`, { auth: true }),
+                    apiFetchAll<CompanyMember>(`/companies/${id}/members/`, { auth: true }),
                     apiFetch<Repository[]>(`/companies/${id}/repositories/`, { auth: true }),
                     companyData.can_manage
                         ? apiFetch<CompanyInvite[]>(`/companies/${id}/invites/`, { auth: true })
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from "react";
 import { useNavigate, useParams } from "react-router-dom";
 import MainLayout from "../../layout/MainLayout";
-import { apiFetch, mediaUrl } from "../../contexts/api";
+import { apiFetch, apiFetchAll, mediaUrl } from "../../contexts/api";
 import "./EditNews.scss";
 
 interface NewsData {
@@ -44,7 +44,7 @@ const EditNewsPage: React.FC = () => {
         setLoading(true);
 
         try {
-            const data = await apiFetch<NewsData[]>("/news/");
+            const data = await apiFetchAll<NewsData>("/news/");
             const found = data.find((item) => item.id === Number(id));
 
             if (!found) {
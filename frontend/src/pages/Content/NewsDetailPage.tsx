@@ -2,7 +2,7 @@ import React, { useState, useEffect } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import MainLayout from "../../layout/MainLayout";
 import MarkdownText from "../../components/MarkdownText";
-import { apiFetch, mediaUrl } from "../../contexts/api";
+import { apiFetch, apiFetchAll, mediaUrl } from "../../contexts/api";
 import "./NewsDetailPage.scss";
 
 interface NewsItem {
@@ -69,7 +69,7 @@ const NewsDetailPage: React.FC<NewsDetailPageProps> = ({ isAuthenticated = false
         setError(null);
 
         try {
-            const newsData = await apiFetch<NewsItem[]>("/news/");
+            const newsData = await apiFetchAll<NewsItem>("/news/");
             const newsItem = newsData.find((item) => item.id === newsId);
 
             if (newsItem) {
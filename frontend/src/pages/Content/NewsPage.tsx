@@ -2,7 +2,7 @@ import React, { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
 import MainLayout from "../../layout/MainLayout";
 import MarkdownText from "../../components/MarkdownText";
-import { apiFetch, mediaUrl } from "../../contexts/api";
+import { apiFetch, apiFetchAll, mediaUrl } from "../../contexts/api";
 import "./NewsPage.scss";
 
 interface NewsPageProps {
@@ -46,7 +46,7 @@ const NewsPage: React.FC<NewsPageProps> = ({ isAuthenticated = false }) => {
         setLoading(true);
 
         try {
-            const data = await apiFetch<NewsItem[]>("/news/");
+            const data = await apiFetchAll<NewsItem>("/news/");
             setNews(data);
         } finally {
             setLoading(false);
@@ -1,6 +1,6 @@
 import React, { useEffect, useMemo, useState } from "react";
 import MainLayout from "../../layout/MainLayout";
-import { apiFetch } from "../../contexts/api";
+import { apiFetch, apiFetchAll } from "../../contexts/api";
 import { FontAwesomeIcon } from "@fortawesome/react-fontawesome";
 import {
     faCircleCheck,
@@ -92,8 +92,10 @@ const QAPage: React.FC<QAPageProps> = ({ isAuthenticated = false }) => {
         setLoading(true);
 
         try {
-            const url = admin ? "/QA/list/" : "/QA/answered/";
-            const data = await apiFetch<QAItem[]>(url);
+            // /QA/list/ отдаёт страницы, /QA/answered/ — обычный массив
+            const data = admin
+                ? await apiFetchAll<QAItem>("/QA/list/")
+                : await apiFetch<QAItem[]>("/QA/answered/");
             setQA(Array.isArray(data) ? data : []);
         } finally {
             setLoading(false);
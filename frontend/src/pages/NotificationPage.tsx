@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import MainLayout from "../layout/MainLayout";
-import { apiFetch } from "../contexts/api";
+import { apiFetch, apiFetchPage } from "../contexts/api";
 import { useAuth } from "../contexts/AuthContext";
 import "./NotificationsPage.scss";
 
@@ -24,6 +24,8 @@ const NotificationPage: React.FC = () => {
 
     const [notifications, setNotifications] = useState<Notification[]>([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         if (!user) {
@@ -34,13 +36,27 @@ const NotificationPage: React.FC = () => {
     const load = async () => {
         setLoading(true);
         try {
-            const data = await apiFetch<Notification[]>("/notifications/list/", { auth: true });
-            setNotifications(data || []);
+            const page = await apiFetchPage<Notification>("/notifications/list/", null, { auth: true });
+            setNotifications(page.results);
+            setNextCursor(page.next_cursor);
         } finally {
             setLoading(false);
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+
+        setLoadingMore(true);
+        try {
+            const page = await apiFetchPage<Notification>("/notifications/list/", nextCursor, { auth: true });
+            setNotifications(prev => [...prev, ...page.results]);
+            setNextCursor(page.next_cursor);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         if (user) load();
     }, [user]);
@@ -160,6 +176,12 @@ const NotificationPage: React.FC = () => {
                         })}
                     </div>
                 )}
+
+                {!loading && nextCursor && (
+                    <button onClick={loadMore} className="btn load-more" disabled={loadingMore}>
+                        {loadingMore ? "Загрузка..." : "Показать ещё"}
+                    </button>
+                )}
             </div>
         </MainLayout>
     );
@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import MainLayout from "../../layout/MainLayout";
-import { apiFetch, mediaUrl } from "../../contexts/api";
+import { apiFetchPage, mediaUrl } from "../../contexts/api";
 import {Repository} from "../../types/repository";
 // PublicRepositoriesPage.tsx
 import "./PublicRepositoriesPage.scss";
@@ -11,6 +11,8 @@ const PublicRepositoriesPage: React.FC = () => {
     const navigate = useNavigate();
     const [repos, setRepos] = useState<Repository[]>([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [imageErrors, setImageErrors] = useState<Record<string, boolean>>({});
 
     useEffect(() => {
@@ -20,13 +22,27 @@ const PublicRepositoriesPage: React.FC = () => {
     const load = async () => {
         setLoading(true);
         try {
-            const data = await apiFetch<Repository[]>("/repositories/public/", { auth: true });
-            setRepos(data || []);
+            const page = await apiFetchPage<Repository>("/repositories/public/", null, { auth: true });
+            setRepos(page.results);
+            setNextCursor(page.next_cursor);
         } finally {
             setLoading(false);
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+
+        setLoadingMore(true);
+        try {
+            const page = await apiFetchPage<Repository>("/repositories/public/", nextCursor, { auth: true });
+            setRepos(prev => [...prev, ...page.results]);
+            setNextCursor(page.next_cursor);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     // Функции для получения корректных URL изображений
     const getRepoLogoUrl = (logo: string | null | undefined): string | undefined => {
         if (!logo) return undefined;
@@ -160,6 +176,12 @@ const PublicRepositoriesPage: React.FC = () => {
                         ))}
                     </div>
                 )}
+
+                {!loading && nextCursor && (
+                    <button className="load-more-btn" onClick={loadMore} disabled={loadingMore}>
+                        {loadingMore ? "Загрузка..." : "Показать ещё"}
+                    </button>
+                )}
             </div>
         </MainLayout>
     );
@@ -1,8 +1,8 @@
 import React, { ChangeEvent, useEffect, useState } from "react";
 import { useNavigate, useParams } from "react-router-dom";
 import MainLayout from "../../layout/MainLayout";
-import {apiFetch, apiUrl, getAccessToken, mediaUrl} from "../../contexts/api";
-import { Repository, RepoFile, Commit, FileWithPreview } from "../../types/repository";
+import {apiFetch, apiFetchPage, apiUrl, getAccessToken, mediaUrl} from "../../contexts/api";
+import { Repository, TreeEntry, TreeListing, Commit, FileWithPreview } from "../../types/repository";
 import { formatFileSize } from "../../utils/formatters";
 import RepositoryHeader from "../../components/repositories/RepositoryHeader";
 import FileList from "../../components/repositories/FileList";
@@ -14,6 +14,21 @@ import Message from "../../components/common/Message";
 // RepositoryPage.tsx
 import "./RepositoryPage.scss";
 
+interface RepositoryDetail {
+    repository: Repository;
+    head_commit_id: number | null;
+    tree: TreeListing;
+    commits: Commit[];
+    commits_next_cursor: string | null;
+}
+
+// /tree/<ref>/<path>: сегменты пути кодируются по отдельности, "/" остаётся разделителем
+const treePath = (repositoryId: string, ref: string, path: string, cursor?: string | null): string => {
+    const directory = path.split("/").map(encodeURIComponent).join("/");
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+    return `/repositories/${repositoryId}/tree/${ref}/${directory}${query}`;
+};
+
 
 const RepositoryPage: React.FC = () => {
     const { id } = useParams<{ id: string }>();
@@ -21,16 +36,21 @@ const RepositoryPage: React.FC = () => {
 
     // State
     const [repo, setRepo] = useState<Repository | null>(null);
-    const [files, setFiles] = useState<RepoFile[]>([]);
+    const [entries, setEntries] = useState<TreeEntry[]>([]);
+    const [currentPath, setCurrentPath] = useState("");
+    const [treeCursor, setTreeCursor] = useState<string | null>(null);
     const [commits, setCommits] = useState<Commit[]>([]);
+    const [commitsCursor, setCommitsCursor] = useState<string | null>(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMoreFiles, setLoadingMoreFiles] = useState(false);
+    const [loadingMoreCommits, setLoadingMoreCommits] = useState(false);
     const [saving, setSaving] = useState(false);
     const [message, setMessage] = useState("");
 
     // UI State
     const [editingRepo, setEditingRepo] = useState(false);
     const [creatingCommit, setCreatingCommit] = useState(false);
-    const [editingFile, setEditingFile] = useState<RepoFile | null>(null);
+    const [editingFile, setEditingFile] = useState<TreeEntry | null>(null);
     const [viewingCommit, setViewingCommit] = useState<Commit | null>(null);
 
     // Form State
@@ -52,10 +72,14 @@ const RepositoryPage: React.FC = () => {
         if (!id) return;
         setLoading(true);
         try {
-            const data = await apiFetch<any>(`/repositories/${id}/detail/`, { auth: true });
+            // detail уже содержит первую страницу корня и коммитов — остальное по курсорам
+            const data = await apiFetch<RepositoryDetail>(`/repositories/${id}/detail/`, { auth: true });
             setRepo(data.repository);
-            setFiles(data.files || []);
+            setEntries(data.tree.entries);
+            setCurrentPath("");
+            setTreeCursor(data.tree.next_cursor);
             setCommits(data.commits || []);
+            setCommitsCursor(data.commits_next_cursor);
             setRepoName(data.repository.name);
             setRepoDescription(data.repository.description || "");
             setRepoVisibility(data.repository.visibility);
@@ -185,14 +209,47 @@ const RepositoryPage: React.FC = () => {
         }
     };
 
-    const goToCommit = async (commit: Commit) => {
-        setLoading(true);
+    const treeRef = (commit: Commit | null = viewingCommit): string => commit ? `id:${commit.id}` : "HEAD";
+
+    const openDirectory = async (path: string, commit: Commit | null = viewingCommit) => {
+        if (!id) return;
+        const listing = await apiFetch<TreeListing>(treePath(id, treeRef(commit), path), { auth: true });
+        setEntries(listing.entries);
+        setCurrentPath(listing.path);
+        setTreeCursor(listing.next_cursor);
+    };
+
+    const loadMoreFiles = async () => {
+        if (!id || !treeCursor) return;
+        setLoadingMoreFiles(true);
         try {
-            const snapshot = await apiFetch<RepoFile[]>(
-                `repositories/${id}/commits/${commit.id}/snapshot/`,
+            const listing = await apiFetch<TreeListing>(
+                treePath(id, treeRef(), currentPath, treeCursor),
                 { auth: true }
             );
-            setFiles(snapshot || []);
+            setEntries((prev) => [...prev, ...listing.entries]);
+            setTreeCursor(listing.next_cursor);
+        } finally {
+            setLoadingMoreFiles(false);
+        }
+    };
+
+    const loadMoreCommits = async () => {
+        if (!id || !commitsCursor) return;
+        setLoadingMoreCommits(true);
+        try {
+            const page = await apiFetchPage<Commit>(`/repositories/${id}/commits/`, commitsCursor, { auth: true });
+            setCommits((prev) => [...prev, ...page.results]);
+            setCommitsCursor(page.next_cursor);
+        } finally {
+            setLoadingMoreCommits(false);
+        }
+    };
+
+    const goToCommit = async (commit: Commit) => {
+        setLoading(true);
+        try {
+            await openDirectory("", commit);
             setViewingCommit(commit);
         } finally {
             setLoading(false);
@@ -243,7 +300,7 @@ const RepositoryPage: React.FC = () => {
         }
     };
 
-    const downloadFile = async (file: RepoFile) => {
+    const downloadFile = async (file: TreeEntry) => {
         if (!repo) return;
         try {
             const response = await fetch(
@@ -266,7 +323,7 @@ const RepositoryPage: React.FC = () => {
         }
     };
 
-    const deleteFile = async (file: RepoFile) => {
+    const deleteFile = async (file: TreeEntry) => {
         if (!repo || !window.confirm(`Удалить файл ${file.path}?`)) return;
         setSaving(true);
         try {
@@ -364,9 +421,14 @@ const RepositoryPage: React.FC = () => {
                             )}
                         </div>
                         <FileList
-                            files={files}
+                            entries={entries}
+                            currentPath={currentPath}
                             canEdit={!!repo.can_edit}
                             isViewingCommit={!!viewingCommit}
+                            hasMore={!!treeCursor}
+                            isLoadingMore={loadingMoreFiles}
+                            onOpenDirectory={(path) => void openDirectory(path)}
+                            onLoadMore={loadMoreFiles}
                             onDownload={downloadFile}
                             onEdit={openFileEditor}
                             onDelete={deleteFile}
@@ -383,6 +445,9 @@ const RepositoryPage: React.FC = () => {
                         <CommitList
                             commits={commits}
                             canEdit={!!repo.can_edit}
+                            hasMore={!!commitsCursor}
+                            isLoadingMore={loadingMoreCommits}
+                            onLoadMore={loadMoreCommits}
                             onViewCommit={goToCommit}
                             onRevert={revertToCommit}
                         />
@@ -445,7 +510,7 @@ const RepositoryPage: React.FC = () => {
         </MainLayout>
     );
 
-    function openFileEditor(file: RepoFile) {
+    function openFileEditor(file: TreeEntry) {
         setEditingFile(file);
         setFilePath(file.path);
         setReplacementFile(null);
@@ -31,6 +31,24 @@ export interface RepoFile {
     download_url?: string | null;
 }
 
+// Элемент папки из /repositories/<id>/tree/<ref>/<path> и detail.tree
+export interface TreeEntry {
+    name: string;
+    path: string;
+    type: "dir" | "file";
+    size: number;
+    file_count: number;
+    commit_file_id: number | null;
+    download_url?: string | null;
+}
+
+export interface TreeListing {
+    commit_id?: number | null;
+    path: string;
+    entries: TreeEntry[];
+    next_cursor: string | null;
+}
+
 export interface Commit {
     id: number;
     message: string;